@@ -0,0 +1,276 @@
+"""
+Multi-currency PnL normalisation.
+
+Trade PnL is entered in the quote currency of its ticker (EURJPY in JPY, XAUUSD in USD).
+Each trade also stores `pnl_account`, its PnL converted into the account currency
+($ACCOUNT_CURRENCY, USD by default) at the rate in force at its entry time, so
+analytics and exports can total PnL across tickers without looking up rates per row.
+
+Rates live in the `fx_rates` table, loaded from `<CURRENCY>.csv` files of
+`date,rate` rows where rate is the value of one unit of the currency in USD
+(e.g. EUR.csv: `2024-08-13,1.0932`). A rate applies from its date until the next one.
+
+Usage:
+    python -m analytics.fx load data/fx
+    python -m analytics.fx normalize
+"""
+import os
+import csv
+import time
+import argparse
+import threading
+from bisect import bisect_right
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from database.storage import TradeStorage
+
+
+DEFAULT_RATES_DIR = r'data/fx'
+
+# Rates are daily, so as-of lookups are cached per currency and day.
+DAY = 86400
+
+# Seconds between checks of the `fx_rates` table for rates loaded by another process,
+# e.g. `python -m analytics.fx load` while the bot runs.
+RELOAD_CHECK_INTERVAL = 60
+
+# Quote currency of instruments that are not six-letter currency pairs.
+TICKER_CURRENCIES = {
+    'US30': 'USD', 'NAS100': 'USD', 'SPX500': 'USD', 'US500': 'USD', 'USOIL': 'USD',
+    'GER40': 'EUR', 'DE40': 'EUR', 'UK100': 'GBP', 'JP225': 'JPY',
+}
+
+
+def quote_currency(ticker):
+    """
+    Currency a ticker's PnL is quoted in: the listed currency of an index, USD for crypto
+    quoted in a dollar stablecoin (BTCUSDT), or the last three letters of a currency or
+    metal pair (EURJPY -> JPY, XAUUSD -> USD).
+
+    Returns:
+        str: ISO currency code, or None if unknown.
+    """
+    ticker = str(ticker or '').upper().replace('/', '')
+    if ticker in TICKER_CURRENCIES:
+        return TICKER_CURRENCIES[ticker]
+    if ticker.endswith(('USDT', 'USDC')):
+        return 'USD'
+    if len(ticker) == 6 and ticker.isalpha():
+        return ticker[3:]
+    return None
+
+
+class FxRates:
+    """
+    As-of FX rates against USD with an interval index per currency.
+
+    Each currency keeps its rate start times in a sorted list; the rate in force at a
+    time is found by binary search over those intervals. Lookups are further cached per
+    (currency, day) in an LRU, so converting a batch of trades costs a dictionary hit
+    per row once the days are warm. Every `check_interval` seconds a conversion also
+    checks whether the table changed and reloads it if so.
+    """
+
+    def __init__(self, trades_db: TradeStorage, account_currency='USD', cache_size=4096,
+                 check_interval=RELOAD_CHECK_INTERVAL):
+        """
+        Args:
+            trades_db (TradeStorage): Database holding the `fx_rates` table.
+            account_currency (str): Currency PnL is normalised into.
+            cache_size (int): (currency, day) lookups kept in the LRU.
+            check_interval (float): Seconds between checks for rates loaded by another process.
+        """
+        self.trades_db = trades_db
+        self.account_currency = account_currency.upper()
+        self.check_interval = check_interval
+        self._starts = {}
+        self._rates = {}
+        self._fingerprint = None
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._init_table()
+        self.reload()
+        self._usd_rate = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _init_table(self):
+        conn = self.trades_db._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS fx_rates (
+                currency TEXT,
+                valid_from BIGINT,
+                rate DOUBLE PRECISION,
+                PRIMARY KEY (currency, valid_from)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _table_fingerprint(cursor):
+        """Changes whenever rates are added or replaced; a cheap aggregate over the small rates table."""
+        cursor.execute("SELECT COUNT(*), SUM(rate) FROM fx_rates")
+        return tuple(cursor.fetchone())
+
+    def reload(self):
+        """Rebuild the interval index from the `fx_rates` table."""
+        starts, rates = {}, {}
+        conn = self.trades_db._connect()
+        c = conn.cursor()
+        # Read first: a change made meanwhile leaves the fingerprint stale and is reloaded later.
+        fingerprint = self._table_fingerprint(c)
+        c.execute("SELECT currency, valid_from, rate FROM fx_rates ORDER BY currency, valid_from")
+        for currency, valid_from, rate in c:
+            starts.setdefault(currency, []).append(valid_from)
+            rates.setdefault(currency, []).append(rate)
+        conn.close()
+        with self._lock:
+            self._starts, self._rates, self._fingerprint = starts, rates, fingerprint
+        if hasattr(self, '_usd_rate'):
+            self._usd_rate.cache_clear()
+
+    def load_files(self, directory=DEFAULT_RATES_DIR):
+        """
+        Load every `<CURRENCY>.csv` file of `directory` into the `fx_rates` table,
+        replacing rates of the same dates, and rebuild the index.
+
+        Returns:
+            int: Number of rates loaded.
+        """
+        rows = []
+        for name in sorted(os.listdir(directory)):
+            currency, extension = os.path.splitext(name)
+            if extension.lower() != '.csv':
+                continue
+            with open(os.path.join(directory, name), newline='') as file:
+                for record in csv.reader(file):
+                    if not record or not record[0][:1].isdigit():
+                        continue  # header or blank line
+                    valid_from = int(datetime.strptime(record[0].strip()[:10], '%Y-%m-%d')
+                                     .replace(tzinfo=timezone.utc).timestamp())
+                    rows.append((currency.upper(), valid_from, float(record[1])))
+
+        conn = self.trades_db._connect()
+        c = conn.cursor()
+        c.executemany('''
+            INSERT INTO fx_rates (currency, valid_from, rate) VALUES (?, ?, ?)
+            ON CONFLICT (currency, valid_from) DO UPDATE SET rate = excluded.rate
+        ''', rows)
+        conn.commit()
+        conn.close()
+        self.reload()
+        return len(rows)
+
+    def _check_for_new_rates(self):
+        """Reload the index if another process changed the rates table, at most every `check_interval` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+        conn = self.trades_db._connect()
+        fingerprint = self._table_fingerprint(conn.cursor())
+        conn.close()
+        if fingerprint != self._fingerprint:
+            self.reload()
+
+    def _lookup(self, currency, day):
+        """USD value of one unit of `currency` on `day` (epoch // DAY), or None."""
+        if currency == 'USD':
+            return 1.0
+        with self._lock:
+            starts, rates = self._starts.get(currency), self._rates.get(currency)
+        if not starts:
+            return None
+        i = bisect_right(starts, day * DAY + DAY - 1) - 1
+        return rates[i] if i >= 0 else None
+
+    def rate(self, from_currency, to_currency, ts):
+        """
+        As-of conversion rate between two currencies at a UTC epoch.
+
+        Returns:
+            float: Units of `to_currency` per unit of `from_currency`, or None if a rate is missing.
+        """
+        if from_currency == to_currency:
+            return 1.0
+        self._check_for_new_rates()
+        day = int(ts) // DAY
+        source, target = self._usd_rate(from_currency, day), self._usd_rate(to_currency, day)
+        if source is None or not target:
+            return None
+        return source / target
+
+    def normalize(self, ticker, pnl, entry_ts):
+        """
+        PnL of a trade in the account currency.
+
+        Returns:
+            tuple: (quote currency, PnL in the account currency), either of which may be None.
+        """
+        currency = quote_currency(ticker)
+        try:
+            pnl = float(pnl)
+        except (TypeError, ValueError):
+            return currency, None
+        if currency is None or entry_ts is None:
+            return currency, None
+        rate = self.rate(currency, self.account_currency, entry_ts)
+        return currency, None if rate is None else pnl * rate
+
+    def normalize_trades(self, refresh=False, batch_size=50000):
+        """
+        Fill `pnl_account` of trades saved before rates or the account currency were set.
+
+        Args:
+            refresh (bool): Recompute every trade, e.g. after changing the account currency.
+            batch_size (int): Trades read and written per batch.
+
+        Returns:
+            int: Number of trades normalised.
+        """
+        where = "1 = 1" if refresh else "pnl_account IS NULL"
+        count = 0
+        conn = self.trades_db._connect()
+        try:
+            c = self.trades_db._stream_cursor(conn)
+            c.execute(f"SELECT id, ticker, pnl, entry_ts FROM trades WHERE {where}")
+            while True:
+                rows = c.fetchmany(batch_size)
+                if not rows:
+                    break
+                updates = []
+                for trade_id, ticker, pnl, entry_ts in rows:
+                    currency, pnl_account = self.normalize(ticker, pnl, entry_ts)
+                    if pnl_account is not None or refresh:
+                        updates.append((currency, pnl_account, trade_id))
+                if updates:
+                    self.trades_db.save_normalized_pnl(updates)
+                    count += sum(row[1] is not None for row in updates)
+        finally:
+            conn.close()
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    load = commands.add_parser('load', help="load <CURRENCY>.csv rate files into the journal")
+    load.add_argument('directory', nargs='?', default=DEFAULT_RATES_DIR)
+    normalize = commands.add_parser('normalize', help="fill the account-currency PnL of older trades")
+    normalize.add_argument('--refresh', action='store_true', help="recompute every trade")
+    args = parser.parse_args()
+
+    from utils.container import container
+    fx = container.fx
+    started = time.perf_counter()
+    if args.command == 'load':
+        print(f"Loaded {fx.load_files(args.directory)} rates; a running bot picks them up "
+              f"within {RELOAD_CHECK_INTERVAL} seconds")
+    else:
+        count = fx.normalize_trades(refresh=args.refresh)
+        print(f"Normalised {count} trades into {fx.account_currency} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+from fpdf import FPDF
+
+from analytics.journal_report import SLOT_HEIGHT
+
+
+# Equity curve points drawn; longer curves are sampled down.
+CHART_POINTS = 300
+
+PAGE_WIDTH = 190     # A4 width minus 10 mm margins
+
+
+def _text(value):
+    """fpdf 1.7 core fonts only support latin-1."""
+    return str(value).encode('latin-1', 'replace').decode('latin-1')
+
+
+class JournalReport(FPDF):
+    """A4 journal report with a running title header and page numbers."""
+
+    def __init__(self, title):
+        super().__init__(orientation='P', unit='mm', format='A4')
+        self.title = _text(title)
+        self.set_margins(10, 15, 10)
+        self.set_auto_page_break(True, 15)
+        self.alias_nb_pages()
+
+    def header(self):
+        self.set_font('Arial', 'B', 9)
+        self.set_text_color(120)
+        self.cell(0, 6, self.title, 0, 1, 'R')
+        self.set_text_color(0)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font('Arial', '', 8)
+        self.set_text_color(120)
+        self.cell(0, 6, f'Page {self.page_no()}/{{nb}}', 0, 0, 'C')
+        self.set_text_color(0)
+
+    def section(self, title):
+        self.set_font('Arial', 'B', 13)
+        self.cell(0, 10, _text(title), 0, 1)
+        self.set_font('Arial', '', 10)
+
+    def table(self, header, rows, widths):
+        self.set_font('Arial', 'B', 10)
+        self.set_fill_color(230)
+        for text, width in zip(header, widths):
+            self.cell(width, 7, _text(text), 1, 0, 'C', True)
+        self.ln()
+        self.set_font('Arial', '', 10)
+        for row in rows:
+            for value, width in zip(row, widths):
+                self.cell(width, 7, _text(value), 1, 0, 'C')
+            self.ln()
+
+    def equity_chart(self, equity, height=70):
+        """Line chart of the cumulative PnL, drawn with vector lines."""
+        x0, y0, width = self.l_margin, self.get_y(), PAGE_WIDTH
+        self.set_draw_color(160)
+        self.rect(x0, y0, width, height)
+        if len(equity) > CHART_POINTS:
+            step = len(equity) / CHART_POINTS
+            equity = [equity[int(i * step)] for i in range(CHART_POINTS)] + [equity[-1]]
+        points = [0.0] + equity
+        low, high = min(points), max(points)
+        span = (high - low) or 1.0
+
+        def y(value):
+            return y0 + height - 4 - (value - low) / span * (height - 8)
+
+        # Break-even line
+        self.set_draw_color(200)
+        self.line(x0, y(0.0), x0 + width, y(0.0))
+        self.set_draw_color(30, 90, 200)
+        self.set_line_width(0.4)
+        dx = width / max(len(points) - 1, 1)
+        for i in range(1, len(points)):
+            self.line(x0 + (i - 1) * dx, y(points[i - 1]), x0 + i * dx, y(points[i]))
+        self.set_line_width(0.2)
+        self.set_draw_color(0)
+
+        self.set_font('Arial', '', 8)
+        self.text(x0 + 1, y0 + 4, _text(f"{high:+.2f}"))
+        self.text(x0 + 1, y0 + height - 1, _text(f"{low:+.2f}"))
+        self.set_y(y0 + height + 4)
+
+    def trade_block(self, trade, image, top):
+        """One trade with its details and screenshot in a SLOT_HEIGHT block starting at `top`."""
+        self.set_xy(self.l_margin, top)
+        self.set_font('Arial', 'B', 11)
+        self.cell(0, 7, _text(f"#{trade.id}  {trade.date} {trade.time}  {trade.ticker}  "
+                              f"{trade.side}  {trade.win_loss}"), 0, 1)
+        self.set_font('Arial', '', 10)
+        self.cell(0, 6, _text(f"Strategy: {trade.strategy}   R:R: {trade.rr}   PnL: {trade.pnl}"), 0, 1)
+
+        if image is None:
+            self.set_text_color(120)
+            self.cell(0, 6, "No screenshot.", 0, 1)
+            self.set_text_color(0)
+            return
+        path, width_px, height_px = image
+        # Fit the screenshot into the block, keeping its aspect ratio.
+        max_w, max_h = PAGE_WIDTH, SLOT_HEIGHT - 18
+        scale = min(max_w / width_px, max_h / height_px)
+        self.image(path, self.l_margin, self.get_y() + 2, width_px * scale, height_px * scale)
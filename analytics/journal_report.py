@@ -0,0 +1,136 @@
+import os
+from collections import defaultdict
+
+from analytics.outcomes import r_multiple, trade_pnl
+
+
+# Each trade page holds this many trades with their screenshots.
+TRADES_PER_PAGE = 2
+
+# Total bytes of screenshots embedded in one report. fpdf keeps embedded images in memory
+# until the file is written, so this bounds the report's memory use; later screenshots
+# are left out once it is reached.
+IMAGE_BUDGET = 24 * 1024 * 1024
+
+SLOT_HEIGHT = 130    # height of one trade block; two fit between header and footer
+
+
+def journal_stats(trades):
+    """
+    Summary statistics, per-strategy breakdown and equity curve of a list of trades
+    sorted in trade order.
+
+    Returns:
+        dict: 'summary' (label, value) rows, 'strategies' table rows and 'equity' points.
+    """
+    pnls = [trade_pnl(trade) for trade in trades]
+    wins = [pnl for pnl, trade in zip(pnls, trades) if trade.win_loss == 'Win']
+    losses = [pnl for pnl, trade in zip(pnls, trades) if trade.win_loss != 'Win']
+    r_values = [r for r in (r_multiple(trade.win_loss, trade.rr) for trade in trades) if r is not None]
+
+    equity, balance, peak, max_drawdown = [], 0.0, 0.0, 0.0
+    for pnl in pnls:
+        balance += pnl
+        peak = max(peak, balance)
+        max_drawdown = max(max_drawdown, peak - balance)
+        equity.append(balance)
+
+    gross_loss = abs(sum(losses))
+    summary = [
+        ("Trades", len(trades)),
+        ("Win rate", f"{len(wins) / len(trades):.1%}" if trades else "-"),
+        ("Net PnL", f"{sum(pnls):+.2f}"),
+        ("Average win", f"{sum(wins) / len(wins):+.2f}" if wins else "-"),
+        ("Average loss", f"{sum(losses) / len(losses):+.2f}" if losses else "-"),
+        ("Profit factor", f"{sum(wins) / gross_loss:.2f}" if gross_loss else "-"),
+        ("Expectancy", f"{sum(r_values) / len(r_values):+.2f}R" if r_values else "-"),
+        ("Max drawdown", f"{max_drawdown:.2f}"),
+        ("Best trade", f"{max(pnls):+.2f}" if pnls else "-"),
+        ("Worst trade", f"{min(pnls):+.2f}" if pnls else "-"),
+    ]
+
+    by_strategy = defaultdict(list)
+    for pnl, trade in zip(pnls, trades):
+        by_strategy[trade.strategy or '-'].append((pnl, trade))
+    strategies = []
+    for strategy, rows in sorted(by_strategy.items()):
+        strategy_r = [r for r in (r_multiple(trade.win_loss, trade.rr) for _, trade in rows) if r is not None]
+        strategy_wins = sum(trade.win_loss == 'Win' for _, trade in rows)
+        strategies.append((
+            strategy, len(rows), f"{strategy_wins / len(rows):.0%}",
+            f"{sum(pnl for pnl, _ in rows):+.2f}",
+            f"{sum(strategy_r) / len(strategy_r):+.2f}R" if strategy_r else "-",
+        ))
+
+    return {'summary': summary, 'strategies': strategies, 'equity': equity}
+
+
+def report_order(trades):
+    """Trades in the order the report shows them, which is also the order the image budget is spent in."""
+    return sorted(trades, key=lambda trade: (trade.date, trade.time or '', trade.id))
+
+
+def render_pages(pdf, trades, images, image_budget=IMAGE_BUDGET):
+    """
+    Renders the report into `pdf` one page at a time, yielding the page count after each
+    page so the caller can report progress or stop between pages.
+
+    Args:
+        pdf (JournalReport): The document to render into.
+        trades (list): Trades sorted in trade order.
+        images (dict): Trade id -> (path, width, height) of its downscaled screenshot.
+        image_budget (int): Maximum total bytes of embedded screenshots.
+    """
+    stats = journal_stats(trades)
+    pdf.add_page()
+    pdf.section("Summary")
+    pdf.table(("Metric", "Value"), stats['summary'], (60, 60))
+    pdf.ln(4)
+    pdf.section("Equity curve (cumulative PnL)")
+    pdf.equity_chart(stats['equity'])
+    pdf.section("Performance by strategy")
+    pdf.table(("Strategy", "Trades", "Win rate", "PnL", "Expectancy"), stats['strategies'], (50, 25, 30, 40, 40))
+    yield pdf.page_no()
+
+    embedded = 0
+    for start in range(0, len(trades), TRADES_PER_PAGE):
+        pdf.add_page()
+        top = pdf.get_y()
+        for slot, trade in enumerate(trades[start:start + TRADES_PER_PAGE]):
+            image = images.get(trade.id)
+            if image is not None:
+                try:
+                    size = os.path.getsize(image[0])
+                except FileNotFoundError:
+                    # Evicted from the image cache by another report meanwhile
+                    size, image = 0, None
+                if embedded + size > image_budget:
+                    image = None
+                else:
+                    embedded += size
+            pdf.trade_block(trade, image, top + slot * SLOT_HEIGHT)
+        yield pdf.page_no()
+
+
+def build_journal_pdf(trades, title, images, progress):
+    """
+    Builds the PDF journal of `trades`. Runs in the job process pool.
+
+    Args:
+        trades (list): Trades of the report.
+        title (str): Report title, shown in every page header.
+        images (dict): Trade id -> (path, width, height) of its downscaled screenshot.
+        progress (Progress): Reports progress and raises JobCancelled if the user cancelled.
+
+    Returns:
+        bytes: The PDF file.
+    """
+    # fpdf pulls in Pillow and numpy, so it is only imported once a report is built
+    from analytics.journal_pdf import JournalReport
+
+    trades = report_order(trades)
+    pdf = JournalReport(title)
+    total_pages = 1 + -(-len(trades) // TRADES_PER_PAGE)
+    for page in render_pages(pdf, trades, images):
+        progress(page, total_pages, f"page {page} of {total_pages}")
+    return pdf.output(dest='S').encode('latin-1')
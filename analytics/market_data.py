@@ -0,0 +1,223 @@
+"""
+Market-data enrichment: entry price and maximum adverse/favourable excursion (MAE/MFE)
+of every trade, computed from local OHLC bars.
+
+Bars are stored per ticker as `<bars_dir>/<TICKER>.npy`, a NumPy structured array of
+BAR_DTYPE sorted by bar open time (UTC epoch seconds). The files are memory-mapped, so
+multi-year minute bars are never loaded whole; trades are located in them by binary
+search. Convert a CSV of `timestamp,open,high,low,close` rows with the `convert` command.
+
+For a trade entered at `entry_ts` the window is every bar opening in
+[entry_ts, entry_ts + window). The entry price is the open of the first bar, MFE the
+furthest move in the trade's favour (high for longs, low for shorts) and MAE the
+furthest move against it, both in price units.
+
+Usage:
+    python -m analytics.market_data convert XAUUSD xauusd_1m.csv
+    python -m analytics.market_data enrich --window 240
+"""
+import os
+import re
+import time
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+from database.storage import TradeStorage
+
+
+BAR_DTYPE = np.dtype([('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8')])
+
+DEFAULT_BARS_DIR = r'data/ohlc'
+
+
+def bar_path(bars_dir, ticker):
+    """Bar file of a ticker; characters that are not safe in file names become '_'."""
+    return os.path.join(bars_dir, re.sub(r'[^A-Za-z0-9_.-]', '_', str(ticker).upper()) + '.npy')
+
+
+@lru_cache(maxsize=32)
+def open_bars(path):
+    """Memory-map a bar file. Returns None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    bars = np.load(path, mmap_mode='r')
+    if bars.dtype != BAR_DTYPE:
+        raise ValueError(f"{path} has dtype {bars.dtype}, expected {BAR_DTYPE}")
+    return bars
+
+
+def _window_reduce(ufunc, values, starts, ends):
+    """
+    ufunc.reduce over values[starts[i]:ends[i]] for every i (all windows non-empty),
+    in one vectorised reduceat over the slice the windows span.
+    """
+    low, high = starts.min(), ends.max()
+    span = values[low:high]
+    starts, ends = starts - low, ends - low
+    # reduceat reduces span[idx[k]:idx[k + 1]]; interleaving starts and ends puts every
+    # window at an even position. An index must be < len(span), so windows reaching the
+    # end are cut one bar short and that bar is folded in afterwards.
+    at_end = ends == len(span)
+    indices = np.empty(2 * len(starts), dtype=np.intp)
+    indices[0::2] = starts
+    indices[1::2] = np.where(at_end, len(span) - 1, ends)
+    result = ufunc.reduceat(span, indices)[0::2]
+    result[at_end] = ufunc(result[at_end], span[-1])
+    return result
+
+
+def excursions(bars, entry_ts, is_long, window):
+    """
+    Vectorised entry price, MAE and MFE of many trades on one ticker.
+
+    Args:
+        bars (numpy.ndarray): Bars of BAR_DTYPE sorted by time.
+        entry_ts (numpy.ndarray): Entry times (UTC epoch seconds).
+        is_long (numpy.ndarray): Whether each trade is long.
+        window (int): Seconds after the entry that are examined.
+
+    Returns:
+        tuple: (entry_price, mae, mfe) arrays; NaN where no bar falls in the window.
+    """
+    ts = bars['ts']
+    starts = np.searchsorted(ts, entry_ts, side='left')
+    ends = np.searchsorted(ts, entry_ts + window, side='left')
+    valid = starts < ends
+
+    entry = np.full(len(entry_ts), np.nan)
+    mae = np.full(len(entry_ts), np.nan)
+    mfe = np.full(len(entry_ts), np.nan)
+    if not valid.any():
+        return entry, mae, mfe
+
+    starts, ends, long_ = starts[valid], ends[valid], is_long[valid]
+    price = bars['open'][starts]
+    highs = _window_reduce(np.maximum, bars['high'], starts, ends)
+    lows = _window_reduce(np.minimum, bars['low'], starts, ends)
+    entry[valid] = price
+    mfe[valid] = np.where(long_, highs - price, price - lows)
+    mae[valid] = np.where(long_, price - lows, highs - price)
+    return entry, mae, mfe
+
+
+def enrich_trades(storage: TradeStorage, bars_dir=DEFAULT_BARS_DIR, window_minutes=240, batch_size=50000,
+                  refresh=False):
+    """
+    Computes and stores entry price, MAE and MFE of every trade that has none yet.
+
+    Trades are streamed ordered by ticker and entry time in batches of `batch_size`;
+    each batch is split per ticker and computed with one vectorised call, and its
+    results are written with a single executemany.
+
+    Args:
+        storage (TradeStorage): The journal to enrich.
+        bars_dir (str): Directory of the `<TICKER>.npy` bar files.
+        window_minutes (int): Minutes after the entry examined for excursions.
+        batch_size (int): Trades read, computed and written per batch.
+        refresh (bool): Recompute trades that were already enriched.
+
+    Returns:
+        dict: Number of trades 'enriched' and 'skipped' (no bar file or no bars in the window).
+    """
+    where = "entry_ts IS NOT NULL" + ("" if refresh else " AND mae IS NULL")
+    counts = {'enriched': 0, 'skipped': 0}
+    conn = storage._connect()
+    try:
+        c = storage._stream_cursor(conn)
+        c.execute(f"SELECT id, ticker, side, entry_ts FROM trades WHERE {where} ORDER BY ticker, entry_ts, id")
+        while True:
+            rows = c.fetchmany(batch_size)
+            if not rows:
+                break
+            updates = []
+            start = 0
+            # Rows are ordered by ticker, so each ticker is one contiguous run.
+            while start < len(rows):
+                ticker = rows[start][1]
+                stop = start
+                while stop < len(rows) and rows[stop][1] == ticker:
+                    stop += 1
+                run = rows[start:stop]
+                start = stop
+
+                bars = open_bars(bar_path(bars_dir, ticker))
+                if bars is None or not len(bars):
+                    counts['skipped'] += len(run)
+                    continue
+                ids = np.fromiter((row[0] for row in run), dtype=np.int64, count=len(run))
+                entry_ts = np.fromiter((row[3] for row in run), dtype=np.int64, count=len(run))
+                is_long = np.fromiter((row[2] == 'Long' for row in run), dtype=bool, count=len(run))
+                entry, mae, mfe = excursions(bars, entry_ts, is_long, window_minutes * 60)
+
+                found = ~np.isnan(entry)
+                counts['enriched'] += int(found.sum())
+                counts['skipped'] += int((~found).sum())
+                updates.extend(zip(entry[found].tolist(), mae[found].tolist(), mfe[found].tolist(),
+                                   ids[found].tolist()))
+            if updates:
+                storage.save_excursions(updates)
+    finally:
+        conn.close()
+    return counts
+
+
+def convert_csv(ticker, csv_path, bars_dir=DEFAULT_BARS_DIR):
+    """
+    Converts a CSV of `timestamp,open,high,low,close` bars into the ticker's bar file.
+    Timestamps may be epoch seconds or date-times, which are read as UTC.
+
+    Returns:
+        str: Path of the written bar file.
+    """
+    # pandas is only needed to parse the CSV
+    import pandas as pd
+
+    frame = pd.read_csv(csv_path)
+    frame.columns = [column.strip().lower() for column in frame.columns]
+    stamps = frame.iloc[:, 0]
+    if np.issubdtype(stamps.dtype, np.number):
+        ts = stamps.to_numpy(dtype=np.int64)
+    else:
+        ts = pd.to_datetime(stamps, utc=True).astype('int64').to_numpy() // 10**9
+
+    bars = np.empty(len(frame), dtype=BAR_DTYPE)
+    bars['ts'] = ts
+    for column in ('open', 'high', 'low', 'close'):
+        bars[column] = frame[column].to_numpy(dtype=np.float64)
+    bars.sort(order='ts')
+
+    os.makedirs(bars_dir, exist_ok=True)
+    path = bar_path(bars_dir, ticker)
+    np.save(path, bars)
+    open_bars.cache_clear()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bars-dir', default=DEFAULT_BARS_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help="convert a CSV of bars into a ticker's bar file")
+    convert.add_argument('ticker')
+    convert.add_argument('csv_path')
+    enrich = commands.add_parser('enrich', help="compute excursions of trades that have none yet")
+    enrich.add_argument('--window', type=int, default=240, help="minutes after the entry (default 240)")
+    enrich.add_argument('--batch-size', type=int, default=50000)
+    enrich.add_argument('--refresh', action='store_true', help="recompute trades already enriched")
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        print(f"Wrote {convert_csv(args.ticker, args.csv_path, args.bars_dir)}")
+        return
+
+    from utils.container import container
+    started = time.perf_counter()
+    counts = enrich_trades(container.trades_db, args.bars_dir, args.window, args.batch_size, args.refresh)
+    print(f"Enriched {counts['enriched']} trades, skipped {counts['skipped']} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analytics.outcomes import r_multiple
+from utils.periods import resolve_period
+
+
+# Paths simulated per worker task, at most. Depends on the horizon only, so a seed
+# gives the same result whatever the number of worker processes.
+CHUNK_PATHS = 2000
+# Path steps (paths x trades) per worker task: long horizons get fewer paths per task,
+# so a task's arrays stay within a few tens of megabytes.
+CHUNK_STEPS = 500000
+
+_executor = None
+# /simulate runs in executor threads, so concurrent calls must not each create a pool.
+_executor_lock = threading.Lock()
+# Results of run_simulation, shared by the executor threads running it.
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 32
+
+
+def _simulate_chunk(outcomes, n_paths, horizon, risk, ruin_level, seed_sequence):
+    """
+    Bootstraps `n_paths` equity paths of `horizon` trades from the empirical outcomes.
+    Runs in a worker process; everything is vectorized over (paths, trades).
+    """
+    rng = np.random.default_rng(seed_sequence)
+    samples = outcomes[rng.integers(0, len(outcomes), size=(n_paths, horizon))]
+
+    equity = np.cumprod(1.0 + risk * samples, axis=1)
+    equity = np.maximum(equity, 0.0)
+    peaks = np.maximum.accumulate(np.maximum(equity, 1.0), axis=1)
+    max_drawdown = (1.0 - equity / peaks).max(axis=1)
+    ruined = (equity <= ruin_level).any(axis=1)
+
+    # Longest losing streak per path: running loss count minus its value at the last win.
+    losses = samples < 0
+    counts = np.cumsum(losses, axis=1)
+    resets = np.maximum.accumulate(np.where(losses, 0, counts), axis=1)
+    max_streak = (counts - resets).max(axis=1)
+
+    return max_drawdown, ruined, max_streak, equity[:, -1]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _executor
+
+
+def simulate(outcomes, n_paths=10000, horizon=100, risk_pct=1.0, ruin_pct=50.0, seed=42, parallel=True):
+    """
+    Monte Carlo simulation of future equity paths from historical R-multiples.
+
+    Args:
+        outcomes (list): R-multiples of past trades.
+        n_paths (int): Number of simulated equity paths.
+        horizon (int): Trades per path.
+        risk_pct (float): Percent of current equity risked per trade (1R).
+        ruin_pct (float): Drawdown from the starting balance, in percent, that counts as ruin.
+        seed (int): Seed for reproducible runs.
+        parallel (bool): Spread the paths over a process pool.
+
+    Returns:
+        dict: Drawdown, risk-of-ruin, streak and return statistics.
+    """
+    outcomes = np.asarray(outcomes, dtype=np.float64)
+    chunk_paths = max(1, min(CHUNK_PATHS, CHUNK_STEPS // horizon))
+    n_chunks = -(-n_paths // chunk_paths)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [min(chunk_paths, n_paths - i * chunk_paths) for i in range(n_chunks)]
+    args = (outcomes, horizon, risk_pct / 100.0, 1.0 - ruin_pct / 100.0)
+
+    if parallel and n_chunks > 1:
+        futures = [_get_executor().submit(_simulate_chunk, args[0], size, *args[1:], chunk_seed)
+                   for size, chunk_seed in zip(sizes, seeds)]
+        chunks = [future.result() for future in futures]
+    else:
+        chunks = [_simulate_chunk(args[0], size, *args[1:], chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    max_drawdown, ruined, max_streak, final_equity = (np.concatenate(part) for part in zip(*chunks))
+    percentiles = (50, 90, 95, 99)
+    return {
+        'trades': len(outcomes),
+        'paths': n_paths,
+        'horizon': horizon,
+        'risk_pct': risk_pct,
+        'ruin_pct': ruin_pct,
+        'seed': seed,
+        'expectancy_r': float(outcomes.mean()),
+        'drawdown_pct': {p: float(np.percentile(max_drawdown, p) * 100) for p in percentiles},
+        'risk_of_ruin_pct': float(ruined.mean() * 100),
+        'losing_streak': {p: int(np.percentile(max_streak, p)) for p in percentiles},
+        'return_pct': {p: float((np.percentile(final_equity, p) - 1) * 100) for p in (5, 50, 95)},
+    }
+
+
+def run_simulation(trades_db, ticker=None, strategy=None, period=None, tz_name='UTC', session_start='00:00', **params):
+    """
+    Loads the filtered journal outcomes and runs `simulate`, caching the result per
+    (filters, resolved period range, parameters, change-feed position) so repeated requests
+    cost nothing until a trade changes, in this process or another worker, or the period moves on.
+
+    Args:
+        trades_db (TradeStorage): Source of trade outcomes.
+        ticker (str): Only use trades on this ticker.
+        strategy (str): Only use trades with this strategy.
+        period (str): Only use trades within this period (see utils.periods).
+        **params: Forwarded to `simulate`.
+
+    Returns:
+        dict: The simulation statistics, or None if there are no usable trades.
+    """
+    period_range = resolve_period(period, tz_name, session_start) if period else None
+    key = (ticker, strategy, period_range and (period_range.start_ts, period_range.end_ts),
+           tuple(sorted(params.items())), trades_db.last_change_seq())
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    rows = trades_db.iter_trade_outcomes(ticker=ticker, strategy=strategy, period=period,
+                                         tz_name=tz_name, session_start=session_start)
+    outcomes = [r for r in (r_multiple(win_loss, rr) for win_loss, rr in rows) if r is not None]
+    result = simulate(outcomes, **params) if outcomes else None
+
+    with _cache_lock:
+        _cache[key] = result
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,34 @@
+def r_multiple(win_loss, rr):
+    """
+    Converts a journal entry into an R-multiple: a win earns its reward:risk ratio,
+    a loss costs one R. `rr` may be stored as a number or as text like '2.5' or '1:2.5'.
+
+    Returns:
+        float: The R-multiple, or None if `rr` cannot be parsed.
+    """
+    try:
+        if isinstance(rr, str) and ':' in rr:
+            risk, reward = (float(part) for part in rr.split(':'))
+            rr = reward / risk
+        rr = float(rr)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return rr if win_loss == 'Win' else -1.0
+
+
+def trade_pnl(trade):
+    """
+    PnL of a trade (a Trade record or a write listener's dictionary) in the account currency,
+    falling back to the PnL as entered when it has not been normalised (no rate for its
+    currency, or an unknown ticker).
+
+    Returns:
+        float: The PnL, or 0.0 if it is not a number.
+    """
+    pnl = trade.get('pnl_account')
+    if pnl is None:
+        pnl = trade.get('pnl')
+    try:
+        return float(pnl)
+    except (TypeError, ValueError):
+        return 0.0
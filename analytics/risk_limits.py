@@ -0,0 +1,206 @@
+import json
+import time
+import threading
+
+from analytics.outcomes import trade_pnl
+from utils.periods import resolve_period
+
+
+# Rules a user can set, with their labels. The first three are risk limits that can
+# lock trading until the next session; the weekly target is a goal and only alerts.
+RULES = {
+    'daily_loss': "Daily loss limit",
+    'max_trades': "Max trades per day",
+    'max_losses': "Max consecutive losses",
+    'weekly_target': "Weekly profit target",
+}
+LIMIT_RULES = ('daily_loss', 'max_trades', 'max_losses')
+
+# user_settings keys
+RULES_SETTING = 'risk_rules'
+LOCK_SETTING = 'trading_locked_until'
+
+
+class SessionCounters:
+    """
+    Trades and PnL of the current trading day and week for one timezone and session start.
+    Loaded with one indexed range query, then advanced by every save.
+    """
+
+    __slots__ = ('day_start', 'day_end', 'week_start', 'day_trades', 'day_pnl', 'week_pnl')
+
+    def covers(self, now):
+        return self.day_start <= now < self.day_end
+
+    def add(self, entry_ts, pnl):
+        if entry_ts is None or not self.week_start <= entry_ts < self.day_end:
+            return
+        self.week_pnl += pnl
+        if entry_ts >= self.day_start:
+            self.day_trades += 1
+            self.day_pnl += pnl
+
+
+class RiskMonitor:
+    """
+    Per-user goal and risk-limit rules, evaluated right after each saved trade.
+
+    The trading-day and weekly counters the rules compare against are kept in memory per
+    (timezone, session start) and advanced by a TradeStorage write listener, and the
+    loss streak comes from RollingMetrics, so evaluating the rules after a save is a few
+    comparisons. Counters are reloaded from the `entry_ts` index when a new trading day
+    starts, after an edit or deletion, and after writes by other processes, which the
+    change feed reveals.
+    """
+
+    def __init__(self, trades_db, rolling_metrics):
+        """
+        Args:
+            trades_db (TradeStorage): The database the rules and locks are stored in.
+            rolling_metrics (RollingMetrics): Source of the current win/loss streak.
+        """
+        self.trades_db = trades_db
+        self.rolling_metrics = rolling_metrics
+        self._counters = {}
+        self._rules = {}
+        self._locks = {}
+        self._alerted = {}
+        # Change-feed position the counters reflect, apart from this process's later writes.
+        self._feed_seq = trades_db.last_change_seq()
+        self._lock = threading.Lock()
+        trades_db.add_write_listener(self._on_write)
+
+    def _sync(self):
+        """Drop the counters if another process wrote since the last check."""
+        self._feed_seq, foreign = self.trades_db.foreign_changes_since(self._feed_seq)
+        if foreign:
+            self._counters.clear()
+
+    def _on_write(self, event, trade_id, before, after):
+        with self._lock:
+            self._sync()
+            if event == 'save':
+                pnl = trade_pnl(after)
+                for counters in self._counters.values():
+                    counters.add(after.get('entry_ts'), pnl)
+            else:
+                # Edits and deletions are rare; the next evaluation reloads the counters.
+                self._counters.clear()
+
+    def _load_counters(self, tz_name, session_start):
+        day = resolve_period('TODAY', tz_name, session_start)
+        week = resolve_period('WTD', tz_name, session_start)
+        counters = SessionCounters()
+        counters.day_start, counters.day_end, counters.week_start = day.start_ts, day.end_ts, week.start_ts
+        conn = self.trades_db._connect()
+        c = conn.cursor()
+        c.execute('''
+            SELECT COUNT(*), SUM(COALESCE(pnl_account, pnl)) FROM trades WHERE entry_ts >= ? AND entry_ts < ?
+        ''', (counters.day_start, counters.day_end))
+        counters.day_trades, day_pnl = c.fetchone()
+        c.execute('''
+            SELECT SUM(COALESCE(pnl_account, pnl)) FROM trades WHERE entry_ts >= ? AND entry_ts < ?
+        ''', (counters.week_start, counters.day_end))
+        week_pnl = c.fetchone()[0]
+        conn.close()
+        counters.day_pnl, counters.week_pnl = float(day_pnl or 0), float(week_pnl or 0)
+        return counters
+
+    def counters(self, tz_name, session_start, now=None):
+        """Counters of the current trading day and week in the given timezone and session."""
+        now = time.time() if now is None else now
+        key = (tz_name, session_start)
+        with self._lock:
+            self._sync()
+            counters = self._counters.get(key)
+            if counters is None or not counters.covers(now):
+                counters = self._counters[key] = self._load_counters(tz_name, session_start)
+            return counters
+
+    def rules(self, user_id):
+        """A user's rules as {rule: threshold, 'lock': bool}."""
+        if user_id not in self._rules:
+            text = self.trades_db.get_user_settings(user_id).get(RULES_SETTING)
+            self._rules[user_id] = json.loads(text) if text else {}
+        return self._rules[user_id]
+
+    def set_rules(self, user_id, rules):
+        """Store a user's rules; an empty dictionary removes them and any lock."""
+        if rules:
+            self.trades_db.set_user_setting(user_id, RULES_SETTING, json.dumps(rules))
+        else:
+            self.trades_db.delete_user_setting(user_id, RULES_SETTING)
+            self.unlock(user_id)
+        self._rules[user_id] = dict(rules)
+        self._alerted.pop(user_id, None)
+
+    def locked_until(self, user_id, now=None):
+        """End (UTC epoch) of a user's trading lock, or None if trading is not locked."""
+        if user_id not in self._locks:
+            value = self.trades_db.get_user_settings(user_id).get(LOCK_SETTING)
+            self._locks[user_id] = int(value) if value else 0
+        until = self._locks[user_id]
+        return until if until > (time.time() if now is None else now) else None
+
+    def unlock(self, user_id):
+        self.trades_db.delete_user_setting(user_id, LOCK_SETTING)
+        self._locks[user_id] = 0
+
+    def breaches(self, rules, counters, streak):
+        """
+        Rules currently breached.
+
+        Returns:
+            list: (rule, message) pairs.
+        """
+        found = []
+        if 'daily_loss' in rules and counters.day_pnl <= -rules['daily_loss']:
+            found.append(('daily_loss', f"Daily loss limit hit: {counters.day_pnl:+.2f} today "
+                                        f"(limit -{rules['daily_loss']:g})."))
+        if 'max_trades' in rules and counters.day_trades >= rules['max_trades']:
+            found.append(('max_trades', f"Max trades per day reached: {counters.day_trades} of "
+                                        f"{rules['max_trades']:g} taken today."))
+        if 'max_losses' in rules and -streak >= rules['max_losses']:
+            found.append(('max_losses', f"{-streak} losses in a row (limit {rules['max_losses']:g})."))
+        if 'weekly_target' in rules and counters.week_pnl >= rules['weekly_target']:
+            found.append(('weekly_target', f"Weekly profit target reached: {counters.week_pnl:+.2f} this week "
+                                           f"(target {rules['weekly_target']:g})."))
+        return found
+
+    def evaluate(self, user_id, tz_name, session_start, now=None):
+        """
+        Check a user's rules after a trade was saved.
+
+        Each breach is reported once per trading day (or week, for the weekly target). If the
+        user enabled locking and a risk limit is breached, trading is locked until the next
+        trading day starts.
+
+        Returns:
+            tuple: (alert messages, end of the lock as a UTC epoch or None).
+        """
+        rules = self.rules(user_id)
+        limits = {rule: value for rule, value in rules.items() if rule in RULES}
+        if not limits:
+            return [], None
+        now = time.time() if now is None else now
+        counters = self.counters(tz_name, session_start, now)
+        streak = self.rolling_metrics.summary()['streak'] if 'max_losses' in limits else 0
+
+        alerted = self._alerted.setdefault(user_id, {})
+        messages, lock = [], False
+        for rule, message in self.breaches(limits, counters, streak):
+            period = counters.week_start if rule == 'weekly_target' else counters.day_start
+            if rule in LIMIT_RULES:
+                lock = True
+            if alerted.get(rule) == period:
+                continue
+            alerted[rule] = period
+            messages.append(message)
+
+        locked_until = None
+        if lock and rules.get('lock'):
+            locked_until = counters.day_end
+            if self.locked_until(user_id, now) != locked_until:
+                self.trades_db.set_user_setting(user_id, LOCK_SETTING, str(locked_until))
+                self._locks[user_id] = locked_until
+        return messages, locked_until
@@ -0,0 +1,303 @@
+import json
+import threading
+from collections import deque
+
+from analytics.outcomes import r_multiple
+
+
+# Number of most recent trades in the rolling window.
+WINDOW = 20
+
+# Scope key of the whole journal; every other scope is a strategy name.
+ALL_STRATEGIES = ''
+
+
+class RollingState:
+    """
+    Streak and rolling-window statistics of one scope, updated in O(1) per new trade.
+
+    The window is a ring buffer (deque with maxlen) with running sums of wins and
+    R-multiples, so pushing a trade never looks at older history.
+    """
+
+    __slots__ = ('window', 'window_wins', 'window_r', 'streak', 'count', 'wins', 'total_r', 'last_key')
+
+    def __init__(self):
+        self.window = deque(maxlen=WINDOW)
+        self.window_wins = 0
+        self.window_r = 0.0
+        self.streak = 0            # > 0: consecutive wins, < 0: consecutive losses
+        self.count = 0
+        self.wins = 0
+        self.total_r = 0.0
+        self.last_key = None       # (entry_ts, id) of the most recent trade
+
+    def push(self, r, key):
+        """Add the newest trade's R-multiple."""
+        if len(self.window) == self.window.maxlen:
+            oldest = self.window[0]
+            self.window_wins -= oldest > 0
+            self.window_r -= oldest
+        self.window.append(r)
+        self.window_wins += r > 0
+        self.window_r += r
+
+        if r > 0:
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+        else:
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+
+        self.count += 1
+        self.wins += r > 0
+        self.total_r += r
+        self.last_key = key
+
+    def adjust_totals(self, r, sign):
+        """Add (sign=1) or remove (sign=-1) a trade from the all-time totals."""
+        self.count += sign
+        self.wins += sign * (r > 0)
+        self.total_r += sign * r
+
+    def summary(self):
+        """Current statistics as a dictionary."""
+        size = len(self.window)
+        return {
+            'streak': self.streak,
+            'window': size,
+            'win_rate': self.window_wins / size if size else None,
+            'expectancy': self.window_r / size if size else None,
+            'trades': self.count,
+            'total_expectancy': self.total_r / self.count if self.count else None,
+        }
+
+    def to_json(self):
+        return json.dumps({
+            'window': list(self.window), 'streak': self.streak, 'count': self.count,
+            'wins': self.wins, 'total_r': self.total_r, 'last_key': self.last_key,
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        state = cls()
+        state.window.extend(data['window'])
+        state.window_wins = sum(r > 0 for r in state.window)
+        state.window_r = sum(state.window)
+        state.streak = data['streak']
+        state.count = data['count']
+        state.wins = data['wins']
+        state.total_r = data['total_r']
+        state.last_key = tuple(data['last_key']) if data['last_key'] else None
+        return state
+
+
+class RollingMetrics:
+    """
+    Incremental win/loss streak, rolling win rate and rolling expectancy for the whole
+    journal and for each strategy.
+
+    States are kept in memory, persisted to the `rolling_metrics` table after every change
+    and maintained through TradeStorage write listeners. Saving the newest trade costs O(1).
+    Updates, deletions and back-dated saves refresh the window from the last WINDOW trades
+    plus the current streak, which is still independent of the journal size. Writes by
+    other processes never reach the listeners; the change feed reveals them, and the
+    states are then reloaded.
+    """
+
+    def __init__(self, trades_db):
+        """
+        Args:
+            trades_db (TradeStorage): The database whose trades are tracked.
+        """
+        self.trades_db = trades_db
+        self._states = {}
+        # Change-feed position the states reflect, apart from this process's later writes.
+        self._feed_seq = trades_db.last_change_seq()
+        self._lock = threading.Lock()
+        self._init_table()
+        trades_db.add_write_listener(self._on_write)
+
+    def _init_table(self):
+        conn = self.trades_db._connect()
+        try:
+            conn.execute("SELECT feed_seq FROM rolling_metrics WHERE scope IS NULL")
+            return
+        except self.trades_db.Error:
+            pass
+        finally:
+            conn.close()
+        # Missing, or written by a version that validated states by MAX(id): the persisted
+        # states are only a cache, so start over.
+        conn = self.trades_db._connect()
+        conn.execute("DROP TABLE IF EXISTS rolling_metrics")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rolling_metrics (
+                scope TEXT PRIMARY KEY,
+                state TEXT,
+                feed_seq BIGINT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _scope_filter(self, scope):
+        return ("strategy = ?", (scope,)) if scope != ALL_STRATEGIES else ("1 = 1", ())
+
+    def _sync(self, max_age=None):
+        """Drop the in-memory states if another process wrote since the last check (see foreign_changes_since)."""
+        self._feed_seq, foreign = self.trades_db.foreign_changes_since(self._feed_seq, max_age)
+        if foreign:
+            self._states.clear()
+
+    def _state(self, scope):
+        """Returns the in-memory state of `scope`, loading or rebuilding it on first use."""
+        if scope not in self._states:
+            self._states[scope], _ = self._load(scope)
+        return self._states[scope]
+
+    def _load(self, scope):
+        """
+        Loads the persisted state of `scope`, or rebuilds it from the trades table.
+
+        Returns:
+            tuple: (state, whether it was rebuilt from the current table contents)
+        """
+        conn = self.trades_db._connect()
+        row = conn.execute("SELECT state, feed_seq FROM rolling_metrics WHERE scope = ?", (scope,)).fetchone()
+        conn.close()
+        # A persisted state is only trusted if no trade changed since it was written, by any process.
+        if row and (row[1] or 0) == self.trades_db.last_change_seq():
+            return RollingState.from_json(row[0]), False
+        return self._rebuild(scope), True
+
+    def _rebuild(self, scope):
+        """Full recomputation of a scope; only needed when no valid persisted state exists."""
+        where, params = self._scope_filter(scope)
+        conn = self.trades_db._connect()
+        c = conn.cursor()
+        c.execute(f"SELECT win_loss, rr, entry_ts, id FROM trades WHERE {where} ORDER BY entry_ts, id", params)
+        state = RollingState()
+        for win_loss, rr, entry_ts, trade_id in c:
+            r = r_multiple(win_loss, rr)
+            if r is not None:
+                state.push(r, (entry_ts, trade_id))
+        conn.close()
+        self._persist(scope, state)
+        return state
+
+    def _refresh_window(self, scope, state):
+        """Reload the window and streak from the most recent trades, keeping the totals."""
+        where, params = self._scope_filter(scope)
+        conn = self.trades_db._connect()
+        c = conn.cursor()
+        c.execute(f"SELECT win_loss, rr, entry_ts, id FROM trades WHERE {where} ORDER BY entry_ts DESC, id DESC", params)
+
+        recent, streak, streak_ended, last_key = [], 0, False, None
+        for win_loss, rr, entry_ts, trade_id in c:
+            r = r_multiple(win_loss, rr)
+            if r is None:
+                continue
+            if last_key is None:
+                last_key = (entry_ts, trade_id)
+            if len(recent) < WINDOW:
+                recent.append(r)
+            # The streak continues while the sign matches the most recent trade.
+            if not streak_ended and (streak == 0 or (streak > 0) == (r > 0)):
+                streak += 1 if r > 0 else -1
+            else:
+                streak_ended = True
+                if len(recent) == WINDOW:
+                    break
+        conn.close()
+
+        state.window.clear()
+        state.window.extend(reversed(recent))
+        state.window_wins = sum(r > 0 for r in recent)
+        state.window_r = sum(recent)
+        state.streak = streak
+        state.last_key = last_key
+
+    def _persist(self, scope, state):
+        # Stored with the feed position the state reflects, not the feed's current end: a write
+        # by another process in between must keep the stored state from being trusted.
+        conn = self.trades_db._connect()
+        conn.execute('''
+            INSERT INTO rolling_metrics (scope, state, feed_seq) VALUES (?, ?, ?)
+            ON CONFLICT (scope) DO UPDATE SET state = excluded.state, feed_seq = excluded.feed_seq
+        ''', (scope, state.to_json(), self._feed_seq))
+        conn.commit()
+        conn.close()
+
+    def _on_write(self, event, trade_id, before, after):
+        """Write listener applying each change to the affected scopes."""
+        with self._lock:
+            # States missing another process's writes are reloaded below, this write included.
+            # Read the feed itself: the states are persisted with the position they reflect.
+            self._sync(max_age=0)
+            if event == 'clear':
+                self._states.clear()
+                conn = self.trades_db._connect()
+                conn.execute("DELETE FROM rolling_metrics")
+                conn.commit()
+                conn.close()
+                return
+
+            scopes = {ALL_STRATEGIES}
+            for trade in (before, after):
+                if trade and trade.get('strategy'):
+                    scopes.add(trade['strategy'])
+
+            for scope in scopes:
+                if scope in self._states:
+                    state = self._states[scope]
+                else:
+                    state, rebuilt = self._states[scope], _ = self._load(scope)
+                    # A rebuilt state already reflects this write.
+                    if rebuilt:
+                        continue
+                old_r = r_multiple(before['win_loss'], before['rr']) if before and self._in_scope(before, scope) else None
+                new_r = r_multiple(after['win_loss'], after['rr']) if after and self._in_scope(after, scope) else None
+                key = (after.get('entry_ts'), trade_id) if after else None
+
+                if event == 'save' and new_r is not None and key[0] is not None \
+                        and (state.last_key is None or tuple(key) > tuple(state.last_key)):
+                    state.push(new_r, key)
+                elif old_r is not None or new_r is not None:
+                    if old_r is not None:
+                        state.adjust_totals(old_r, -1)
+                    if new_r is not None:
+                        state.adjust_totals(new_r, 1)
+                    self._refresh_window(scope, state)
+                else:
+                    continue
+                self._persist(scope, state)
+
+    @staticmethod
+    def _in_scope(trade, scope):
+        return scope == ALL_STRATEGIES or trade.get('strategy') == scope
+
+    def summary(self, strategy=None):
+        """
+        Returns the current statistics of the whole journal or of one strategy.
+
+        Args:
+            strategy (str): Strategy name, or None for the whole journal.
+
+        Returns:
+            dict: streak, window size, rolling win rate and expectancy, trade count.
+        """
+        with self._lock:
+            self._sync()
+            return self._state(strategy or ALL_STRATEGIES).summary()
+
+
+def format_summary(summary, label):
+    """Formats a RollingMetrics summary as a single message line."""
+    if not summary['window']:
+        return f"{label}: no trades yet"
+    streak = summary['streak']
+    streak_text = f"{abs(streak)}{'W' if streak > 0 else 'L'}"
+    return (
+        f"{label}: streak {streak_text} | last {summary['window']}: "
+        f"{summary['win_rate']:.0%} win, {summary['expectancy']:+.2f}R expectancy"
+    )
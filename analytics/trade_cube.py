@@ -0,0 +1,238 @@
+import threading
+from collections import defaultdict
+
+from analytics.outcomes import r_multiple, trade_pnl
+from utils.periods import trade_buckets
+
+
+# Dimensions of the cube, in key order. Weekdays are 0 (Monday) to 6.
+DIMENSIONS = ('strategy', 'ticker', 'side', 'weekday', 'hour')
+
+# Measures kept per cell, in list order.
+TRADES, WINS, PNL, R_SUM, R_COUNT = range(5)
+
+METRICS = {
+    'trades': lambda cell: cell[TRADES],
+    'win_rate': lambda cell: cell[WINS] / cell[TRADES] if cell[TRADES] else None,
+    'pnl': lambda cell: cell[PNL],
+    'expectancy': lambda cell: cell[R_SUM] / cell[R_COUNT] if cell[R_COUNT] else None,
+}
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TradeCube:
+    """
+    Aggregation cube of the journal over strategy × ticker × side × weekday × hour of day.
+
+    Each cell holds the trade count, wins, PnL and R-multiple sums of one combination of
+    dimension values. Values are interned to small integer codes, so a cell is a tuple
+    of five ints mapping to five numbers, and the whole cube stays a few thousand entries
+    however many trades the journal has. The same measures are also kept per trading day
+    for calendars. Both are built with one pass over the trades table on first use and
+    then maintained through TradeStorage write listeners, so pivots, profiles and
+    calendars only sum cells. Writes by other processes never reach the listeners; the
+    change feed reveals them, and the cube is then rebuilt.
+    """
+
+    def __init__(self, trades_db):
+        """
+        Args:
+            trades_db (TradeStorage): The database whose trades are aggregated.
+        """
+        self.trades_db = trades_db
+        self._cells = None
+        self._days = None
+        self._codes = {dimension: {} for dimension in DIMENSIONS}
+        self._values = {dimension: [] for dimension in DIMENSIONS}
+        # Change-feed position the cells reflect, apart from this process's later writes.
+        self._feed_seq = 0
+        self._lock = threading.Lock()
+        trades_db.add_write_listener(self._on_write)
+
+    def _code(self, dimension, value):
+        codes = self._codes[dimension]
+        if value not in codes:
+            codes[value] = len(self._values[dimension])
+            self._values[dimension].append(value)
+        return codes[value]
+
+    def _key(self, strategy, ticker, side, weekday, hour):
+        return (self._code('strategy', strategy), self._code('ticker', ticker), self._code('side', side),
+                self._code('weekday', weekday), self._code('hour', hour))
+
+    def _apply(self, cells, key, win_loss, rr, pnl, sign):
+        """Add (sign=1) or remove (sign=-1) one trade from its cell."""
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = [0, 0, 0.0, 0.0, 0]
+        r = r_multiple(win_loss, rr)
+        cell[TRADES] += sign
+        cell[WINS] += sign * (win_loss == 'Win')
+        cell[PNL] += sign * _float(pnl)
+        if r is not None:
+            cell[R_SUM] += sign * r
+            cell[R_COUNT] += sign
+        if not cell[TRADES]:
+            del cells[key]
+
+    def _build(self):
+        """One pass over the trades table; needed on first use and after writes by other processes."""
+        self._feed_seq = self.trades_db.last_change_seq()
+        cells, days = {}, {}
+        conn = self.trades_db._connect()
+        try:
+            c = self.trades_db._stream_cursor(conn)
+            # Buckets come from the stored weekday/hour columns; PnL in the account
+            # currency where it could be normalised.
+            c.execute("SELECT strategy, ticker, side, weekday, hour, date, win_loss, rr, COALESCE(pnl_account, pnl) "
+                      "FROM trades")
+            while True:
+                rows = c.fetchmany(1000)
+                if not rows:
+                    break
+                for strategy, ticker, side, weekday, hour, date, win_loss, rr, pnl in rows:
+                    self._apply(cells, self._key(strategy, ticker, side, weekday, hour), win_loss, rr, pnl, 1)
+                    self._apply(days, str(date)[:10], win_loss, rr, pnl, 1)
+        finally:
+            conn.close()
+        self._cells, self._days = cells, days
+
+    def _written_elsewhere(self):
+        """Whether another process wrote to the journal since the last check."""
+        self._feed_seq, foreign = self.trades_db.foreign_changes_since(self._feed_seq)
+        return foreign
+
+    def _ensure_built(self):
+        if self._cells is None or self._written_elsewhere():
+            self._build()
+
+    def _on_write(self, event, trade_id, before, after):
+        """Write listener applying each change to the affected cells."""
+        with self._lock:
+            # Not built yet: the first query reads the table including this write.
+            if self._cells is None:
+                return
+            if self._written_elsewhere():
+                self._cells = self._days = None
+                return
+            if event == 'clear':
+                self._cells.clear()
+                self._days.clear()
+                return
+            for trade, sign in ((before, -1), (after, 1)):
+                if trade:
+                    weekday, hour = trade_buckets(trade['date'], trade['time'])
+                    key = self._key(trade['strategy'], trade['ticker'], trade['side'], weekday, hour)
+                    self._apply(self._cells, key, trade['win_loss'], trade['rr'], trade_pnl(trade), sign)
+                    self._apply(self._days, str(trade['date'])[:10], trade['win_loss'], trade['rr'],
+                                trade_pnl(trade), sign)
+
+    def pivot(self, rows, columns, metric='expectancy', **filters):
+        """
+        2-D pivot of the cube.
+
+        Args:
+            rows (str): Dimension shown as rows.
+            columns (str): Dimension shown as columns.
+            metric (str): One of METRICS.
+            **filters: Dimension values the trades must match, e.g. ticker='XAUUSD'.
+
+        Returns:
+            dict: 'rows' and 'columns' labels, and 'values', a matrix of metric values
+                (None where no trade matches).
+
+        Raises:
+            ValueError: If a dimension or the metric is unknown.
+        """
+        for dimension in (rows, columns, *filters):
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension {dimension}.")
+        if rows == columns:
+            raise ValueError("Rows and columns must be different dimensions.")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric}.")
+
+        row_axis, column_axis = DIMENSIONS.index(rows), DIMENSIONS.index(columns)
+        with self._lock:
+            self._ensure_built()
+            # A filter value that never occurred matches no cell.
+            wanted = [(DIMENSIONS.index(dimension), self._codes[dimension].get(value, -1))
+                      for dimension, value in filters.items()]
+            totals = defaultdict(lambda: [0, 0, 0.0, 0.0, 0])
+            for key, cell in self._cells.items():
+                if all(key[axis] == code for axis, code in wanted):
+                    total = totals[key[row_axis], key[column_axis]]
+                    for i, value in enumerate(cell):
+                        total[i] += value
+            row_values, column_values = self._values[rows], self._values[columns]
+
+        row_codes = sorted({row for row, _ in totals}, key=lambda code: _sort_key(row_values[code]))
+        column_codes = sorted({column for _, column in totals}, key=lambda code: _sort_key(column_values[code]))
+        measure = METRICS[metric]
+        return {
+            'rows': [row_values[code] for code in row_codes],
+            'columns': [column_values[code] for code in column_codes],
+            'values': [[measure(totals[row, column]) if (row, column) in totals else None
+                        for column in column_codes] for row in row_codes],
+        }
+
+
+    def profile(self, dimension, **filters):
+        """
+        Totals of the trades per value of one dimension, e.g. the hour-of-day profile.
+
+        Returns:
+            list: (value, metrics) pairs in value order, where metrics maps every METRICS name to its value.
+
+        Raises:
+            ValueError: If a dimension is unknown.
+        """
+        for name in (dimension, *filters):
+            if name not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension {name}.")
+
+        axis = DIMENSIONS.index(dimension)
+        with self._lock:
+            self._ensure_built()
+            wanted = [(DIMENSIONS.index(name), self._codes[name].get(value, -1)) for name, value in filters.items()]
+            totals = defaultdict(lambda: [0, 0, 0.0, 0.0, 0])
+            for key, cell in self._cells.items():
+                if all(key[i] == code for i, code in wanted):
+                    total = totals[key[axis]]
+                    for i, value in enumerate(cell):
+                        total[i] += value
+            values = self._values[dimension]
+
+        return [(values[code], {metric: measure(totals[code]) for metric, measure in METRICS.items()})
+                for code in sorted(totals, key=lambda code: _sort_key(values[code]))]
+
+    def calendar(self, year, month):
+        """
+        Per-day totals of one month, for calendar heatmaps.
+
+        Returns:
+            dict: Day of month -> metrics (every METRICS name to its value), for days with trades.
+        """
+        prefix = f"{year:04d}-{month:02d}-"
+        with self._lock:
+            self._ensure_built()
+            days = {date: list(cell) for date, cell in self._days.items() if date.startswith(prefix)}
+        result = {}
+        for date, cell in days.items():
+            try:
+                day = int(date[len(prefix):])
+            except ValueError:
+                continue
+            result[day] = {metric: measure(cell) for metric, measure in METRICS.items()}
+        return result
+
+
+def _sort_key(value):
+    # Missing values (e.g. an unreadable entry time) sort last.
+    return (value is None, value if value is not None else 0)
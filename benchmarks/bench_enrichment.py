@@ -0,0 +1,73 @@
+"""
+Backfill benchmark for the MAE/MFE market-data enrichment.
+
+Writes synthetic minute bars (a random walk, 24h a day) covering the last N years for
+every benchmark ticker, populates a throwaway journal with M trades over the same
+period, then times `enrich_trades` end to end: streaming the trades, binary-searching
+the memory-mapped bars, the vectorised excursion windows and the batched UPDATEs.
+A second run with --refresh shows the cost once the bar files are in the page cache.
+
+Usage:
+    python -m benchmarks.bench_enrichment --trades 1000000 --years 3
+"""
+import os
+import time
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from database.database_management import TradeDatabase
+from analytics.market_data import BAR_DTYPE, bar_path, enrich_trades
+from benchmarks.common import TICKERS, populate
+
+
+def write_bars(bars_dir, years, seed=0):
+    """Minute bars from `years` ago until tomorrow for every ticker. Returns the bar count per ticker."""
+    rng = np.random.default_rng(seed)
+    first_day = datetime.combine(date.today() - timedelta(days=years * 365), datetime.min.time(), timezone.utc)
+    start = int(first_day.timestamp())
+    count = (years * 365 + 2) * 1440
+    for ticker in TICKERS:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, count)))
+        spread = np.abs(rng.normal(0, 0.0003, count)) * close
+        bars = np.empty(count, dtype=BAR_DTYPE)
+        bars['ts'] = start + 60 * np.arange(count, dtype=np.int64)
+        bars['open'] = np.concatenate(([close[0]], close[:-1]))
+        bars['close'] = close
+        bars['high'] = np.maximum(bars['open'], close) + spread
+        bars['low'] = np.minimum(bars['open'], close) - spread
+        np.save(bar_path(bars_dir, ticker), bars)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trades', type=int, default=1000000)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--window', type=int, default=240, help="minutes after the entry")
+    parser.add_argument('--batch-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        bars = write_bars(tmp, args.years)
+        print(f"{len(TICKERS)} tickers x {bars} minute bars written in {time.perf_counter() - started:.1f}s")
+
+        db_path = os.path.join(tmp, 'trades.db')
+        storage = TradeDatabase(db_path)
+        started = time.perf_counter()
+        populate(db_path, args.trades)
+        print(f"{args.trades} trades populated in {time.perf_counter() - started:.1f}s")
+
+        for label, refresh in (('backfill', False), ('refresh', True)):
+            started = time.perf_counter()
+            counts = enrich_trades(storage, tmp, args.window, args.batch_size, refresh=refresh)
+            elapsed = time.perf_counter() - started
+            print(f"{label:<8}: {counts['enriched']} enriched, {counts['skipped']} skipped in {elapsed:.1f}s "
+                  f"({counts['enriched'] / elapsed:,.0f} trades/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Latency benchmark for inline trade lookup on a large journal.
+
+Builds a throwaway database with N trades, builds the TradeIndex and reports
+p50/p95/p99 latency of uncached searches plus the id fetch that backs each
+inline answer.
+
+Usage:
+    python -m benchmarks.bench_inline_search --rows 1000000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from database.database_management import TradeDatabase
+from database.trade_index import TradeIndex
+from benchmarks.common import populate
+
+
+QUERIES = ['xau', 'xau long', 'eur short win', 'dhl', 'mtr loss', 'us30 ff', 'gbp', '12', '9999 xau', 'close', 'w', 'l']
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--samples', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'trades.db')
+        trades_db = TradeDatabase(db_path)
+        populate(db_path, args.rows)
+
+        index = TradeIndex(trades_db, cache_ttl=0)
+        start = time.perf_counter()
+        index.build()
+        print(f"index build: {time.perf_counter() - start:.2f}s for {args.rows} trades")
+
+        latencies = []
+        for _ in range(args.samples):
+            query = random.choice(QUERIES)
+            start = time.perf_counter()
+            index.fetch(index.search(query))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        print(f"search+fetch p50={percentile(latencies, 0.5):.2f}ms "
+              f"p95={percentile(latencies, 0.95):.2f}ms p99={percentile(latencies, 0.99):.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
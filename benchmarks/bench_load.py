@@ -0,0 +1,370 @@
+"""
+Load test of the conversation flows against a simulated Telegram Bot API.
+
+Simulated traders (one private chat each) run scripted flows through the bot built by
+main.build_application: add a trade, check trades by side, export a week as CSV and
+update a trade's status. Each step injects an update into the application's update
+queue, as polling would, and waits until the bot sends the reply the script expects;
+the step latency is the time between the two. Traders pause for a random think time
+between steps and start spread over a ramp-up period.
+
+The Bot API is simulated in-process by the application's transport: it answers
+sendMessage, editMessageText, sendDocument and answerCallbackQuery after a fixed
+network latency and applies Telegram's flood limits (about one message per second per
+chat with a short burst, 30 requests per second overall). A request over a limit is
+counted as a violation and answered with 429 Too Many Requests and a retry_after, as
+Telegram does, so the bot's OutboundScheduler has to back off. Pass --no-rate-limiter
+to send without client-side throttling and see what the server would reject.
+
+Runs against a throwaway database filled with synthetic trades; exports use a throwaway
+snapshot too, so the repository's database files are never touched.
+
+Usage:
+    python -m benchmarks.bench_load --traders 500 --flows add,check,export,update
+"""
+import os
+import json
+import math
+import time
+import random
+import itertools
+import asyncio
+import argparse
+import tempfile
+import logging
+import warnings
+from collections import Counter, defaultdict
+from datetime import date
+
+from benchmarks.common import bot_api_request_class, populate
+
+
+MENU = "Please choose an option"
+# Requests a chat receives; answerCallbackQuery only counts against the overall limit.
+CHAT_METHODS = {'sendMessage', 'editMessageText', 'sendDocument', 'sendPhoto'}
+
+
+def _command(text):
+    return {'text': text, 'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]}
+
+
+def press(data, expect):
+    """Step: press the inline button with callback data `data`."""
+    return ('callback_query', data, expect)
+
+
+def send(text, expect):
+    """Step: send a text message (a /command if it starts with a slash)."""
+    return ('message', _command(text) if text.startswith('/') else {'text': text}, expect)
+
+
+def send_photo(expect):
+    """Step: send a screenshot."""
+    return ('message', {'photo': [{'file_id': 'load_test_photo', 'file_unique_id': 'load_test', 'width': 1280,
+                                   'height': 720}]}, expect)
+
+
+def flow_steps(flow, trade_id):
+    """
+    Scripted steps of a flow: (kind, payload, expected reply). Every flow starts and ends
+    at the main menu, so a trader can run them back to back.
+
+    Args:
+        flow (str): 'add', 'check', 'export' or 'update'.
+        trade_id (int): Trade changed by the update flow.
+    """
+    if flow == 'add':
+        return [
+            press('add_new_trade', "Choose Ticker"),
+            press('EURUSD', "Trade Status?"),
+            press('Win', "Position Side?"),
+            press('Long', "Trading Setup?"),
+            press('DHL', "Risk:Reward"),
+            send('2.5', "What was PnL?"),
+            send('120', "enter the date"),
+            send(date.today().isoformat(), "What time"),
+            send('14:30', "Send a Picture"),
+            send_photo(MENU),
+        ]
+    if flow == 'check':
+        return [
+            press('check_previous_trades', "How Would You Like To Check"),
+            press('by_side', "Select the side"),
+            press('Long', MENU),
+        ]
+    if flow == 'export':
+        return [
+            press('export_csv', "date period for export"),
+            press('1W', "specific ticker or all trades"),
+            press('all_trades', MENU),
+        ]
+    if flow == 'update':
+        return [
+            press('update_trade', "What Would You Like To Do?"),
+            press('update_trade_by_id', "enter the Trade ID"),
+            send(str(trade_id), "Trade found"),
+            press('update_status', "status"),
+            press('update_status_Win', MENU),
+        ]
+    raise ValueError(f"Unknown flow: {flow}")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class Allowance:
+    """Server-side token bucket: `rate` requests per second with `burst` back to back."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Take a token. Returns 0 if allowed, else the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+def fake_bot_api_class():
+    """Returns the simulated Bot API transport; built lazily like bot_api_request_class."""
+    base = bot_api_request_class()
+
+    class FakeBotApi(base):
+        """
+        Answers Bot API calls like Telegram would, enforcing its flood limits, and lets the
+        load test wait for a reply to a chat.
+        """
+
+        def __init__(self, latency=0.05, overall_rate=30, per_chat_rate=1, per_chat_burst=3):
+            """
+            Args:
+                latency (float): Seconds each request takes.
+                overall_rate (float): Requests per second accepted across all chats.
+                per_chat_rate (float): Messages per second accepted in one chat.
+                per_chat_burst (int): Messages a chat accepts back to back.
+            """
+            super().__init__()
+            self.latency = latency
+            self.per_chat_rate = per_chat_rate
+            self.per_chat_burst = per_chat_burst
+            self._overall = Allowance(overall_rate, overall_rate)
+            self._chats = {}
+            self._waiters = {}
+            self.methods = Counter()
+            self.violations = Counter()
+
+        def expect(self, chat_id, text):
+            """Future resolved with the time the bot sends `chat_id` a request containing `text`."""
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[chat_id] = (text, future)
+            return future
+
+        def _limit(self, endpoint, chat_id):
+            retry_after = self._overall.take()
+            if retry_after:
+                self.violations['overall'] += 1
+                return retry_after
+            if endpoint in CHAT_METHODS and chat_id is not None:
+                chat = self._chats.get(chat_id)
+                if chat is None:
+                    chat = self._chats[chat_id] = Allowance(self.per_chat_rate, self.per_chat_burst)
+                retry_after = chat.take()
+                if retry_after:
+                    self.violations['per_chat'] += 1
+                    return retry_after
+            return 0
+
+        async def do_request(self, url, method, request_data=None, read_timeout=None,
+                             write_timeout=None, connect_timeout=None, pool_timeout=None):
+            endpoint = url.rsplit('/', 1)[-1]
+            parameters = request_data.parameters if request_data else {}
+            if endpoint in ('getMe', 'getUpdates', 'deleteWebhook'):
+                return await super().do_request(url, method, request_data)
+
+            await asyncio.sleep(self.latency)
+            chat_id = parameters.get('chat_id')
+            chat_id = int(chat_id) if chat_id is not None else None
+
+            retry_after = self._limit(endpoint, chat_id)
+            if retry_after:
+                retry_after = math.ceil(retry_after)
+                return 429, json.dumps({
+                    'ok': False, 'error_code': 429,
+                    'description': f"Too Many Requests: retry after {retry_after}",
+                    'parameters': {'retry_after': retry_after},
+                }).encode()
+
+            self.methods[endpoint] += 1
+            waiter = self._waiters.get(chat_id)
+            if waiter is not None:
+                text, future = waiter
+                content = str(parameters.get('text') or parameters.get('caption') or '')
+                if text in content and not future.done():
+                    del self._waiters[chat_id]
+                    future.set_result(time.perf_counter())
+            return 200, json.dumps({'ok': True, 'result': self.result_for(endpoint, parameters)}).encode()
+
+    return FakeBotApi
+
+
+class Trader:
+    """A simulated user working through scripted flows in their own chat."""
+
+    def __init__(self, user_id, application, api, stats, update_ids, timeout, think, rng):
+        self.user_id = user_id
+        self.application = application
+        self.api = api
+        self.stats = stats
+        self.timeout = timeout
+        self.think = think
+        self.rng = rng
+        self._update_ids = update_ids
+
+    def _update(self, kind, payload):
+        from telegram import Update
+
+        update_id = next(self._update_ids)
+        sender = {'id': self.user_id, 'is_bot': False, 'first_name': f'Trader{self.user_id}'}
+        chat = {'id': self.user_id, 'type': 'private'}
+        if kind == 'callback_query':
+            data = {'callback_query': {
+                'id': str(update_id), 'from': sender, 'chat_instance': str(self.user_id), 'data': payload,
+                'message': {'message_id': update_id, 'date': 0, 'chat': chat, 'text': 'menu'},
+            }}
+        else:
+            data = {'message': {'message_id': update_id, 'date': int(time.time()), 'chat': chat, 'from': sender,
+                                **payload}}
+        return Update.de_json({'update_id': update_id, **data}, self.application.bot)
+
+    async def step(self, flow, kind, payload, expect):
+        """Send one update and wait for the expected reply. Returns False on a timeout."""
+        reply = self.api.expect(self.user_id, expect)
+        sent = time.perf_counter()
+        await self.application.update_queue.put(self._update(kind, payload))
+        try:
+            replied = await asyncio.wait_for(reply, self.timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'][flow] += 1
+            return False
+        self.stats['latencies'][flow].append(replied - sent)
+        return True
+
+    async def run(self, flows, start_delay):
+        await asyncio.sleep(start_delay)
+        if not await self.step('start', 'message', _command('/start'), MENU):
+            return
+        for flow in flows:
+            for kind, payload, expect in flow_steps(flow, trade_id=self.rng.randint(1, self.stats['trades'])):
+                await asyncio.sleep(self.rng.uniform(0, 2 * self.think))
+                if not await self.step(flow, kind, payload, expect):
+                    # The conversation state is unknown now; this trader stops.
+                    return
+            self.stats['flows'][flow] += 1
+
+
+async def run_load(application, api, args, stats):
+    rng = random.Random(args.seed)
+    flows = args.flows.split(',')
+    update_ids = itertools.count(1)
+    traders = [
+        Trader(user_id, application, api, stats, update_ids, args.timeout, args.think, random.Random(rng.random()))
+        for user_id in range(1, args.traders + 1)
+    ]
+
+    async with application:
+        await application.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            trader.run(rng.sample(flows, len(flows)) * args.rounds, rng.uniform(0, args.ramp))
+            for trader in traders
+        ))
+        elapsed = time.perf_counter() - start
+        await application.stop()
+    return elapsed
+
+
+def report(args, api, stats, elapsed):
+    latencies = stats['latencies']
+    steps = sum(len(values) for values in latencies.values())
+    print(f"{args.traders} traders, flows {args.flows} x{args.rounds}, {elapsed:.1f}s "
+          f"(ramp-up {args.ramp:g}s, think time {args.think:g}s, API latency {args.api_latency * 1000:g}ms)")
+    print(f"throughput: {steps / elapsed:.1f} updates/s, {sum(stats['flows'].values()) / elapsed:.2f} flows/s")
+    print(f"{'flow':<8}{'steps':>7}{'done':>6}{'timeouts':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for flow in ['start'] + args.flows.split(','):
+        values = latencies[flow]
+        print(f"{flow:<8}{len(values):>7}{stats['flows'][flow] if flow != 'start' else len(values):>6}"
+              f"{stats['timeouts'][flow]:>10}"
+              + ''.join(f"{percentile(values, fraction) * 1000:>9.0f}" for fraction in (0.5, 0.95, 0.99))
+              + f"{max(values, default=0) * 1000:>9.0f}")
+    print("Bot API requests: " + ", ".join(f"{method} {count}" for method, count in api.methods.most_common()))
+    print(f"flood-limit violations (answered 429): per chat {api.violations['per_chat']}, "
+          f"overall {api.violations['overall']}")
+    print(f"handler errors: {stats['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--traders', type=int, default=500)
+    parser.add_argument('--flows', default='add,check,export,update',
+                        help="Comma-separated flows each trader runs, in random order.")
+    parser.add_argument('--rounds', type=int, default=1, help="Times each trader runs its flows.")
+    parser.add_argument('--think', type=float, default=2.0, help="Mean seconds a trader waits between steps.")
+    parser.add_argument('--ramp', type=float, default=10.0, help="Seconds over which traders start.")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Seconds to wait for an expected reply.")
+    parser.add_argument('--api-latency', type=float, default=0.05, help="Seconds each Bot API request takes.")
+    parser.add_argument('--trades', type=int, default=500, help="Synthetic trades in the journal.")
+    parser.add_argument('--no-rate-limiter', action='store_true',
+                        help="Send without client-side throttling; the fake server still enforces its limits.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault('BOT_TOKEN', '123456:offline')
+    os.environ['LIST_OF_ADMINS'] = ','.join(str(user_id) for user_id in range(1, args.traders + 1))
+    # Per-update logging, the scheduler's flood-limit warnings (counted in the report) and
+    # the ConversationHandler setup warning are noise here
+    logging.disable(logging.WARNING)
+    warnings.simplefilter('ignore')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'trades.db')
+        os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+        import main as bot
+        from database.snapshot_reader import SnapshotReader
+        from utils.container import container
+        from utils.rate_limiter import OutboundScheduler
+
+        container.trades_db
+        populate(db_path, args.trades)
+        container.snapshot_db = SnapshotReader(db_path, snapshot_path=os.path.join(tmp, 'trades_snapshot.db'))
+        container.rolling_metrics
+
+        api = fake_bot_api_class()(latency=args.api_latency)
+        limiter = None
+        if args.no_rate_limiter:
+            limiter = OutboundScheduler(overall_rate=1e9, per_chat_rate=1e9, per_chat_burst=10**9)
+        application = bot.build_application(api, rate_limiter=limiter)
+
+        stats = {'latencies': defaultdict(list), 'timeouts': Counter(), 'flows': Counter(), 'errors': 0,
+                 'trades': args.trades}
+
+        async def count_error(update, context):
+            stats['errors'] += 1
+
+        application.add_error_handler(count_error)
+        elapsed = asyncio.run(run_load(application, api, args, stats))
+        report(args, api, stats, elapsed)
+
+
+if __name__ == '__main__':
+    main()
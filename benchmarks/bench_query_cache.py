@@ -0,0 +1,72 @@
+"""
+Benchmark of the trade lookup cache.
+
+Builds a throwaway database with N trades and replays a mix of By Side / By Status /
+By Ticker lookups with a save every WRITE_EVERY lookups, once straight from the database
+and once through a QueryCache, reporting p50/p95 latency, hit rate and cache memory.
+
+Usage:
+    python -m benchmarks.bench_query_cache --rows 100000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from database.database_management import TradeDatabase
+from database.query_cache import QueryCache
+from benchmarks.common import populate, TICKERS
+
+
+LOOKUPS = ([('get_trades_by_side', side) for side in ('Long', 'Short')]
+           + [('get_trades_by_status', status) for status in ('Win', 'Loss')]
+           + [('get_trades_by_ticker', ticker) for ticker in TICKERS])
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def replay(trades_db, samples, write_every, seed=0):
+    rng = random.Random(seed)
+    latencies = []
+    for i in range(samples):
+        if i % write_every == write_every - 1:
+            trades_db.save_trade('2024-07-01', rng.choice(TICKERS), '10:00', 'Win', rng.choice(('Long', 'Short')),
+                                 '2', '100', 'DHL', None)
+        method, value = rng.choice(LOOKUPS)
+        start = time.perf_counter()
+        getattr(trades_db, method)(value)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--samples', type=int, default=300)
+    parser.add_argument('--write-every', type=int, default=20)
+    parser.add_argument('--cache-mb', type=float, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'trades.db')
+        trades_db = TradeDatabase(db_path)
+        populate(db_path, args.rows)
+
+        latencies = replay(trades_db, args.samples, args.write_every)
+        print(f"uncached p50={percentile(latencies, 0.5):.2f}ms p95={percentile(latencies, 0.95):.2f}ms")
+
+        cache = QueryCache(trades_db, max_bytes=int(args.cache_mb * 1024 * 1024))
+        trades_db.set_query_cache(cache)
+        latencies = replay(trades_db, args.samples, args.write_every)
+        stats = cache.stats()
+        print(f"cached   p50={percentile(latencies, 0.5):.2f}ms p95={percentile(latencies, 0.95):.2f}ms "
+              f"hit rate={stats['hit_rate']:.1%} entries={stats['entries']} "
+              f"memory={stats['bytes'] / 1024 / 1024:.1f}MB invalidations={stats['invalidations']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Memory benchmark of trade row representations on a large export.
+
+Builds a throwaway database with N trades and reads all of them three ways: as
+per-row dictionaries (the former representation), as Trade records
+(get_trades_for_export) and as one columnar TradeBatch (get_trade_batch). Reports
+read time and the memory each result holds, measured with tracemalloc.
+
+Usage:
+    python -m benchmarks.bench_records --rows 1000000
+"""
+import os
+import gc
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from database.database_management import TradeDatabase
+from database.records import TRADE_FIELDS
+from benchmarks.common import populate
+
+
+FILTERS = {'start_date': '2000-01-01', 'end_date': '2100-12-31'}
+
+
+def measure(label, read):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = read()
+    elapsed = time.perf_counter() - start
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} {len(result)} trades in {elapsed:.2f}s, holds {held / 1024 / 1024:.0f}MB "
+          f"(peak {peak / 1024 / 1024:.0f}MB), {held / max(len(result), 1):.0f} bytes/trade")
+    del result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'trades.db')
+        trades_db = TradeDatabase(db_path)
+        populate(db_path, args.rows)
+
+        measure("dictionaries", lambda: [dict(zip(TRADE_FIELDS, trade))
+                                         for trade in trades_db.get_trades_for_export(**FILTERS)])
+        measure("Trade records", lambda: trades_db.get_trades_for_export(**FILTERS))
+        measure("TradeBatch", lambda: trades_db.get_trade_batch(**FILTERS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Microbenchmark of per-update render cost: keyboards and trade cards.
+
+Compares building keyboards on every update (the previous handler behaviour)
+with the cached keyboards in utils/render.py, and one f-string message per
+trade over dictionary rows (the previous `display_trades`) with the cards
+CardPacker packs for the check-trades and calendar handlers, over dictionary
+rows and over Trade records. Packing mostly saves Bot API requests: the last
+line shows how many messages each variant sends.
+
+Usage:
+    python -m benchmarks.bench_render --trades 200 --repeat 2000
+"""
+import argparse
+import timeit
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from database.records import Trade
+from utils.render import MAIN_MENU_KEYBOARD, ticker_keyboard, CardPacker
+
+
+TICKERS = ['EURUSD', 'XAUUSD', 'US30', 'GBPUSD', 'EURJPY']
+
+
+def build_main_menu():
+    """Main menu as it used to be built inside `start` on every call."""
+    keyboard = [
+        [InlineKeyboardButton("➕ Add New Trade", callback_data='add_new_trade'), InlineKeyboardButton("🔁 Check Previous Trades", callback_data='check_previous_trades')],
+        [InlineKeyboardButton("📁 Export Data (CSV)", callback_data='export_csv'), InlineKeyboardButton("🗃️ Update Journal", callback_data='update_trade')],
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+def build_ticker_keyboard(tickers):
+    """Ticker keyboard as it used to be built on every call."""
+    return InlineKeyboardMarkup([[InlineKeyboardButton(ticker, callback_data=ticker)] for ticker in tickers])
+
+
+def format_trades(trades):
+    """One f-string message per trade, as `display_trades` used to send them."""
+    return [
+        f"Trade ID: {trade['id']}\n"
+        f"Date: {trade['date']}\n"
+        f"Time: {trade['time']}\n"
+        f"Ticker: {trade['ticker']}\n"
+        f"Side: {trade['side']}\n"
+        f"RR: {trade['rr']}\n"
+        f"PnL: {trade['pnl']}\n"
+        f"Strategy: {trade['strategy']}\n"
+        for trade in trades
+    ]
+
+
+def pack_cards(trades):
+    """Messages of `trades` as the handlers build them: one CardPacker.add per streamed trade."""
+    packer = CardPacker()
+    messages = [message for message in map(packer.add, trades) if message is not None]
+    last = packer.flush()
+    if last is not None:
+        messages.append(last)
+    return messages
+
+
+def best(func, number, rounds=5):
+    """Fastest of `rounds` timings, so one noisy round does not skew the comparison."""
+    return min(timeit.repeat(func, number=number, repeat=rounds))
+
+
+def report(name, seconds, repeat):
+    print(f"{name:<32} {seconds / repeat * 1e6:10.2f} us/update")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trades', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    records = [
+        Trade(i, '2024-08-13', '14:30', TICKERS[i % 5], 'Long', 'Win', 75.25, 3.5, 'MTR', 'photo', 'USD', 75.25)
+        for i in range(args.trades)
+    ]
+    trades = [record._asdict() for record in records]
+
+    report('main menu (rebuilt)', best(build_main_menu, number=args.repeat), args.repeat)
+    report('main menu (cached)', best(lambda: MAIN_MENU_KEYBOARD, number=args.repeat), args.repeat)
+    report('ticker keyboard (rebuilt)', best(lambda: build_ticker_keyboard(TICKERS), number=args.repeat), args.repeat)
+    report('ticker keyboard (cached)', best(lambda: ticker_keyboard(TICKERS), number=args.repeat), args.repeat)
+
+    repeat = max(1, args.repeat // 10)
+    report(f'{args.trades} cards (per trade)', best(lambda: format_trades(trades), number=repeat), repeat)
+    report(f'{args.trades} cards (packed)', best(lambda: pack_cards(trades), number=repeat), repeat)
+    report(f'{args.trades} cards (packed, Trade)', best(lambda: pack_cards(records), number=repeat), repeat)
+    print(f"messages sent: {len(format_trades(trades))} per trade vs {len(pack_cards(trades))} packed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Cold-start benchmark: import-time profile, time-to-ready and time-to-first-update.
+
+Each run starts a fresh interpreter with `-X importtime`, imports main.py, builds the
+application against an offline Bot API transport and processes a single /start update.
+The slowest imports of the last run are printed as the import-time profile. The run
+fails if importing main.py loads any of LAZY_MODULES, which handlers import on first use.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+
+# Heavy libraries that must not be loaded by `import main`.
+LAZY_MODULES = ('pandas', 'numpy', 'fpdf', 'PIL')
+
+CHILD = r'''
+import time
+started = time.perf_counter()
+import asyncio, json, sys
+import main
+eager = [module for module in LAZY_MODULES if module in sys.modules]
+from telegram import Update
+from benchmarks.common import bot_api_request_class
+
+application = main.build_application(bot_api_request_class()())
+ready = time.perf_counter() - started
+
+async def first_update():
+    await application.initialize()
+    update = Update.de_json({
+        'update_id': 1,
+        'message': {
+            'message_id': 1, 'date': 0, 'text': '/start',
+            'chat': {'id': 1, 'type': 'private'},
+            'from': {'id': 1, 'is_bot': False, 'first_name': 'Trader'},
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+        },
+    }, application.bot)
+    await application.process_update(update)
+    await application.shutdown()
+
+asyncio.run(first_update())
+print(json.dumps({
+    'ready': ready,
+    'first_update': time.perf_counter() - started,
+    'eager': eager,
+}))
+'''.replace('LAZY_MODULES', repr(LAZY_MODULES))
+
+
+def parse_importtime(stderr):
+    """Returns (cumulative_us, module) pairs from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), module.rstrip()))
+    return rows
+
+
+def main():
+    import json
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ, BOT_TOKEN='123456:offline', LIST_OF_ADMINS='1')
+    results, imports = [], []
+    for _ in range(args.runs):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD],
+                              capture_output=True, text=True, env=env, check=True)
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        imports = parse_importtime(proc.stderr)
+
+    print(f"time to ready:        median {statistics.median(r['ready'] for r in results) * 1000:.1f} ms")
+    print(f"time to first update: median {statistics.median(r['first_update'] for r in results) * 1000:.1f} ms")
+    eager = sorted({module for r in results for module in r['eager']})
+    print(f"lazy modules imported at startup: {', '.join(eager) or 'none'}")
+    print(f"\nslowest imports (cumulative):")
+    for cumulative, module in sorted(imports, reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:9.1f} ms  {module}")
+    assert not eager, f"import main loaded {', '.join(eager)}; import them where they are used"
+
+
+if __name__ == '__main__':
+    main()
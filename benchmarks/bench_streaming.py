@@ -0,0 +1,72 @@
+"""
+Benchmark of streamed versus list reads on a large date range.
+
+Builds a throwaway database with N trades and renders the trade cards of a date
+range covering all of them, once from get_trades_by_date_range and once from
+aiter_trades_by_date_range, reporting the time until the first message is ready,
+the total time and the peak memory measured with tracemalloc.
+
+Usage:
+    python -m benchmarks.bench_streaming --rows 1000000
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import aclosing
+
+from database.database_management import TradeDatabase
+from utils.render import CardPacker
+from benchmarks.common import populate
+
+
+START, END = '2000-01-01', '2100-12-31'
+
+
+def render_list(trades_db):
+    start = time.perf_counter()
+    first = None
+    packer = CardPacker()
+    for trade in trades_db.get_trades_by_date_range(START, END):
+        if packer.add(trade) and first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def render_stream(trades_db):
+    start = time.perf_counter()
+    first = None
+    packer = CardPacker()
+    async with aclosing(trades_db.aiter_trades_by_date_range(START, END)) as trades:
+        async for trade in trades:
+            if packer.add(trade) and first is None:
+                first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def measure(label, run):
+    tracemalloc.start()
+    first, total = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} first message {first * 1000:.0f}ms, all {total:.1f}s, peak {peak / 1024 / 1024:.0f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'trades.db')
+        trades_db = TradeDatabase(db_path)
+        populate(db_path, args.rows)
+
+        measure("list", lambda: render_list(trades_db))
+        measure("stream", lambda: asyncio.run(render_stream(trades_db)))
+
+
+if __name__ == '__main__':
+    main()
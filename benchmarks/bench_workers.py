@@ -0,0 +1,116 @@
+"""
+Throughput benchmark for the multi-worker mode (`python main.py --workers N`).
+
+Queues the same batch of scripted updates (/start and the main-menu buttons from many
+chats) in a throwaway SQLite update queue, then lets 1, 2, 4 ... worker processes drain
+it through the bot's real handlers against an offline Bot API transport. Workers are
+started and initialized before the clock starts; the timing covers draining the queue.
+Throughput can only scale up to the number of CPU cores.
+
+Usage:
+    python -m benchmarks.bench_workers --updates 4000 --workers 1,2,4
+"""
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+
+def script_updates(count, chats):
+    """Scripted updates: each chat alternates /start and the Check Previous Trades button."""
+    updates = []
+    for update_id in range(1, count + 1):
+        chat_id = update_id % chats + 1
+        sender = {'id': chat_id, 'is_bot': False, 'first_name': 'Trader'}
+        chat = {'id': chat_id, 'type': 'private'}
+        if update_id // chats % 2 == 0:
+            updates.append({'update_id': update_id, 'message': {
+                'message_id': update_id, 'date': 0, 'text': '/start', 'chat': chat, 'from': sender,
+                'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+            }})
+        else:
+            updates.append({'update_id': update_id, 'callback_query': {
+                'id': str(update_id), 'from': sender, 'chat_instance': str(chat_id), 'data': 'check_previous_trades',
+                'message': {'message_id': update_id, 'date': 0, 'chat': chat, 'text': 'menu'},
+            }})
+    return updates
+
+
+def worker(shard, workers, queue_path, ready, go, results):
+    import asyncio
+    import logging
+    import warnings
+    # Per-update INFO logging and the ConversationHandler setup warning are noise here
+    logging.disable(logging.INFO)
+    warnings.simplefilter('ignore')
+    import main
+    from utils.rate_limiter import OutboundScheduler
+    from utils.update_queue import SQLiteBroker, consume
+    from benchmarks.common import bot_api_request_class
+
+    # Measure handler throughput, not Telegram's flood limits
+    unlimited = OutboundScheduler(overall_rate=1e9, per_chat_rate=1e9, per_chat_burst=10**9)
+    application = main.build_application(bot_api_request_class()(), rate_limiter=unlimited)
+    broker = SQLiteBroker(queue_path)
+
+    async def run():
+        async with application:
+            ready.release()
+            await asyncio.get_running_loop().run_in_executor(None, go.wait)
+            results.put(await consume(application, broker, shard, stop_when_empty=True))
+
+    asyncio.run(run())
+
+
+def measure(updates, workers, tmp):
+    from telegram import Update
+    from utils.update_queue import SQLiteBroker, shard_for
+
+    queue_path = os.path.join(tmp, f'queue_{workers}.db')
+    broker = SQLiteBroker(queue_path)
+    broker.publish([(shard_for(Update.de_json(update, None), workers), update) for update in updates])
+
+    ready, go, results = multiprocessing.Semaphore(0), multiprocessing.Event(), multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(shard, workers, queue_path, ready, go, results))
+                 for shard in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+
+    start = time.perf_counter()
+    go.set()
+    handled = sum(results.get() for _ in processes)
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    assert handled == len(updates) and broker.pending() == 0
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=4000)
+    parser.add_argument('--chats', type=int, default=200)
+    parser.add_argument('--workers', default='1,2,4')
+    args = parser.parse_args()
+
+    os.environ.setdefault('BOT_TOKEN', '123456:offline')
+    os.environ.setdefault('LIST_OF_ADMINS', ','.join(str(chat) for chat in range(1, args.chats + 1)))
+
+    updates = script_updates(args.updates, args.chats)
+    print(f"{args.updates} updates from {args.chats} chats, {os.cpu_count()} CPU cores")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Handlers only read the journal, from a throwaway database
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'trades.db')}"
+        baseline = None
+        for workers in (int(value) for value in args.workers.split(',')):
+            elapsed = measure(updates, workers, tmp)
+            throughput = args.updates / elapsed
+            baseline = baseline or throughput
+            print(f"workers={workers}: {throughput:8.0f} updates/s  ({throughput / baseline:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Shared helpers for the benchmark scripts."""
+import random
+import sqlite3
+from datetime import date, timedelta
+
+from utils.periods import trade_buckets
+
+
+TICKERS = ['EURUSD', 'XAUUSD', 'US30', 'GBPUSD', 'EURJPY']
+STRATEGIES = ['DHL', 'Close_NYSE', 'MTR', 'FF']
+
+
+def populate(db_path, rows, seed=0):
+    """
+    Fill an initialised trades database with `rows` synthetic trades spread over
+    the last three years, using the same value domains as data/produce_data.py.
+    """
+    rng = random.Random(seed)
+    first_day = date.today() - timedelta(days=3 * 365)
+
+    def generate():
+        for _ in range(rows):
+            day = (first_day + timedelta(days=rng.randrange(3 * 365))).isoformat()
+            clock = f"{rng.randrange(24):02}:{rng.randrange(60):02}"
+            win_loss = rng.choice(('Win', 'Loss'))
+            rr = round(rng.uniform(1, 6), 2)
+            pnl = round(rng.uniform(10, 100), 2) * (1 if win_loss == 'Win' else -1)
+            yield (day, clock, rng.choice(TICKERS), win_loss, rng.choice(('Long', 'Short')),
+                   rr, pnl, rng.choice(STRATEGIES), 'photo_placeholder.png', day, clock, *trade_buckets(day, clock))
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        '''INSERT INTO trades (date, time, ticker, win_loss, side, rr, pnl, strategy, picture, entry_ts, weekday, hour)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', ? || ' ' || ?) AS INTEGER), ?, ?)''',
+        generate()
+    )
+    conn.commit()
+    conn.close()
+
+
+def bot_api_request_class():
+    """
+    Returns an offline python-telegram-bot transport answering Bot API calls locally.
+
+    Built lazily so that benchmarks that do not talk to the Bot API do not need
+    python-telegram-bot installed.
+    """
+    import json
+    from telegram.request import BaseRequest
+
+    class OfflineRequest(BaseRequest):
+        """Answers every Bot API call with a canned success response and records it."""
+
+        def __init__(self):
+            self.calls = []
+            self._message_id = 0
+
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        def result_for(self, endpoint, parameters):
+            if endpoint == 'getMe':
+                return {'id': 1, 'is_bot': True, 'first_name': 'Journal', 'username': 'journal_bot'}
+            if endpoint in ('sendMessage', 'sendDocument', 'editMessageText', 'sendPhoto'):
+                self._message_id += 1
+                chat_id = int(parameters.get('chat_id', 1))
+                return {'message_id': self._message_id, 'date': 0,
+                        'chat': {'id': chat_id, 'type': 'private'}, 'text': parameters.get('text', '')}
+            if endpoint == 'getUpdates':
+                return []
+            return True
+
+        async def do_request(self, url, method, request_data=None, read_timeout=None,
+                             write_timeout=None, connect_timeout=None, pool_timeout=None):
+            endpoint = url.rsplit('/', 1)[-1]
+            parameters = request_data.parameters if request_data else {}
+            self.calls.append((endpoint, parameters))
+            return 200, json.dumps({'ok': True, 'result': self.result_for(endpoint, parameters)}).encode()
+
+    return OfflineRequest
@@ -1,12 +1,22 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes
 from utils.bot_management import is_valid_date, is_valid_time, return_to_main_menu
 from utils.states_manager import TradeStates
-from database.database_management import TradeDatabase
+from utils.render import ticker_keyboard, WIN_LOSS_KEYBOARD, SIDE_KEYBOARD, STRATEGY_KEYBOARD
+from utils.container import container
+from database.storage import message_source_key
+from analytics.rolling_metrics import format_summary
+from bot_handlers.settings_handler import get_period_settings
+from bot_handlers.limits_handler import lock_notice, send_risk_alerts
 
 
-# Create a instance of TradeDatabase.
-trades_db = TradeDatabase()
+def trade_saved_text(trade_id, strategy):
+    """Confirmation of a saved trade with the current streak and rolling stats, overall and for its strategy."""
+    stats = "\n".join([
+        format_summary(container.rolling_metrics.summary(), "All"),
+        format_summary(container.rolling_metrics.summary(strategy), strategy),
+    ])
+    return f"Trade recorded successfully. The Trade ID is {trade_id}.\n\n{stats}"
 
 
 async def new_trade_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -21,12 +31,15 @@ async def new_trade_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         int: The next state in the conversation (WIN_LOSS).
     """
     query = update.callback_query
+    locked_until = container.risk_monitor.locked_until(update.effective_user.id)
+    if locked_until:
+        tz_name, _ = get_period_settings(update, context)
+        await query.answer(lock_notice(locked_until, tz_name), show_alert=True)
+        return TradeStates.INIT
     await query.answer()
-    tickers = trades_db.get_all_tickers()
+    tickers = container.trades_db.get_all_tickers()
 
-    keyboard = [[InlineKeyboardButton(ticker, callback_data=ticker)] for ticker in tickers]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(text="Please Choose Ticker's Name.", reply_markup=reply_markup)
+    await query.edit_message_text(text="Please Choose Ticker's Name.", reply_markup=ticker_keyboard(tickers))
     return TradeStates.WIN_LOSS
 
 
@@ -46,13 +59,7 @@ async def win_loss_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     context.user_data['ticker_name'] = query.data  # Store selected ticker
     
-    keyboard = [
-        [InlineKeyboardButton("Win", callback_data='Win')],
-        [InlineKeyboardButton("Loss", callback_data='Loss')],
-    ]
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(text="Trade Status? (WIN/LOSS).", reply_markup=reply_markup)
+    await query.edit_message_text(text="Trade Status? (WIN/LOSS).", reply_markup=WIN_LOSS_KEYBOARD)
     return TradeStates.SIDE
 
 
@@ -72,12 +79,7 @@ async def side_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     context.user_data['win_loss'] = query.data  # Store win/loss status
     
-    keyboard = [
-        [InlineKeyboardButton("Long", callback_data='Long')],
-        [InlineKeyboardButton("Short", callback_data='Short')],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(text= "Position Side? (Buy/Sell)", reply_markup=reply_markup)
+    await query.edit_message_text(text= "Position Side? (Buy/Sell)", reply_markup=SIDE_KEYBOARD)
     return TradeStates.STRATEGY
 
 
@@ -103,14 +105,7 @@ async def strategy_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     context.user_data['side'] = query.data # store trade's side
     
-    keyboard = [
-        [InlineKeyboardButton("DHL", callback_data='DHL')],
-        [InlineKeyboardButton("Close NYSE", callback_data='Close_NYSE')],
-        [InlineKeyboardButton("MTR", callback_data='MTR')],
-        [InlineKeyboardButton("FF", callback_data="FF")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(text= "Trading Setup?", reply_markup=reply_markup)
+    await query.edit_message_text(text= "Trading Setup?", reply_markup=STRATEGY_KEYBOARD)
     return TradeStates.RR
 
 
@@ -241,10 +236,10 @@ async def save_trade_handler(update:Update, context:ContextTypes.DEFAULT_TYPE):
         int: Ends the conversation.
     """
     context.user_data['photo'] = update.message.photo[-1].file_id   # Store photo 
-
+    tz_name, _ = get_period_settings(update, context)
 
     # Save the trade details to the database
-    trade_id = trades_db.save_trade(
+    trade_id = container.trades_db.save_trade(
         date= context.user_data['date'], 
         time= context.user_data['time'], 
         ticker = context.user_data['ticker_name'],
@@ -253,13 +248,25 @@ async def save_trade_handler(update:Update, context:ContextTypes.DEFAULT_TYPE):
         rr= context.user_data['rr'], 
         pnl= context.user_data['pnl'],
         strategy= context.user_data['strategy'], 
-        picture= context.user_data['photo'])
+        picture= context.user_data['photo'],
+        tz_name= tz_name,
+        # A redelivered photo message saves nothing new
+        source_key= message_source_key(update.message))
+
+    if trade_id is None:
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            reply_to_message_id=update.effective_message.id,
+            text="The trade could not be saved. Please check the date and time and try again."
+        )
+        return await return_to_main_menu(update, context)
 
     # Notify user that trade recorded successfully.
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         reply_to_message_id=update.effective_message.id,
-        text=f"Trade recorded successfully. The Trade ID is {trade_id}."
+        text=trade_saved_text(trade_id, context.user_data['strategy'])
     )
+    await send_risk_alerts(update, context)
     # return ConversationHandler.END
     return await return_to_main_menu(update, context)
\ No newline at end of file
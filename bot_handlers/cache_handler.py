@@ -0,0 +1,30 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.bot_management import restricted
+from utils.container import container
+
+
+def format_cache_stats(stats):
+    """Describes the hit rate and memory of the trade lookup cache."""
+    if stats is None:
+        return "Trade lookups are not cached (QUERY_CACHE_MB=0)."
+    lookups = stats['hits'] + stats['misses']
+    return (
+        f"Query cache: {stats['entries']} results, {stats['bytes'] / 1024 / 1024:.1f} of "
+        f"{stats['max_bytes'] / 1024 / 1024:.0f} MB\n"
+        f"Hit rate: {stats['hit_rate']:.1%} of {lookups} lookups\n"
+        f"Evicted for space: {stats['evictions']}, invalidated by writes: {stats['invalidations']}"
+    )
+
+
+@restricted
+async def cache_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /cache command: shows the hit rate and memory of the cache behind the
+    By Side/Status/Ticker/Date/ID lookups.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    await update.message.reply_text(format_cache_stats(container.trades_db.query_cache_stats()))
@@ -0,0 +1,186 @@
+import calendar
+from html import escape
+from contextlib import aclosing
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.ext import ContextTypes
+from utils.bot_management import restricted
+from utils.container import container
+from utils.periods import WEEKDAYS, parse_weekday
+from utils.render import MESSAGE_LIMIT, CardPacker
+from bot_handlers.report_handler import parse_report_month
+
+
+CALENDAR_USAGE = "Usage: /calendar [YYYY-MM], defaults to the current month."
+
+HOURS_USAGE = (
+    "Usage: /hours [weekday] [hour]\n"
+    "/hours shows PnL, trades and win rate by hour of day, /hours Tue only for Tuesdays, "
+    "and /hours Tue 15 lists the trades entered on Tuesdays between 15:00 and 16:00."
+)
+
+# Calendar squares of a trading day by its PnL.
+PROFIT_DAY, LOSS_DAY, FLAT_DAY, NO_TRADES, OUTSIDE_MONTH = '🟩', '🟥', '🟨', '⬜', '▫️'
+
+# Width of the longest bar of the hour-of-day profile.
+BAR_WIDTH = 12
+
+
+def _money(value):
+    """Compact signed PnL that fits a calendar cell: +120, -1.2k."""
+    if abs(value) >= 1000:
+        return f"{value / 1000:+.1f}k"
+    return f"{value:+.0f}"
+
+
+def _day_square(metrics):
+    if metrics is None:
+        return NO_TRADES
+    if metrics['pnl'] > 0:
+        return PROFIT_DAY
+    return LOSS_DAY if metrics['pnl'] < 0 else FLAT_DAY
+
+
+def format_calendar(year, month, days, weekdays):
+    """
+    Formats one month as a calendar heatmap (a square per day coloured by its PnL), a table
+    of the daily PnL and the PnL per weekday.
+
+    Args:
+        year (int): Year of the month.
+        month (int): Month number.
+        days (dict): Day of month -> metrics, as returned by TradeCube.calendar().
+        weekdays (list): (weekday, metrics) pairs of TradeCube.profile('weekday').
+
+    Returns:
+        str: HTML message.
+    """
+    weeks = calendar.monthcalendar(year, month)
+    total = sum(metrics['pnl'] for metrics in days.values())
+    trades = sum(metrics['trades'] for metrics in days.values())
+    head = f"<b>{year:04d}-{month:02d}: {_money(total)} over {trades} trades</b>\n"
+
+    squares = "\n".join(
+        "".join(OUTSIDE_MONTH if not day else _day_square(days.get(day)) for day in week) for week in weeks
+    )
+
+    lines = [" ".join(name.rjust(5) for name in WEEKDAYS)]
+    for week in weeks:
+        lines.append(" ".join((str(day) if day else "").rjust(5) for day in week))
+        lines.append(" ".join((_money(days[day]['pnl']) if day in days else "").rjust(5) for day in week))
+
+    by_weekday = ", ".join(f"{WEEKDAYS[weekday]} {_money(metrics['pnl'])}"
+                           for weekday, metrics in weekdays if weekday is not None)
+    legend = f"{PROFIT_DAY} profit {LOSS_DAY} loss {FLAT_DAY} flat {NO_TRADES} no trades"
+    return (f"{head}{squares}\n<pre>{escape(chr(10).join(lines))}</pre>\n"
+            f"All-time PnL by weekday: {escape(by_weekday or '-')}\n{legend}")
+
+
+def format_hour_profile(profile, title):
+    """
+    Formats an hour-of-day profile as a monospaced table with a bar per hour, scaled
+    to the hour with the largest absolute PnL.
+
+    Args:
+        profile (list): (hour, metrics) pairs of TradeCube.profile('hour').
+        title (str): Heading of the message.
+
+    Returns:
+        str: HTML message.
+    """
+    largest = max((abs(metrics['pnl']) for _, metrics in profile), default=0) or 1
+    lines = ["Hour Trades  Win%    PnL"]
+    for hour, metrics in profile:
+        bar = ('+' if metrics['pnl'] >= 0 else '-') * round(abs(metrics['pnl']) / largest * BAR_WIDTH)
+        label = f"{hour:02d}" if hour is not None else "-"
+        lines.append(f"{label:>4} {metrics['trades']:>6} {metrics['win_rate']:>5.0%} {_money(metrics['pnl']):>6} {bar}")
+    return f"<b>{escape(title)}</b>\n<pre>{escape(chr(10).join(lines))}</pre>"
+
+
+def parse_hours_args(args):
+    """
+    Parses the arguments of the /hours command.
+
+    Args:
+        args (list): The command arguments.
+
+    Returns:
+        tuple: (weekday, hour), either of which may be None.
+
+    Raises:
+        ValueError: If an argument is neither a weekday name nor an hour of day.
+    """
+    weekday = hour = None
+    for arg in args:
+        if arg.isdigit() and int(arg) < 24:
+            hour = int(arg)
+        else:
+            weekday = parse_weekday(arg)
+    return weekday, hour
+
+
+@restricted
+async def calendar_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /calendar command: a monthly calendar heatmap of daily PnL with the
+    PnL per weekday, answered from the in-memory trade aggregates.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    try:
+        month, _, _ = parse_report_month(context.args)
+    except ValueError as e:
+        await update.message.reply_text(f"{e}\n{CALENDAR_USAGE}")
+        return
+
+    year, month = (int(part) for part in month.split('-'))
+    days = container.trade_cube.calendar(year, month)
+    weekdays = container.trade_cube.profile('weekday')
+    await update.message.reply_text(format_calendar(year, month, days, weekdays), parse_mode=ParseMode.HTML)
+
+
+@restricted
+async def hours_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /hours command: the hour-of-day profile of the journal, optionally for one
+    weekday, or the trades of one weekday/hour bucket when an hour is given.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    try:
+        weekday, hour = parse_hours_args(context.args)
+    except ValueError as e:
+        await update.message.reply_text(f"{e}\n{HOURS_USAGE}")
+        return
+
+    if hour is not None:
+        # A single bucket is read through the (weekday, hour) index. Only the first message
+        # is sent, so reading stops once it is full; leave room for the note on how many were left out.
+        packer, shown, page = CardPacker(limit=MESSAGE_LIMIT - 100), 0, None
+        async with aclosing(container.trades_db.aiter_trades_by_bucket(weekday, hour, batch_size=100)) as trades:
+            async for trade in trades:
+                page = packer.add(trade)
+                if page:
+                    break
+                shown += 1
+        page = page or packer.flush()
+        if not page:
+            await update.message.reply_text("No trades found for the selected criteria.")
+            return
+        total = container.trades_db.count_trades_by_bucket(weekday, hour)
+        if total > shown:
+            page += f"\n… {shown} of {total} trades shown."
+        await update.message.reply_text(page)
+        return
+
+    filters = {} if weekday is None else {'weekday': weekday}
+    profile = container.trade_cube.profile('hour', **filters)
+    if not profile:
+        await update.message.reply_text("No trades found for the selected criteria.")
+        return
+    title = "PnL by hour of day" + (f" on {WEEKDAYS[weekday]}" if weekday is not None else "")
+    await update.message.reply_text(format_hour_profile(profile, title), parse_mode=ParseMode.HTML)
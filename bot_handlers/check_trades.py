@@ -1,12 +1,13 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ConversationHandler, ContextTypes
 import asyncio
+from contextlib import aclosing
 from utils.bot_management import return_to_main_menu
 from utils.states_manager import CheckTradesStates
-from database.database_management import TradeDatabase
-
-# Creating TradeDatabase instance
-trades_db = TradeDatabase()
+from utils.periods import PERIODS, resolve_period
+from utils.render import CHECK_TRADES_KEYBOARD, SIDE_KEYBOARD, WIN_LOSS_KEYBOARD, CardPacker
+from bot_handlers.settings_handler import get_period_settings
+from utils.container import container
 
 async def check_previous_trades_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -28,21 +29,10 @@ async def check_previous_trades_handler(update: Update, context: ContextTypes.DE
     query = update.callback_query
     await query.answer()
 
-     # Create a keyboard with options for checking trades by different criteria
-    keyboard = [
-        [InlineKeyboardButton("📆 By Date Range", callback_data='by_date_range')],
-        [InlineKeyboardButton("🆔 By Trade ID", callback_data='by_trade_id')],
-        [InlineKeyboardButton('🔤 By Ticker Name', callback_data='by_ticker_name')],
-        [InlineKeyboardButton("↕️ By Side(Long/Short)", callback_data="by_side")],
-        [InlineKeyboardButton("✌🏽 By Status(Win/Loss)", callback_data="by_status")]
-            ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
      # Ask the user how they would like to check the trades
     await query.edit_message_text(
         text="How Would You Like To Check The Trades?",
-        reply_markup=reply_markup
+        reply_markup=CHECK_TRADES_KEYBOARD
     )
     return CheckTradesStates.CHECK_TRADES
 
@@ -63,7 +53,7 @@ async def check_by_date_range_handler(update: Update, context: ContextTypes.DEFA
 
     # Ask the user to enter the date range
     await query.edit_message_text(
-        text="Please enter the date range (YYYY-MM-DD to YYYY-MM-DD):"
+        text="Please enter the date range (YYYY-MM-DD to YYYY-MM-DD) or a period (e.g. 1W, MTD, YTD):"
     )
     return CheckTradesStates.CHECK_DATE_RANGE
 
@@ -122,17 +112,10 @@ async def check_by_side_handler(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     await query.answer()
     
-    # Create a keyboard with options for selecting the trade side
-    keyboard = [
-        [InlineKeyboardButton("Long", callback_data='Long')],
-        [InlineKeyboardButton("Short", callback_data='Short')],
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
     # Ask the user to select the side
     await query.edit_message_text(
         text="Select the side (Long/Short):",
-        reply_markup=reply_markup)
+        reply_markup=SIDE_KEYBOARD)
     return CheckTradesStates.CHECK_SIDE
 
 
@@ -150,55 +133,47 @@ async def check_by_status_handler(update: Update, context: ContextTypes.DEFAULT_
     query = update.callback_query
     await query.answer()
     
-    # Create a keyboard with options for selecting the trade status
-    keyboard = [
-        [InlineKeyboardButton("Win", callback_data='Win')],
-        [InlineKeyboardButton("Loss", callback_data='Loss')],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
      # Ask the user to select the status
     await query.edit_message_text(
         text="Select the status (Win/Loss):", 
-        reply_markup=reply_markup
+        reply_markup=WIN_LOSS_KEYBOARD
         )
     
     return CheckTradesStates.CHECK_STATUS
 
 
+async def _single(trade):
+    if trade:
+        yield trade
+
+
 async def display_trades(update: Update, context: ContextTypes.DEFAULT_TYPE, trades):
     """
-    Displays the list of trades to the user.
+    Displays trades to the user as they are read from the database: cards are packed into
+    as few messages as possible and each message is sent as soon as it is full, so the
+    first one arrives before the rest of a large result has been read.
     
     Args:
         update (Update): The update object that contains the user's message.
         context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
-        trades (list): The list of trades to display.
+        trades (AsyncIterator): The trades to display, e.g. from an `aiter_trades_by_*` method.
     """
-    if not trades:
+    chat_id = update.effective_chat.id
+    packer = CardPacker()
+    found = False
+    # aclosing stops the database read if sending fails or the handler is cancelled.
+    async with aclosing(trades) as stream:
+        async for trade in stream:
+            found = True
+            message = packer.add(trade)
+            if message:
+                await context.bot.send_message(chat_id=chat_id, text=message)
+    message = packer.flush()
+    if message:
+        await context.bot.send_message(chat_id=chat_id, text=message)
+    if not found:
          # Inform the user if no trades are found
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="No trades found for the given criteria."
-        )
-    else:
-        # Display each trade's details
-        for trade in trades:
-            trade_details = (
-                f"Trade ID: {trade['id']}\n"
-                f"Date: {trade['date']}\n"
-                f"Time: {trade['time']}\n"
-                f"Ticker: {trade['ticker']}\n"
-                f"Side: {trade['side']}\n"
-                # f"Status: {trade['status']}\n"
-                f"RR: {trade['rr']}\n"
-                f"PnL: {trade['pnl']}\n"
-                f"Strategy: {trade['strategy']}\n"
-            )
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=trade_details
-            )
+        await context.bot.send_message(chat_id=chat_id, text="No trades found for the given criteria.")
 
 
 async def date_range_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -212,8 +187,14 @@ async def date_range_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     Returns:
         int: Ends the conversation.
     """
-    date_range = update.message.text.split(' to ')
-    trades = trades_db.get_trades_by_date_range(date_range[0], date_range[1])
+    text = update.message.text.strip()
+    if text.upper() in PERIODS:
+        tz_name, session_start = get_period_settings(update, context)
+        period_range = resolve_period(text.upper(), tz_name, session_start)
+        date_range = [period_range.start_date, period_range.end_date]
+    else:
+        date_range = text.split(' to ')
+    trades = container.trades_db.aiter_trades_by_date_range(date_range[0], date_range[1])
     await display_trades(update, context, trades)
     return await  return_to_main_menu(update, context)
 
@@ -230,8 +211,8 @@ async def trade_id_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         int: Ends the conversation.S
     """
     trade_id = update.message.text
-    trade = trades_db.get_trade_by_id(trade_id)
-    await display_trades(update, context, [trade] if trade else [])
+    trade = container.trades_db.get_trade_by_id(trade_id)
+    await display_trades(update, context, _single(trade))
     return await  return_to_main_menu(update, context)
 
 
@@ -247,7 +228,7 @@ async def ticker_name_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         int: Ends the conversation.
     """
     ticker_name = update.message.text
-    trades = trades_db.get_trades_by_ticker(ticker_name)
+    trades = container.trades_db.aiter_trades_by_ticker(ticker_name)
     await display_trades(update, context, trades)
     return await  return_to_main_menu(update, context)
 
@@ -266,7 +247,7 @@ async def side_selection_handler(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
     side = query.data
-    trades = trades_db.get_trades_by_side(side)
+    trades = container.trades_db.aiter_trades_by_side(side)
     await display_trades(update, context, trades)
     return await return_to_main_menu(update, context)
 
@@ -285,7 +266,7 @@ async def status_selection_handler(update: Update, context: ContextTypes.DEFAULT
     query = update.callback_query
     await query.answer()
     status = query.data
-    trades = trades_db.get_trades_by_status(status)
+    trades = container.trades_db.aiter_trades_by_status(status)
     await display_trades(update, context, trades)
     return await return_to_main_menu(update, context)
 
@@ -0,0 +1,93 @@
+import asyncio
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.bot_management import restricted
+from utils.container import container
+from utils.render import MESSAGE_LIMIT, CONFIRM_REMOVE_DUPLICATES_KEYBOARD
+from database.dedup import find_duplicates
+
+
+def _extra_ids(groups):
+    """Every trade of the duplicate groups except the oldest one."""
+    return [trade_id for group in groups for trade_id in group[1:]]
+
+
+def _remove_duplicates(storage, confirmed_ids):
+    """
+    Removes the confirmed trades that are still duplicates, in one transaction.
+
+    The journal is scanned again first: a confirmed trade that was edited or whose group
+    lost its other trades meanwhile is no longer a duplicate and is kept.
+
+    Returns:
+        int: Number of trades removed.
+    """
+    extra_ids = set(_extra_ids(find_duplicates(storage)))
+    return storage.remove_trades_by_ids([trade_id for trade_id in confirmed_ids if trade_id in extra_ids])
+
+
+@restricted
+async def duplicates_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /duplicates command: scans the journal for near-duplicate trades (same
+    ticker, date, time and PnL) and lists them. `/duplicates remove` asks to confirm removing
+    all but the oldest trade of each group.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    remove = [arg.lower() for arg in context.args] == ['remove']
+    # The scan reads the whole table, so it runs off the event loop.
+    groups = await asyncio.get_running_loop().run_in_executor(None, find_duplicates, container.trades_db)
+
+    if not groups:
+        await update.message.reply_text("No duplicate trades found.")
+        return
+
+    if remove:
+        extra_ids = _extra_ids(groups)
+        # Only the trades shown here are removed, so later duplicates need a new confirmation.
+        context.user_data['duplicate_ids'] = extra_ids
+        await update.message.reply_text(
+            f"Remove {len(extra_ids)} duplicate trades, keeping the oldest of each group?",
+            reply_markup=CONFIRM_REMOVE_DUPLICATES_KEYBOARD
+        )
+        return
+
+    lines = [f"Found {len(groups)} groups of duplicate trades (same ticker, date, time and PnL):"]
+    for group in groups:
+        line = "IDs " + ", ".join(str(trade_id) for trade_id in group)
+        if sum(len(text) + 1 for text in lines) + len(line) > MESSAGE_LIMIT - 100:
+            lines.append("…")
+            break
+        lines.append(line)
+    lines.append("Send /duplicates remove to keep only the oldest trade of each group.")
+    await update.message.reply_text("\n".join(lines))
+
+
+@restricted
+async def remove_duplicates_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the buttons under the confirmation of `/duplicates remove`.
+
+    Args:
+        update (Update): The update object that contains the callback query.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    query = update.callback_query
+    await query.answer()
+    confirmed_ids = context.user_data.pop('duplicate_ids', None)
+
+    if query.data == 'cancel_remove_duplicates':
+        await query.edit_message_text("No trades were removed.")
+        return
+    if confirmed_ids is None:
+        await query.edit_message_text("This confirmation has expired. Send /duplicates remove again.")
+        return
+
+    # The rescan and the delete touch the whole table, so they run off the event loop.
+    removed = await asyncio.get_running_loop().run_in_executor(
+        None, _remove_duplicates, container.trades_db, confirmed_ids
+    )
+    await query.edit_message_text(f"Removed {removed} duplicate trades, keeping the oldest of each group.")
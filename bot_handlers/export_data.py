@@ -1,16 +1,17 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import asyncio
+from telegram import Update
 from telegram.ext import ConversationHandler, ContextTypes
 
-from database.database_management import TradeDatabase
+from utils.container import container
 from utils.bot_management import return_to_main_menu
 from utils.states_manager import ExportStates
-from datetime import datetime, timedelta
-import pandas as pd
-from io import BytesIO
-
-
-# Creating TradeDatabase instance
-trades_db = TradeDatabase()
+from utils.render import EXPORT_PERIOD_KEYBOARD, EXPORT_TICKER_KEYBOARD, ticker_keyboard
+from utils.rate_limiter import BULK
+from utils.jobs import JobCancelled, JobLimitExceeded
+from database.storage import CSV_HEADER
+from bot_handlers.settings_handler import get_period_settings
+from datetime import datetime
+from io import BytesIO, StringIO
 
 
 async def export_data_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -27,26 +28,10 @@ async def export_data_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     query = update.callback_query
     await query.answer()
 
-    # Create a keyboard with options for the date period
-    keyboard = [
-        [InlineKeyboardButton("1 Day", callback_data='1D')],
-        [InlineKeyboardButton("2 Days", callback_data='2D')],
-        [InlineKeyboardButton("3 Days", callback_data='3D')],
-        [InlineKeyboardButton("1 Week", callback_data='1W')],
-        [InlineKeyboardButton("2 Weeks", callback_data='2W')],
-        [InlineKeyboardButton("1 Month", callback_data='1M')],
-        [InlineKeyboardButton("2 Months", callback_data='2M')],
-        [InlineKeyboardButton("3 Months", callback_data='3M')],
-        [InlineKeyboardButton("6 Months", callback_data='6M')],
-        [InlineKeyboardButton("Custom Date Range", callback_data='custom')],
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     # Ask the user to choose the date period for export
     await query.edit_message_text(
         text="Please choose the date period for export:",
-        reply_markup=reply_markup
+        reply_markup=EXPORT_PERIOD_KEYBOARD
     )
     return ExportStates.EXPORT_PERIOD
 
@@ -74,12 +59,7 @@ async def export_data_period_handler(update: Update, context: ContextTypes.DEFAU
         return ExportStates.CUSTOM_DATE_RANGE
 
     # Ask for ticker or choose to export all trades
-    keyboard = [
-        [InlineKeyboardButton("All Trades", callback_data='all_trades')],
-        [InlineKeyboardButton("Choose Ticker", callback_data='choose_ticker')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.reply_text("Do you want to export trades for a specific ticker or all trades?", reply_markup=reply_markup)
+    await query.message.reply_text("Do you want to export trades for a specific ticker or all trades?", reply_markup=EXPORT_TICKER_KEYBOARD)
     return ExportStates.EXPORT_TICKER
 
 
@@ -100,27 +80,23 @@ async def export_ticker_handler(update: Update, context: ContextTypes.DEFAULT_TY
 
     if ticker == 'choose_ticker':
         # Retrieve all tickers from the database
-        tickers = trades_db.get_all_tickers()
+        tickers = container.trades_db.get_all_tickers()
 
         if not tickers:
             await query.message.reply_text("No tickers found in the database.")
             return await return_to_main_menu(update, context)
 
-        # Create a keyboard with ticker names
-        keyboard = [[InlineKeyboardButton(ticker, callback_data=ticker)] for ticker in tickers]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         # Ask the user to select a ticker
-        await query.message.reply_text("Please choose a ticker to export records:", reply_markup=reply_markup)
+        await query.message.reply_text("Please choose a ticker to export records:", reply_markup=ticker_keyboard(tickers))
         return ExportStates.CUSTOM_TICKER
 
     else:
         # Handle the 'all_trades' option
         period = context.user_data['period']
-        start_date, end_date = get_date_range_from_period(period)
-        trades = trades_db.get_trades_for_export(None, period, start_date=start_date, end_date=end_date)
-        await export_to_csv(update, context, trades, 'all_trades', period)
-        await query.message.reply_text("Data exported successfully.")
+        tz_name, session_start = get_period_settings(update, context)
+        if await export_trades(update, context, 'all_trades', period,
+                               period=period, tz_name=tz_name, session_start=session_start):
+            await query.message.reply_text("Data exported successfully.")
         return await return_to_main_menu(update, context)
 
 
@@ -140,11 +116,11 @@ async def handle_custom_ticker(update: Update, context: ContextTypes.DEFAULT_TYP
     ticker = query.data
 
     period = context.user_data.get('period')
-    start_date, end_date = get_date_range_from_period(period)
-    
-    trades = trades_db.get_trades_for_export(ticker, period, start_date=start_date, end_date=end_date)
-    await export_to_csv(update, context, trades, ticker, period)
-    await query.message.reply_text("Data exported successfully.")
+    tz_name, session_start = get_period_settings(update, context)
+
+    if await export_trades(update, context, ticker, period,
+                           ticker=ticker, period=period, tz_name=tz_name, session_start=session_start):
+        await query.message.reply_text("Data exported successfully.")
     return await  return_to_main_menu(update, context)
 
 
@@ -167,86 +143,154 @@ async def handle_custom_date_range(update: Update, context: ContextTypes.DEFAULT
         
         period = context.user_data['period']
         ticker = context.user_data.get('ticker', None)
-        trades = trades_db.get_trades_for_export(ticker, period, start_date=start_date, end_date=end_date)
-        await export_to_csv(update, context, trades, ticker if ticker else 'all_trades', period)
-        await update.message.reply_text("Data exported successfully.")
+        if await export_trades(update, context, ticker if ticker else 'all_trades', period,
+                               ticker=ticker, start_date=start_date, end_date=end_date):
+            await update.message.reply_text("Data exported successfully.")
     except ValueError:
         await update.message.reply_text("Invalid date range format. Please use YYYY-MM-DD to YYYY-MM-DD.")
     return await  return_to_main_menu(update, context)
 
 
-def get_date_range_from_period(period):
+async def export_trades(update: Update, context: ContextTypes.DEFAULT_TYPE, filename_prefix, period, **filters):
     """
-    Converts a given period into a start and end date range.
-    
+    Exports the trades matching `filters` to a CSV file and sends it to the user.
+
+    A PostgreSQL journal formats the file on the server with COPY, so no rows pass through
+    Python; otherwise the trades are read from the snapshot and the file is built as a job.
+
     Args:
-        period (str): The period string (e.g., '1D', '1W', '1M', etc.).
-    
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+        filename_prefix (str): The prefix for the filename.
+        period (str): The period for the export.
+        **filters: Filters of TradeStorage.get_trades_for_export.
+
     Returns:
-        tuple: A tuple containing the start and end dates as strings.
-    """
-
-    end_date = datetime.now()
-    if period == '1D':
-        start_date = end_date - timedelta(days=1)
-    elif period == '2D':
-        start_date = end_date - timedelta(days=2)
-    elif period == '3D':
-        start_date = end_date - timedelta(days=3)
-    elif period == '1W':
-        start_date = end_date - timedelta(weeks=1)
-    elif period == '2W':
-        start_date = end_date - timedelta(weeks=2)
-    elif period == '1M':
-        start_date = end_date - timedelta(days=30)
-    elif period == '2M':
-        start_date = end_date - timedelta(days=60)
-    elif period == '3M':
-        start_date = end_date - timedelta(days=90)
-    elif period == '6M':
-        start_date = end_date - timedelta(days=180)
-    else:
-        start_date = None  # Custom date range will be handled separately
+        bool: Whether the file was sent.
+    """
+    if container.uses_postgres:
+        return await export_with_copy(update, context, filename_prefix, period, **filters)
+    trades = await read_trade_batch(**filters)
+    return await export_to_csv(update, context, trades, filename_prefix, period)
+
+
+async def read_trade_batch(**filters):
+    """
+    Reads the trades of an export into a TradeBatch in a worker thread. The rows go
+    from the database cursor straight into the batch's columns, chunk by chunk, while the
+    event loop keeps serving other chats.
+
+    Args:
+        **filters: Filters of TradeStorage.get_trades_for_export.
+
+    Returns:
+        TradeBatch: The trades to export.
+    """
+    # to_thread rather than run_in_executor: it carries the context over, e.g. for /profile
+    return await asyncio.to_thread(container.snapshot_db.get_trade_batch, **filters)
+
+
+# Rows written between two progress reports of an export job.
+EXPORT_CHUNK_ROWS = 20000
+
+
+def build_csv(trades, progress):
+    """
+    Builds the CSV file of an export. Runs in the job process pool, off the event loop.
+
+    Args:
+        trades (TradeBatch): The trades to export, column by column.
+        progress (Progress): Reports progress and raises JobCancelled if the user cancelled.
+
+    Returns:
+        bytes: The CSV file.
+    """
+    df = trades.to_frame(CSV_HEADER)
 
-    return start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+    csv_buffer = BytesIO()
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        df.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(csv_buffer, index=False, header=start == 0)
+        progress(min(start + EXPORT_CHUNK_ROWS, len(df)), len(df), f"{len(df)} trades")
+    return csv_buffer.getvalue()
 
 
 async def export_to_csv(update: Update, context: ContextTypes.DEFAULT_TYPE, trades, filename_prefix, period):
     """
-    Exports the trades to a CSV file and sends it to the user.
+    Exports the trades to a CSV file and sends it to the user. The file is built as a
+    background job, so other chats are served meanwhile and the user can cancel it.
     
     Args:
         update (Update): The update object that contains the user's message.
         context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
-        trades (list): The list of trades to be exported.
+        trades (TradeBatch): The trades to be exported.
         filename_prefix (str): The prefix for the filename.
         period (str): The period for the export.
+
+    Returns:
+        bool: Whether the file was sent.
     """
+    chat_id = update.effective_chat.id
     if not trades:
         # Inform the user if no trades are found
-        await update.message.reply_text("No trades found for the selected criteria.")
-        return
+        await context.bot.send_message(chat_id=chat_id, text="No trades found for the selected criteria.")
+        return False
 
-    # Convert trades to a DataFrame and then to CSV
-    df = pd.DataFrame(trades)
+    try:
+        csv_file = await container.jobs.run(
+            context.bot, chat_id, update.effective_user.id, "CSV export", build_csv, trades
+        )
+    except JobLimitExceeded as e:
+        await context.bot.send_message(chat_id=chat_id, text=f"{e} Please wait until one finishes.")
+        return False
+    except JobCancelled:
+        return False
 
-    # If the dataframe is empy then inform the user.
-    if df.empty:
-        await update.message.reply_text("No trades found for the selected criteria.")
-        return
-    
-    # Add columns header to dataframe
-    cols = ['ID', 'Date', 'Time', 'Ticker', 'Status', 'Side', 'R:R Ratio', 'PnL', 'Strategy', 'Photo']
-    if not all(col in df.columns for col in cols):
-        df.columns = cols
+    await send_csv(context, chat_id, csv_file, filename_prefix, period)
+    return True
+
+
+def copy_trades_csv(**filters):
+    """
+    Writes the CSV file of an export with PostgresTradeDatabase.write_trades_csv (COPY).
+
+    Returns:
+        tuple: (number of trades, the CSV file as bytes)
+    """
+    buffer = StringIO()
+    count = container.trades_db.write_trades_csv(buffer, **filters)
+    return count, buffer.getvalue().encode()
+
+
+async def export_with_copy(update: Update, context: ContextTypes.DEFAULT_TYPE, filename_prefix, period, **filters):
+    """
+    Exports the trades of a PostgreSQL journal. The server streams the finished CSV, so
+    the file is written in a worker thread instead of a process pool job.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+        filename_prefix (str): The prefix for the filename.
+        period (str): The period for the export.
+        **filters: Filters of TradeStorage.get_trades_for_export.
+
+    Returns:
+        bool: Whether the file was sent.
+    """
+    chat_id = update.effective_chat.id
+    count, csv_file = await asyncio.to_thread(copy_trades_csv, **filters)
+    if not count:
+        await context.bot.send_message(chat_id=chat_id, text="No trades found for the selected criteria.")
+        return False
+
+    await send_csv(context, chat_id, csv_file, filename_prefix, period)
+    return True
 
-    csv_buffer = BytesIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_buffer.seek(0)
 
-    # Send the CSV file to the user
+async def send_csv(context: ContextTypes.DEFAULT_TYPE, chat_id, csv_file, filename_prefix, period):
+    """Sends an export's CSV file to the user in the bulk lane."""
     await context.bot.send_document(
-        chat_id=update.effective_chat.id,
-        document=csv_buffer,
-        filename=f'{filename_prefix}_{period}.csv'
+        chat_id=chat_id,
+        document=csv_file,
+        filename=f'{filename_prefix}_{period}.csv',
+        rate_limit_args={'priority': BULK}
     )
@@ -0,0 +1,43 @@
+import asyncio
+from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
+from telegram.ext import ContextTypes
+from utils.bot_management import logger, LIST_OF_ADMINS
+from utils.render import render_card
+from utils.container import container
+
+
+def _find_trades(query):
+    """Trades matching an inline query, most recent first."""
+    trade_index = container.trade_index
+    return trade_index.fetch(trade_index.search(query))
+
+
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Answers inline queries such as `@bot XAU long` or `@bot 125` with matching trades.
+    Every term is matched by prefix against ticker, strategy, side, status and trade id.
+
+    Args:
+        update (Update): The update object that contains the inline query.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    inline_query = update.inline_query
+
+    # Inline queries bypass the conversation, so apply the admin restriction here.
+    if inline_query.from_user.id not in LIST_OF_ADMINS:
+        logger.warning(f"Unauthorized inline query denied for {inline_query.from_user.id}.")
+        await inline_query.answer([], cache_time=60, is_personal=True)
+        return
+
+    # Searching and fetching touch the database while the index is still being built
+    trades = await asyncio.to_thread(_find_trades, inline_query.query)
+    results = [
+        InlineQueryResultArticle(
+            id=str(trade.id),
+            title=f"#{trade.id} {trade.ticker} {trade.side} {trade.win_loss}",
+            description=f"{trade.date} {trade.time} | {trade.strategy} | RR {trade.rr} | PnL {trade.pnl}",
+            input_message_content=InputTextMessageContent(render_card(trade)),
+        )
+        for trade in trades
+    ]
+    await inline_query.answer(results, cache_time=5, is_personal=True)
@@ -0,0 +1,20 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.container import container
+
+
+async def cancel_job_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the Cancel button under a background job's progress message.
+
+    Args:
+        update (Update): The update object that contains the callback query.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    query = update.callback_query
+    job_id = int(query.data.rsplit('_', 1)[1])
+
+    if container.jobs.cancel(job_id, query.from_user.id):
+        await query.answer("Cancelling...")
+    else:
+        await query.answer("This job has already finished.")
@@ -0,0 +1,124 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.bot_management import restricted
+from utils.container import container
+from analytics.risk_limits import RULES
+from bot_handlers.settings_handler import get_period_settings
+
+
+LIMITS_USAGE = (
+    "Usage: /limits [daily_loss=200] [max_trades=5] [max_losses=3] [weekly_target=1000] [lock=on]\n"
+    "Rules are checked after every saved trade. With lock=on, breaking a risk limit locks adding "
+    "trades until the next trading day. Remove a rule with e.g. max_trades=off, or all of them with /limits off."
+)
+
+
+def parse_limits_args(args, rules):
+    """
+    Applies the arguments of the /limits command to a user's current rules.
+
+    Args:
+        args (list): The command arguments.
+        rules (dict): The current rules.
+
+    Returns:
+        dict: The new rules.
+
+    Raises:
+        ValueError: If an argument is not a known rule with a positive number, 'on' or 'off'.
+    """
+    if [arg.lower() for arg in args] == ['off']:
+        return {}
+    rules = dict(rules)
+    for arg in args:
+        key, _, value = arg.partition('=')
+        key, value = key.lower(), value.lower()
+        if key == 'lock' and value in ('on', 'off'):
+            rules['lock'] = value == 'on'
+        elif key in RULES and value == 'off':
+            rules.pop(key, None)
+        elif key in RULES:
+            try:
+                threshold = float(value)
+            except ValueError:
+                threshold = 0
+            if threshold <= 0:
+                raise ValueError(f"{key} needs a positive number.")
+            rules[key] = threshold
+        else:
+            raise ValueError(f"Unknown argument {arg}.")
+    return rules
+
+
+def format_local(ts, tz_name):
+    """A UTC epoch as local date and time of the user."""
+    return datetime.fromtimestamp(ts, ZoneInfo(tz_name)).strftime('%Y-%m-%d %H:%M')
+
+
+def lock_notice(locked_until, tz_name):
+    return f"🔒 Adding trades is locked until {format_local(locked_until, tz_name)} ({tz_name})."
+
+
+def format_limits(rules, counters, locked_until, tz_name):
+    """Describes a user's rules, the current day and week, and the lock."""
+    lines = [f"{label}: {rules[rule]:g}" for rule, label in RULES.items() if rule in rules]
+    if not lines:
+        return "No goal or risk-limit rules set.\n" + LIMITS_USAGE
+    lines.append(f"Lock on breach: {'on' if rules.get('lock') else 'off'}")
+    lines.append("")
+    lines.append(f"Today: {counters.day_trades} trades, {counters.day_pnl:+.2f}. This week: {counters.week_pnl:+.2f}.")
+    if locked_until:
+        lines.append(lock_notice(locked_until, tz_name))
+    return "\n".join(lines)
+
+
+async def send_risk_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Checks the user's goal and risk-limit rules right after a trade was saved and sends
+    an alert for every newly broken rule, with the lock if one was applied.
+
+    Args:
+        update (Update): The update object of the saved trade.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    tz_name, session_start = get_period_settings(update, context)
+    alerts, locked_until = container.risk_monitor.evaluate(update.effective_user.id, tz_name, session_start)
+    if not alerts:
+        return
+    text = "\n".join(f"⚠️ {alert}" for alert in alerts)
+    if locked_until:
+        text += "\n\n" + lock_notice(locked_until, tz_name)
+    await context.bot.send_message(chat_id=update.effective_chat.id, text=text)
+
+
+@restricted
+async def limits_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /limits command: shows or sets the user's daily loss limit, max trades per
+    day, max consecutive losses and weekly profit target, e.g. `/limits daily_loss=200 lock=on`.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    user_id = update.effective_user.id
+    monitor = container.risk_monitor
+    tz_name, session_start = get_period_settings(update, context)
+
+    if context.args:
+        try:
+            rules = parse_limits_args(context.args, monitor.rules(user_id))
+        except ValueError as e:
+            await update.message.reply_text(f"{e}\n{LIMITS_USAGE}")
+            return
+        monitor.set_rules(user_id, rules)
+        if not rules:
+            await update.message.reply_text("All goal and risk-limit rules removed.")
+            return
+
+    counters = monitor.counters(tz_name, session_start)
+    await update.message.reply_text(
+        format_limits(monitor.rules(user_id), counters, monitor.locked_until(user_id), tz_name)
+    )
@@ -0,0 +1,155 @@
+from html import escape
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.ext import ContextTypes
+from utils.bot_management import restricted
+from utils.container import container
+from utils.render import MESSAGE_LIMIT
+from analytics.trade_cube import DIMENSIONS, METRICS
+from utils.periods import WEEKDAYS, parse_weekday
+
+
+MATRIX_USAGE = (
+    "Usage: /matrix [rows] [columns] [metric] [heatmap] [ticker=XAUUSD] [strategy=DHL] [side=Long] [weekday=Tue] [hour=9]\n"
+    f"Dimensions: {', '.join(DIMENSIONS)}. Metrics: {', '.join(METRICS)}.\n"
+    "Defaults: /matrix strategy hour expectancy"
+)
+
+# Heatmap squares from the lowest to the highest value.
+HEAT_LEVELS = ('🟥', '🟧', '🟨', '🟩')
+NO_DATA = '⬜'
+
+
+def _filter_value(dimension, value):
+    """Cube value of a filter: hours are numbers and weekdays are given by name (Mon … Sun)."""
+    if dimension == 'hour' and value.isdigit():
+        return int(value)
+    if dimension == 'weekday':
+        return parse_weekday(value)
+    return value
+
+
+def parse_matrix_args(args):
+    """
+    Parses the arguments of the /matrix command.
+
+    Args:
+        args (list): The command arguments.
+
+    Returns:
+        dict: 'rows', 'columns', 'metric', 'heatmap' and the dimension 'filters'.
+
+    Raises:
+        ValueError: If an argument is not a dimension, metric, filter or 'heatmap'.
+    """
+    dimensions, metric, heatmap, filters = [], 'expectancy', False, {}
+    for arg in args:
+        key, _, value = arg.partition('=')
+        key = key.lower()
+        if value:
+            if key not in DIMENSIONS:
+                raise ValueError(f"Unknown filter {arg}.")
+            filters[key] = _filter_value(key, value)
+        elif key in DIMENSIONS:
+            dimensions.append(key)
+        elif key in METRICS:
+            metric = key
+        elif key == 'heatmap':
+            heatmap = True
+        else:
+            raise ValueError(f"Unknown argument {arg}.")
+
+    if len(dimensions) > 2:
+        raise ValueError("Choose at most two dimensions.")
+    rows = dimensions[0] if dimensions else 'strategy'
+    columns = dimensions[1] if len(dimensions) > 1 else ('hour' if rows != 'hour' else 'strategy')
+    if rows == columns:
+        raise ValueError("Rows and columns must be different dimensions.")
+    return {'rows': rows, 'columns': columns, 'metric': metric, 'heatmap': heatmap, 'filters': filters}
+
+
+def _label(dimension, value):
+    if value is None:
+        return '-'
+    return WEEKDAYS[value] if dimension == 'weekday' else str(value)
+
+
+def _format_value(metric, value):
+    if value is None:
+        return ''
+    if metric == 'trades':
+        return str(value)
+    if metric == 'win_rate':
+        return f"{value:.0%}"
+    if metric == 'pnl':
+        return f"{value:+.0f}"
+    return f"{value:+.2f}"
+
+
+def _heat(value, low, high):
+    """Heatmap square of a value, scaled between the lowest and highest value of the matrix."""
+    if value is None:
+        return NO_DATA
+    position = (value - low) / (high - low) if high > low else 1.0
+    return HEAT_LEVELS[min(int(position * len(HEAT_LEVELS)), len(HEAT_LEVELS) - 1)]
+
+
+def format_matrix(pivot, options):
+    """Formats a TradeCube pivot as a monospaced table or heatmap, within the message limit."""
+    metric = options['metric']
+    title = f"{options['rows']} × {options['columns']}: {metric}"
+    if options['filters']:
+        title += " (" + ", ".join(f"{key}={_label(key, value)}" for key, value in options['filters'].items()) + ")"
+
+    rows = [_label(options['rows'], value) for value in pivot['rows']]
+    columns = [_label(options['columns'], value) for value in pivot['columns']]
+    row_width = max(len(label) for label in rows)
+    if options['heatmap']:
+        numbers = [value for row in pivot['values'] for value in row if value is not None]
+        low, high = (min(numbers), max(numbers)) if numbers else (0, 0)
+        # Column labels do not fit above single squares, so they are listed in order.
+        lines = [f"{options['columns']}: {' '.join(columns)}"]
+        lines += [f"{label.ljust(row_width)} {''.join(_heat(value, low, high) for value in values)}"
+                  for label, values in zip(rows, pivot['values'])]
+        legend = (f"{HEAT_LEVELS[0]} {_format_value(metric, low)} … {HEAT_LEVELS[-1]} {_format_value(metric, high)}, "
+                  f"{NO_DATA} no trades")
+    else:
+        cells = [[_format_value(metric, value) for value in values] for values in pivot['values']]
+        width = max([len(label) for label in columns] + [len(cell) for row in cells for cell in row])
+        lines = [' ' * row_width + ' ' + ' '.join(label.rjust(width) for label in columns)]
+        lines += [f"{label.ljust(row_width)} " + ' '.join(cell.rjust(width) for cell in row)
+                  for label, row in zip(rows, cells)]
+        legend = ""
+
+    head = f"<b>{escape(title)}</b>\n"
+    tail = f"\n{legend}" if legend else ""
+    body = ""
+    for line in lines:
+        if len(head) + len(body) + len(line) + len(tail) + 20 > MESSAGE_LIMIT:
+            body += "…\n"
+            break
+        body += escape(line) + "\n"
+    return f"{head}<pre>{body}</pre>{tail}"
+
+
+@restricted
+async def matrix_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /matrix command: a 2-D pivot of the journal (e.g. strategy by hour of day)
+    answered from the in-memory trade cube, rendered as a table or a heatmap.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    try:
+        options = parse_matrix_args(context.args)
+    except ValueError as e:
+        await update.message.reply_text(f"{e}\n{MATRIX_USAGE}")
+        return
+
+    pivot = container.trade_cube.pivot(options['rows'], options['columns'], options['metric'], **options['filters'])
+    if not pivot['rows']:
+        await update.message.reply_text("No trades found for the selected criteria.")
+        return
+    await update.message.reply_text(format_matrix(pivot, options), parse_mode=ParseMode.HTML)
@@ -0,0 +1,112 @@
+from html import escape
+
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.ext import ContextTypes
+from utils.bot_management import restricted
+from utils.container import container
+
+
+PROFILE_USAGE = (
+    "Usage: /profile [N]\n"
+    "/profile 20 profiles the next 20 updates and sends per-handler and per-database-method "
+    "timings with a flame graph file; /profile stop ends a running profile early."
+)
+
+DEFAULT_UPDATES = 20
+MAX_UPDATES = 1000
+
+# Rows shown per table; the flame graph file has the rest.
+TOP_ROWS = 12
+
+
+def parse_profile_args(args):
+    """
+    Parses the arguments of the /profile command.
+
+    Args:
+        args (list): The command arguments.
+
+    Returns:
+        int: Number of updates to profile, or None for 'stop'.
+
+    Raises:
+        ValueError: If the argument is neither 'stop' nor a number of updates.
+    """
+    if not args:
+        return DEFAULT_UPDATES
+    if len(args) == 1 and args[0].lower() == 'stop':
+        return None
+    if len(args) == 1 and args[0].isdigit() and 1 <= int(args[0]) <= MAX_UPDATES:
+        return int(args[0])
+    raise ValueError(f"Please give a number of updates between 1 and {MAX_UPDATES}.")
+
+
+def format_profile(session):
+    """Describes where the profiled updates spent their time, slowest handlers and methods first."""
+    profiled = session.updates - max(session.remaining, 0)
+    lines = [f"{'handler':<36}{'calls':>6}{'total':>8}{'db':>7}{'api':>7}{'other':>7}{'max':>7}"]
+    handlers = sorted(session.handlers.items(), key=lambda item: item[1].total, reverse=True)
+    for name, timing in handlers[:TOP_ROWS]:
+        other = timing.total - timing.db - timing.api
+        lines.append(f"{name[:35]:<36}{timing.calls:>6}" + ''.join(
+            f"{value * 1000:>{width}.0f}" for value, width in
+            ((timing.total, 8), (timing.db, 7), (timing.api, 7), (max(other, 0), 7), (timing.max, 7))))
+    lines += ['', f"{'database method / Bot API':<43}{'calls':>6}{'total':>8}{'max':>7}"]
+    methods = sorted(session.methods.items(), key=lambda item: item[1].total, reverse=True)
+    for name, timing in methods[:TOP_ROWS]:
+        lines.append(f"{name[:42]:<43}{timing.calls:>6}{timing.total * 1000:>8.0f}{timing.max * 1000:>7.0f}")
+    return (f"<b>Profile of {profiled} updates in {session.elapsed:.2f}s</b>, {session.samples} stack samples\n"
+            f"<pre>{escape(chr(10).join(lines))}</pre>\n"
+            "Times in ms. db: trade database calls, api: Bot API requests including rate-limit waits.")
+
+
+async def send_profile(bot, chat_id, session):
+    """Sends the profile summary and the collapsed stacks to the admin who asked for it."""
+    await bot.send_message(chat_id=chat_id, text=format_profile(session), parse_mode=ParseMode.HTML)
+    if session.samples:
+        await bot.send_document(
+            chat_id=chat_id,
+            document=session.collapsed_stacks().encode(),
+            filename='profile.folded',
+            caption="Collapsed stacks: open in speedscope.app or render with flamegraph.pl."
+        )
+
+
+@restricted
+async def profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /profile command: profiles the next N updates handled by the bot and
+    reports the time per handler and per trade database method, with the sampled stacks
+    as a flame graph file. `/profile stop` ends a running profile and reports it.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    try:
+        updates = parse_profile_args(context.args)
+    except ValueError as e:
+        await update.message.reply_text(f"{e}\n{PROFILE_USAGE}")
+        return
+
+    profiler = container.profiler
+    if updates is None:
+        session = profiler.session
+        if session is None:
+            await update.message.reply_text("No profile is running.")
+            return
+        profiler.stop()
+        await session.on_done(session)
+        return
+
+    chat_id = update.effective_chat.id
+
+    async def on_done(session):
+        await send_profile(context.bot, chat_id, session)
+
+    if not profiler.start(context.application, updates, on_done):
+        await update.message.reply_text(
+            f"A profile is already running ({profiler.session.remaining} updates left); /profile stop ends it.")
+        return
+    await update.message.reply_text(f"Profiling the next {updates} updates.")
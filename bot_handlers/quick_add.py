@@ -0,0 +1,283 @@
+import re
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.bot_management import is_valid_date, is_valid_time, restricted
+from utils.container import container
+from database.storage import message_source_key
+from bot_handlers.add_trade import trade_saved_text
+from bot_handlers.limits_handler import lock_notice, send_risk_alerts
+from bot_handlers.settings_handler import get_period_settings
+
+
+QUICK_ADD_USAGE = (
+    "Usage: /add <ticker> <W|L> <L|S> <strategy> <rr> <pnl> [YYYY-MM-DD] [HH:MM]\n"
+    "e.g. /add XAUUSD W L DHL 2.5 120 2024-08-13 14:30\n"
+    "Send the same line as a photo caption to attach the screenshot. Missing fields are kept "
+    "as a draft until you send them; fix a field with e.g. pnl=-40, or drop the draft with /add discard."
+)
+
+# Trade fields in the order of the quick-add line; date and time default to now.
+FIELDS = ('ticker', 'win_loss', 'side', 'strategy', 'rr', 'pnl', 'date', 'time')
+REQUIRED = FIELDS[:6]
+
+FIELD_ALIASES = {'status': 'win_loss', 'result': 'win_loss', 'setup': 'strategy', 'r': 'rr'}
+
+STATUS_WORDS = {'w': 'Win', 'win': 'Win', 'loss': 'Loss'}
+SIDE_WORDS = {'long': 'Long', 'buy': 'Long', 's': 'Short', 'short': 'Short', 'sell': 'Short'}
+STRATEGIES = {name.lower(): name for name in ('DHL', 'Close_NYSE', 'MTR', 'FF')}
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+TIME_PATTERN = re.compile(r'^\d{2}:\d{2}$')
+RATIO_PATTERN = re.compile(r'^\d+(\.\d+)?:\d+(\.\d+)?$')
+TICKER_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9._/-]*$')
+
+DRAFT_SETTING = 'trade_draft'
+
+
+def _number(token):
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def _parse_field(field, value):
+    """Validates an explicit `field=value` token. Returns the stored value or raises ValueError."""
+    lowered = value.lower()
+    if field == 'ticker' and TICKER_PATTERN.match(value):
+        return value.upper()
+    if field == 'win_loss' and (lowered in STATUS_WORDS or lowered == 'l'):
+        return STATUS_WORDS.get(lowered, 'Loss')
+    if field == 'side' and (lowered in SIDE_WORDS or lowered == 'l'):
+        return SIDE_WORDS.get(lowered, 'Long')
+    if field == 'strategy' and lowered in STRATEGIES:
+        return STRATEGIES[lowered]
+    if field == 'rr' and (RATIO_PATTERN.match(value) or (_number(value) or 0) > 0):
+        return value
+    if field == 'pnl' and _number(value) is not None:
+        return value
+    if field == 'date' and DATE_PATTERN.match(value) and is_valid_date(value):
+        return value
+    if field == 'time' and TIME_PATTERN.match(value) and is_valid_time(value):
+        return value
+    raise ValueError(f"Invalid {field} {value}.")
+
+
+def parse_quick_add(tokens, draft=None):
+    """
+    Parses a quick-add line in one pass, on top of an existing draft.
+
+    Tokens are recognised by their shape rather than their position, so a draft can be
+    completed in any order: dates, HH:MM times, W/Win/Loss, Long/Short/Buy/Sell/S, known
+    strategies and R:R ratios like 1:2.5 are unambiguous. `L` is the status (Loss) while
+    the status is still unknown and the side (Long) afterwards, which reads
+    `XAUUSD W L ...` and `XAUUSD L L ...` as written. Bare numbers fill rr and then pnl,
+    preferring fields the draft does not have yet, and any other word is the ticker.
+    `field=value` tokens set a field explicitly.
+
+    The draft's fields count as known, so `L` completing a draft that has a status is the side:
+
+    >>> parse_quick_add(['L'], {'ticker': 'XAUUSD', 'win_loss': 'Win'})
+    ({'ticker': 'XAUUSD', 'win_loss': 'Win', 'side': 'Long'}, [])
+    >>> parse_quick_add(['XAUUSD', 'L', 'L'])
+    ({'ticker': 'XAUUSD', 'win_loss': 'Loss', 'side': 'Long'}, [])
+
+    Args:
+        tokens (list): The words of the line.
+        draft (dict): Fields collected from earlier messages.
+
+    Returns:
+        tuple: (fields, errors) where fields merges the draft with this line.
+    """
+    fields, errors, numbers, given = dict(draft or {}), [], [], set()
+
+    def assign(field, value):
+        if field in given:
+            errors.append(f"{field} given twice.")
+        given.add(field)
+        fields[field] = value
+
+    for token in tokens:
+        key, _, value = token.partition('=')
+        lowered = token.lower()
+        if value:
+            field = FIELD_ALIASES.get(key.lower(), key.lower())
+            if field not in FIELDS:
+                errors.append(f"Unknown field {key}.")
+                continue
+            try:
+                assign(field, _parse_field(field, value))
+            except ValueError as e:
+                errors.append(str(e))
+        elif DATE_PATTERN.match(token):
+            if is_valid_date(token):
+                assign('date', token)
+            else:
+                errors.append(f"Invalid date {token}.")
+        elif TIME_PATTERN.match(token):
+            if is_valid_time(token):
+                assign('time', token)
+            else:
+                errors.append(f"Invalid time {token}.")
+        elif lowered in STATUS_WORDS or (lowered == 'l' and 'win_loss' not in fields):
+            assign('win_loss', STATUS_WORDS.get(lowered, 'Loss'))
+        elif lowered in SIDE_WORDS or lowered == 'l':
+            assign('side', SIDE_WORDS.get(lowered, 'Long'))
+        elif lowered in STRATEGIES:
+            assign('strategy', STRATEGIES[lowered])
+        elif RATIO_PATTERN.match(token):
+            assign('rr', token)
+        elif _number(token) is not None:
+            numbers.append(token)
+        elif TICKER_PATTERN.match(token):
+            assign('ticker', token.upper())
+        else:
+            errors.append(f"Unrecognized value {token}.")
+
+    # Missing fields first, so a draft with rr and a single number completes its pnl.
+    slots = [field for field in ('rr', 'pnl') if field not in given]
+    slots.sort(key=lambda field: field in (draft or {}))
+    if len(numbers) > len(slots):
+        errors.append(f"Too many numbers: {' '.join(numbers)}.")
+    for field, token in zip(slots, numbers):
+        if field == 'rr' and _number(token) <= 0:
+            errors.append(f"Invalid rr {token}.")
+        fields[field] = token
+    return fields, errors
+
+
+def missing_fields(fields):
+    """Required fields not collected yet. A date without a time is incomplete."""
+    missing = [field for field in REQUIRED if field not in fields]
+    if 'date' in fields and 'time' not in fields:
+        missing.append('time')
+    return missing
+
+
+def _load_draft(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """The user's draft, loaded from the database once and cached in `context.user_data`."""
+    if DRAFT_SETTING not in context.user_data:
+        settings = container.trades_db.get_user_settings(update.effective_user.id)
+        context.user_data[DRAFT_SETTING] = json.loads(settings[DRAFT_SETTING]) if DRAFT_SETTING in settings else None
+    return context.user_data[DRAFT_SETTING]
+
+
+def _store_draft(update: Update, context: ContextTypes.DEFAULT_TYPE, draft):
+    user_id = update.effective_user.id
+    if draft is None:
+        container.trades_db.delete_user_setting(user_id, DRAFT_SETTING)
+    else:
+        container.trades_db.set_user_setting(user_id, DRAFT_SETTING, json.dumps(draft))
+    context.user_data[DRAFT_SETTING] = draft
+
+
+def _describe(fields):
+    text = " ".join(f"{field}={fields[field]}" for field in FIELDS if field in fields) or "no fields"
+    return text + (" + screenshot" if fields.get('picture') else "")
+
+
+async def quick_add(update: Update, context: ContextTypes.DEFAULT_TYPE, tokens, photo=None):
+    """
+    Applies a quick-add line (and optional screenshot) to the user's draft. A complete
+    trade is saved right away with a single write; an incomplete one is saved as the draft.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+        tokens (list): The words of the line.
+        photo (str): File id of the attached screenshot, if any.
+    """
+    draft = _load_draft(update, context)
+    if [token.lower() for token in tokens] == ['discard']:
+        if draft is not None:
+            _store_draft(update, context, None)
+        await update.message.reply_text("Draft discarded.")
+        return
+    if not tokens and photo is None:
+        text = f"Current draft: {_describe(draft)}\n\n" if draft else ""
+        await update.message.reply_text(text + QUICK_ADD_USAGE)
+        return
+
+    fields, errors = parse_quick_add(tokens, draft)
+    if errors:
+        await update.message.reply_text("\n".join(errors) + f"\n\n{QUICK_ADD_USAGE}")
+        return
+    if photo is not None:
+        fields['picture'] = photo
+
+    missing = missing_fields(fields)
+    if missing:
+        _store_draft(update, context, fields)
+        await update.message.reply_text(
+            f"Draft saved: {_describe(fields)}\nStill missing: {', '.join(missing)}. Send them with /add."
+        )
+        return
+
+    tz_name, _ = get_period_settings(update, context)
+    locked_until = container.risk_monitor.locked_until(update.effective_user.id)
+    if locked_until:
+        _store_draft(update, context, fields)
+        await update.message.reply_text(f"{lock_notice(locked_until, tz_name)}\nYour entry was kept as a draft.")
+        return
+    if 'date' not in fields:
+        now = datetime.now(ZoneInfo(tz_name))
+        fields['date'] = now.strftime('%Y-%m-%d')
+        fields.setdefault('time', now.strftime('%H:%M'))
+
+    trade_id = container.trades_db.save_trade(
+        date=fields['date'],
+        time=fields['time'],
+        ticker=fields['ticker'],
+        win_loss=fields['win_loss'],
+        side=fields['side'],
+        rr=fields['rr'],
+        pnl=fields['pnl'],
+        strategy=fields['strategy'],
+        picture=fields.get('picture'),
+        tz_name=tz_name,
+        source_key=message_source_key(update.message))
+    if trade_id is None:
+        await update.message.reply_text("The trade could not be saved. Your entry was kept as a draft.")
+        _store_draft(update, context, fields)
+        return
+    if draft is not None:
+        _store_draft(update, context, None)
+
+    await update.message.reply_text(trade_saved_text(trade_id, fields['strategy']))
+    await send_risk_alerts(update, context)
+
+
+@restricted
+async def quick_add_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /add command: records a trade from a single line, e.g.
+    `/add XAUUSD W L DHL 2.5 120 2024-08-13 14:30`.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    await quick_add(update, context, context.args)
+
+
+@restricted
+async def photo_caption_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles a screenshot sent outside the add-trade conversation. Its caption is read as a
+    quick-add line (a leading /add is optional); without a caption the photo is attached
+    to the current draft.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    tokens = (update.message.caption or '').split()
+    if tokens and tokens[0].lower().split('@')[0] == '/add':
+        tokens = tokens[1:]
+    if not tokens and _load_draft(update, context) is None:
+        await update.message.reply_text(f"Add a caption to record this screenshot as a trade.\n{QUICK_ADD_USAGE}")
+        return
+    await quick_add(update, context, tokens, photo=update.message.photo[-1].file_id)
@@ -0,0 +1,83 @@
+import calendar
+from datetime import datetime
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.bot_management import restricted
+from utils.container import container
+from utils.rate_limiter import BULK
+from utils.jobs import JobCancelled, JobLimitExceeded
+from analytics.journal_report import IMAGE_BUDGET, build_journal_pdf, report_order
+
+
+REPORT_USAGE = "Usage: /report [YYYY-MM], defaults to the current month."
+
+
+def parse_report_month(args):
+    """
+    Parses the optional month argument of the /report command.
+
+    Args:
+        args (list): The command arguments.
+
+    Returns:
+        tuple: (month as YYYY-MM, first day, last day) of the report.
+
+    Raises:
+        ValueError: If the argument is not a YYYY-MM month.
+    """
+    if len(args) > 1:
+        raise ValueError("Too many arguments.")
+    month = datetime.strptime(args[0], '%Y-%m') if args else datetime.now().replace(day=1)
+    last_day = calendar.monthrange(month.year, month.month)[1]
+    return month.strftime('%Y-%m'), month.strftime('%Y-%m-01'), month.replace(day=last_day).strftime('%Y-%m-%d')
+
+
+@restricted
+async def report_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /report command: builds a PDF journal of one month with summary statistics,
+    the equity curve, a per-strategy breakdown and every trade with its screenshot.
+
+    Both steps run as one background job that reports progress and can be cancelled:
+    screenshots are downloaded and downscaled into the image cache, up to the report's
+    image budget, and then the PDF is rendered page by page in the process pool.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    try:
+        month, start_date, end_date = parse_report_month(context.args)
+    except ValueError:
+        await update.message.reply_text(REPORT_USAGE)
+        return
+
+    trades = [trade async for trade in container.snapshot_db.aiter_trades_for_export(start_date=start_date,
+                                                                                    end_date=end_date)]
+    if not trades:
+        await update.message.reply_text(f"No trades found for {month}.")
+        return
+
+    trades = report_order(trades)
+
+    async def fetch_images(progress):
+        return (await container.image_cache.fetch_all(context.bot, trades, IMAGE_BUDGET, progress),)
+
+    chat_id = update.effective_chat.id
+    try:
+        pdf_file = await container.jobs.run(
+            context.bot, chat_id, update.effective_user.id, "PDF report",
+            build_journal_pdf, trades, f"Trading journal {month}", prepare=fetch_images
+        )
+    except JobLimitExceeded as e:
+        await update.message.reply_text(f"{e} Please wait until one finishes.")
+        return
+    except JobCancelled:
+        return
+
+    await context.bot.send_document(
+        chat_id=chat_id,
+        document=pdf_file,
+        filename=f'journal_{month}.pdf',
+        rate_limit_args={'priority': BULK}
+    )
@@ -0,0 +1,67 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.bot_management import is_valid_time, restricted
+from utils.container import container
+
+
+DEFAULT_TIMEZONE = 'UTC'
+DEFAULT_SESSION_START = '00:00'
+
+
+def get_period_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Returns the user's timezone and trading-session start, loading them from the
+    database once and caching them in `context.user_data` afterwards.
+
+    Args:
+        update (Update): The update object of the current request.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+
+    Returns:
+        tuple: (timezone name, session start as HH:MM).
+    """
+    if 'tz_name' not in context.user_data:
+        settings = container.trades_db.get_user_settings(update.effective_user.id)
+        context.user_data['tz_name'] = settings.get('timezone', DEFAULT_TIMEZONE)
+        context.user_data['session_start'] = settings.get('session_start', DEFAULT_SESSION_START)
+    return context.user_data['tz_name'], context.user_data['session_start']
+
+
+@restricted
+async def timezone_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /timezone command, e.g. `/timezone America/New_York 17:00`.
+    The optional second argument is the local time at which the trading day starts.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    if not context.args:
+        tz_name, session_start = get_period_settings(update, context)
+        await update.message.reply_text(
+            f"Timezone: {tz_name}, trading day starts at {session_start}.\n"
+            "Usage: /timezone <Area/City> [HH:MM]"
+        )
+        return
+
+    tz_name = context.args[0]
+    session_start = context.args[1] if len(context.args) > 1 else DEFAULT_SESSION_START
+
+    try:
+        ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        await update.message.reply_text(f"Unknown timezone {tz_name}. Use a name like Europe/London.")
+        return
+    if not is_valid_time(session_start):
+        await update.message.reply_text("Invalid session start. Please use HH:MM format.")
+        return
+
+    user_id = update.effective_user.id
+    container.trades_db.set_user_setting(user_id, 'timezone', tz_name)
+    container.trades_db.set_user_setting(user_id, 'session_start', session_start)
+    context.user_data['tz_name'] = tz_name
+    context.user_data['session_start'] = session_start
+
+    await update.message.reply_text(f"Timezone set to {tz_name}, trading day starts at {session_start}.")
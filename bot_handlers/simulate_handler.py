@@ -0,0 +1,121 @@
+import asyncio
+from functools import partial
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.bot_management import restricted
+from utils.periods import PERIODS
+from utils.container import container
+from bot_handlers.settings_handler import get_period_settings
+
+
+# Accepted /simulate options and how to parse them.
+SIMULATE_OPTIONS = {
+    'ticker': str,
+    'strategy': str,
+    'period': str.upper,
+    'paths': int,
+    'trades': int,
+    'risk': float,
+    'ruin': float,
+    'seed': int,
+}
+
+# Upper bound of paths x trades, which sets the simulation's time and memory.
+SIMULATE_MAX_STEPS = 10_000_000
+
+SIMULATE_USAGE = (
+    "Usage: /simulate [ticker=XAUUSD] [strategy=DHL] [period=3M] "
+    "[paths=10000] [trades=100] [risk=1] [ruin=50] [seed=42]"
+)
+
+
+def parse_simulate_args(args):
+    """
+    Parses `key=value` arguments of the /simulate command.
+
+    Args:
+        args (list): The command arguments.
+
+    Returns:
+        dict: Parsed options.
+
+    Raises:
+        ValueError: If an option is unknown or has an invalid value.
+    """
+    options = {}
+    for arg in args:
+        key, _, value = arg.partition('=')
+        key = key.lower()
+        if key not in SIMULATE_OPTIONS or not value:
+            raise ValueError(f"Unknown option {arg}.")
+        options[key] = SIMULATE_OPTIONS[key](value)
+
+    if options.get('period') and options['period'] not in PERIODS:
+        raise ValueError(f"Unknown period {options['period']}.")
+    if not 0 < options.get('paths', 1) <= 100000 or not 0 < options.get('trades', 1) <= 5000:
+        raise ValueError("paths must be 1-100000 and trades 1-5000.")
+    if options.get('paths', 10000) * options.get('trades', 100) > SIMULATE_MAX_STEPS:
+        raise ValueError(f"paths × trades must be at most {SIMULATE_MAX_STEPS:,}.")
+    if not 0 < options.get('risk', 1) < 100 or not 0 < options.get('ruin', 1) <= 100:
+        raise ValueError("risk and ruin are percentages between 0 and 100.")
+    return options
+
+
+def format_simulation(result):
+    """Formats the statistics returned by run_simulation as a message."""
+    drawdown = result['drawdown_pct']
+    streak = result['losing_streak']
+    returns = result['return_pct']
+    return (
+        f"🎲 Monte Carlo: {result['paths']} paths × {result['horizon']} trades\n"
+        f"Sampled from {result['trades']} trades, expectancy {result['expectancy_r']:+.2f}R, "
+        f"risk {result['risk_pct']}% per trade, seed {result['seed']}\n\n"
+        f"Max drawdown: median {drawdown[50]:.1f}%, 90th {drawdown[90]:.1f}%, "
+        f"95th {drawdown[95]:.1f}%, 99th {drawdown[99]:.1f}%\n"
+        f"Risk of ruin (-{result['ruin_pct']}%): {result['risk_of_ruin_pct']:.2f}%\n"
+        f"Longest losing streak: median {streak[50]}, 95th {streak[95]}, 99th {streak[99]}\n"
+        f"Return: 5th {returns[5]:+.1f}%, median {returns[50]:+.1f}%, 95th {returns[95]:+.1f}%"
+    )
+
+
+@restricted
+async def simulate_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the /simulate command: bootstraps equity paths from the journal's R-multiples
+    and reports drawdown percentiles, risk of ruin and losing-streak distribution.
+
+    Args:
+        update (Update): The update object that contains the user's message.
+        context (ContextTypes.DEFAULT_TYPE): The context object for the conversation.
+    """
+    # numpy is only needed here, so the simulator is imported on first use
+    from analytics.monte_carlo import run_simulation
+
+    try:
+        options = parse_simulate_args(context.args)
+    except ValueError as e:
+        await update.message.reply_text(f"{e}\n{SIMULATE_USAGE}")
+        return
+
+    tz_name, session_start = get_period_settings(update, context)
+    job = partial(
+        run_simulation,
+        container.trades_db,
+        ticker=options.get('ticker'),
+        strategy=options.get('strategy'),
+        period=options.get('period'),
+        tz_name=tz_name,
+        session_start=session_start,
+        n_paths=options.get('paths', 10000),
+        horizon=options.get('trades', 100),
+        risk_pct=options.get('risk', 1.0),
+        ruin_pct=options.get('ruin', 50.0),
+        seed=options.get('seed', 42),
+    )
+    # Keep the event loop free while the worker processes crunch the paths.
+    result = await asyncio.get_running_loop().run_in_executor(None, job)
+
+    if result is None:
+        await update.message.reply_text("No trades found for the selected criteria.")
+        return
+    await update.message.reply_text(format_simulation(result))
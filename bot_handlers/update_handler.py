@@ -1,9 +1,17 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.error import BadRequest
-from database.database_management import TradeDatabase
+from utils.container import container
 from utils.states_manager import UpdateTradesState
 from utils.bot_management import return_to_main_menu
+from utils.render import (
+    UPDATE_MENU_KEYBOARD,
+    UPDATE_FIELD_KEYBOARD,
+    UPDATE_STATUS_KEYBOARD,
+    UPDATE_SIDE_KEYBOARD,
+    UPDATE_STRATEGY_KEYBOARD,
+    CONFIRM_REMOVE_ALL_KEYBOARD,
+    )
 
 
 
@@ -23,16 +31,10 @@ async def start_update_trade(update: Update, context: ContextTypes.DEFAULT_TYPE)
     query = update.callback_query
     await query.answer()
 
-    keyboard = [
-        [InlineKeyboardButton("🗃️ Update a Trade", callback_data="update_trade_by_id")],
-        [InlineKeyboardButton("✐ Remove a Trade", callback_data='remove_trade')],
-        [InlineKeyboardButton("💀 Remove Whole Database", callback_data='remove_all_data')]
-    ]
     # Display the keyboard to the user.
-    repyly_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(
         text = "What Would You Like To Do?",
-        reply_markup=repyly_markup
+        reply_markup=UPDATE_MENU_KEYBOARD
     )
     return UpdateTradesState.UPDATE_CHOICE
 
@@ -65,7 +67,7 @@ async def update_trade_by_id_handler(update: Update, context: ContextTypes.DEFAU
         int: The next state in the conversation (UPDATE_FIELD_CHOICE or TRADE_ID).
     """
     trade_id = update.message.text
-    trades_db = TradeDatabase()
+    trades_db = container.trades_db
 
     try:
         trade = trades_db.get_trade_by_id(trade_id)
@@ -77,13 +79,7 @@ async def update_trade_by_id_handler(update: Update, context: ContextTypes.DEFAU
         context.user_data['trade_id'] = trade_id
         await update.message.reply_text(
             "Trade found, What would you like to update?",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("Ticker", callback_data='update_ticker')],
-                [InlineKeyboardButton("Status", callback_data='update_status')],
-                [InlineKeyboardButton("Side", callback_data='update_side')],
-                [InlineKeyboardButton("Strategy", callback_data='update_strategy')],
-                [InlineKeyboardButton("Cancel", callback_data='cancel_update')]
-            ])
+            reply_markup=UPDATE_FIELD_KEYBOARD
         )
         return UpdateTradesState.UPDATE_FIELD_CHOICE
     else:
@@ -115,32 +111,15 @@ async def update_field_choice_handler(update: Update, context: ContextTypes.DEFA
         return UpdateTradesState.UPDATE_TICKER
 
     elif field == 'status':
-        keyboard = [
-            [InlineKeyboardButton("Win", callback_data='update_status_Win')],
-            [InlineKeyboardButton("Loss", callback_data='update_status_Loss')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.reply_text("Select the new status:", reply_markup=reply_markup)
+        await query.message.reply_text("Select the new status:", reply_markup=UPDATE_STATUS_KEYBOARD)
         return UpdateTradesState.UPDATE_STATUS
 
     elif field == 'side':
-        keyboard = [
-            [InlineKeyboardButton("Long", callback_data='update_side_Long')],
-            [InlineKeyboardButton("Short", callback_data='update_side_Short')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.reply_text("Select the new side:", reply_markup=reply_markup)
+        await query.message.reply_text("Select the new side:", reply_markup=UPDATE_SIDE_KEYBOARD)
         return UpdateTradesState.UPDATE_SIDE
 
     elif field == 'strategy':
-        keyboard = [
-            [InlineKeyboardButton("DHL", callback_data='update_strategy_DHL')],
-            [InlineKeyboardButton("Close_NYSE", callback_data='update_strategy_Close_NYSE')],
-            [InlineKeyboardButton("MTR", callback_data='update_strategy_MTR')],
-            [InlineKeyboardButton("FF", callback_data='update_strategy_FF')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.reply_text("Select the new strategy:", reply_markup=reply_markup)
+        await query.message.reply_text("Select the new strategy:", reply_markup=UPDATE_STRATEGY_KEYBOARD)
         return UpdateTradesState.UPDATE_STRATEGY
     else:
         return await return_to_main_menu(update, context)
@@ -159,7 +138,7 @@ async def update_ticker_handler(update: Update, context: ContextTypes.DEFAULT_TY
     """
     new_ticker = update.message.text
     trade_id = context.user_data['trade_id']
-    trades_db = TradeDatabase()
+    trades_db = container.trades_db
     
     try:
         trades_db.update_trade(trade_id, ticker=new_ticker)
@@ -186,7 +165,7 @@ async def update_status_handler(update: Update, context: ContextTypes.DEFAULT_TY
     
     new_status = query.data.split('_')[-1]
     trade_id = context.user_data['trade_id']
-    trades_db = TradeDatabase()
+    trades_db = container.trades_db
     
     try:
         trades_db.update_trade(trade_id, win_loss=new_status)
@@ -213,7 +192,7 @@ async def update_side_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     new_side = query.data.split('_')[-1]
     trade_id = context.user_data['trade_id']
-    trades_db = TradeDatabase()
+    trades_db = container.trades_db
     
     try:
         trades_db.update_trade(trade_id, side=new_side)
@@ -240,7 +219,7 @@ async def update_strategy_handler(update: Update, context: ContextTypes.DEFAULT_
     
     new_strategy = query.data.split('_')[-1]
     trade_id = context.user_data['trade_id']
-    trades_db = TradeDatabase()
+    trades_db = container.trades_db
     
     try:
         trades_db.update_trade(trade_id, strategy=new_strategy)
@@ -280,7 +259,7 @@ async def remove_trade_by_id_handler(update: Update, context: ContextTypes.DEFAU
               or returns to the main menu after successful removal.
     """
     trade_id = update.message.text
-    trades_db = TradeDatabase()
+    trades_db = container.trades_db
 
     try:
         trade = trades_db.get_trade_by_id(trade_id)
@@ -311,15 +290,9 @@ async def start_remove_whole_trades(update: Update, context: ContextTypes.DEFAUL
     Returns:
         int: The next state in the conversation (REMOVE_ALL_DATA).
     """
-    keyboard = [
-        [InlineKeyboardButton("👍🏼 Confirm", callback_data='confirm_remove_all_data')],
-        [InlineKeyboardButton("⛔ Cancel", callback_data='cancel_remove_all_data')]
-    ]
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
     await update.callback_query.message.reply_text(
         text="Are you sure you want to remove the whole database?",
-        reply_markup=reply_markup
+        reply_markup=CONFIRM_REMOVE_ALL_KEYBOARD
     )
     return UpdateTradesState.REMOVE_ALL_DATA
 
@@ -334,7 +307,7 @@ async def remove_whole_database(update: Update, context: ContextTypes.DEFAULT_TY
     Returns:
         Coroutine: Returns to the main menu after removing the database or if an error occurs.
     """
-    trades_db = TradeDatabase()
+    trades_db = container.trades_db
 
     try:
         trades_db.remove_all_trades()
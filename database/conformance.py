@@ -0,0 +1,506 @@
+"""
+Conformance checks for TradeStorage backends.
+
+Runs the same sequence of checks against the SQLite backend (on a throwaway file)
+and, when available, the PostgreSQL backend, so both behave identically for the
+handlers. PostgreSQL is checked against --postgres-url / $CONFORMANCE_POSTGRES_URL,
+or against a throwaway server started with `initdb`/`pg_ctl` from $PG_BIN or PATH.
+The PostgreSQL database it runs against is emptied.
+
+Usage:
+    python -m database.conformance
+    python -m database.conformance --postgres-url postgresql://localhost/journal_test
+"""
+import io
+import os
+import asyncio
+import csv
+import sys
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime, timedelta, timezone
+
+from database.storage import CSV_HEADER
+from database.database_management import TradeDatabase
+from database.query_cache import QueryCache
+from utils.periods import to_epoch
+
+
+CHECKS = []
+
+
+def check(func):
+    """Register a conformance check; each receives an empty storage."""
+    CHECKS.append(func)
+    return func
+
+
+def expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+@contextlib.contextmanager
+def _foreign_check_interval(storage, seconds):
+    """Override how long `storage` reuses a change-feed reading (see foreign_changes_since)."""
+    storage.foreign_check_interval = seconds
+    try:
+        yield
+    finally:
+        del storage.foreign_check_interval
+
+
+def _save(storage, date, ticker='XAUUSD', time='10:00', win_loss='Win', side='Long', rr='2.5',
+          pnl='120', strategy='DHL', picture='photo-id'):
+    return storage.save_trade(date=date, ticker=ticker, time=time, win_loss=win_loss, side=side,
+                              rr=rr, pnl=pnl, strategy=strategy, picture=picture)
+
+
+@check
+def save_and_read_back(storage):
+    trade_id = _save(storage, '2024-08-13', time='14:30')
+    expect(isinstance(trade_id, int), f"save_trade returned {trade_id!r}, expected an int id")
+    trade = storage.get_trade_by_id(trade_id)
+    expect(trade is not None, "saved trade not found by id")
+    expected = {'id': trade_id, 'date': '2024-08-13', 'time': '14:30', 'ticker': 'XAUUSD', 'side': 'Long',
+                'win_loss': 'Win', 'rr': '2.5', 'strategy': 'DHL', 'picture': 'photo-id'}
+    for key, value in expected.items():
+        expect(str(trade[key]) == str(value), f"{key} is {trade[key]!r}, expected {value!r}")
+    expect(float(trade['pnl']) == 120.0, f"pnl is {trade['pnl']!r}, expected 120")
+    expect(storage.get_trade_by_id(trade_id + 1000) is None, "unknown id should return None")
+
+
+@check
+def simple_lookups(storage):
+    _save(storage, '2024-01-02', ticker='EURUSD', side='Short', win_loss='Loss')
+    _save(storage, '2024-01-05', ticker='XAUUSD')
+    _save(storage, '2024-02-01', ticker='XAUUSD', side='Short')
+    expect(sorted(storage.get_all_tickers()) == ['EURUSD', 'XAUUSD'], "get_all_tickers")
+    expect(len(storage.get_trades_by_ticker('XAUUSD')) == 2, "get_trades_by_ticker")
+    expect(len(storage.get_trades_by_side('Short')) == 2, "get_trades_by_side")
+    expect(len(storage.get_trades_by_status('Loss')) == 1, "get_trades_by_status")
+    expect(len(storage.get_trades_by_date_range('2024-01-01', '2024-01-31')) == 2, "get_trades_by_date_range")
+
+
+@check
+def export_filters(storage):
+    now = datetime.now(timezone.utc)
+    recent = now - timedelta(hours=1)
+    _save(storage, recent.strftime('%Y-%m-%d'), time=recent.strftime('%H:%M'))
+    _save(storage, recent.strftime('%Y-%m-%d'), time=recent.strftime('%H:%M'), ticker='EURUSD', strategy='FF')
+    _save(storage, '2020-03-10')
+
+    expect(len(storage.get_trades_for_export(period='1W')) == 2, "period export")
+    expect(len(storage.get_trades_for_export(ticker='EURUSD', period='1W')) == 1, "ticker + period export")
+    expect(len(storage.get_trades_for_export(strategy='DHL', period='1W')) == 1, "strategy + period export")
+    expect(len(storage.get_trades_for_export(start_date='2020-03-01', end_date='2020-03-31')) == 1, "custom range export")
+    try:
+        storage.get_trades_for_export()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("export without period or range should raise ValueError")
+
+
+@check
+def streaming_and_csv(storage):
+    ids = [_save(storage, f'2024-05-{day:02d}') for day in range(1, 8)]
+    streamed = [trade['id'] for trade in storage.iter_trades_for_export(batch_size=3, start_date='2024-05-01', end_date='2024-05-31')]
+    expect(streamed == ids, f"iter_trades_for_export returned {streamed}, expected {ids}")
+
+    buffer = io.StringIO()
+    count = storage.write_trades_csv(buffer, start_date='2024-05-01', end_date='2024-05-31')
+    rows = list(csv.reader(io.StringIO(buffer.getvalue())))
+    expect(count == len(ids), f"write_trades_csv reported {count} rows, expected {len(ids)}")
+    expect(rows[0] == CSV_HEADER, f"CSV header is {rows[0]}")
+    expect([int(row[0]) for row in rows[1:]] == ids, "CSV rows are not the exported trades in order")
+
+
+@check
+def trade_batches(storage):
+    ids = [_save(storage, f'2024-04-{day:02d}', ticker=('EURUSD' if day % 2 else 'XAUUSD')) for day in range(1, 8)]
+    batch = storage.get_trade_batch(batch_size=3, start_date='2024-04-01', end_date='2024-04-30')
+    expect(len(batch) == len(ids) and batch.column('id') == ids, f"get_trade_batch ids {batch.column('id')}")
+    expect(list(batch) == [storage.get_trade_by_id(trade_id) for trade_id in ids], "batch rows differ from records")
+    expect(batch[0].ticker == 'EURUSD' and batch[1]['ticker'] == 'XAUUSD', "batch indexing")
+    expect(batch.column('ticker')[0] is batch.column('ticker')[2], "repeated values should be shared")
+    expect(len(storage.get_trade_batch(start_date='2030-01-01', end_date='2030-01-31')) == 0, "empty batch")
+
+
+@check
+def outcomes_in_trade_order(storage):
+    _save(storage, '2024-06-02', win_loss='Loss', rr='1')
+    _save(storage, '2024-06-01', win_loss='Win', rr='3')
+    outcomes = storage.get_trade_outcomes(start_date='2024-06-01', end_date='2024-06-30')
+    expect([tuple(map(str, row)) for row in outcomes] == [('Win', '3'), ('Loss', '1')], f"outcomes {outcomes}")
+
+
+@check
+def idempotent_saves(storage):
+    trade_id = storage.save_trade(date='2024-08-13', ticker='XAUUSD', time='14:30', win_loss='Win', side='Long',
+                                  rr='2.5', pnl='120', strategy='DHL', picture='photo-id', source_key='1:100')
+    again = storage.save_trade(date='2024-08-13', ticker='XAUUSD', time='14:30', win_loss='Win', side='Long',
+                               rr='2.5', pnl='120', strategy='DHL', picture='photo-id', source_key='1:100')
+    expect(again == trade_id, f"repeated source_key saved trade {again}, expected {trade_id}")
+    _save(storage, '2024-08-13')
+    _save(storage, '2024-08-13')
+    expect(len(storage.get_trades_by_ticker('XAUUSD')) == 3, "trades without a source_key must never conflict")
+
+
+@check
+def normalized_pnl(storage):
+    # analytics.fx needs nothing but the storage, so its rate table is checked here too
+    from analytics.fx import FxRates
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'JPY.csv'), 'w') as file:
+            file.write("date,rate\n2024-08-01,0.0068\n2024-08-12,0.0070\n")
+        with open(os.path.join(tmp, 'EUR.csv'), 'w') as file:
+            file.write("date,rate\n2024-08-01,1.10\n")
+        fx = FxRates(storage, 'EUR')
+        fx.load_files(tmp)
+        fx.load_files(tmp)  # reloading replaces rates of the same dates
+        # Another process's instance, e.g. the running bot while the CLI loads rates
+        other = FxRates(storage, 'EUR', check_interval=0)
+        with open(os.path.join(tmp, 'JPY.csv'), 'a') as file:
+            file.write("2024-08-20,0.0072\n")
+        fx.load_files(tmp)
+        ts = to_epoch('2024-08-21', '10:00', 'UTC')
+        expect(abs(other.rate('JPY', 'EUR', ts) - 0.0072 / 1.10) < 1e-12, "rates loaded elsewhere must be picked up")
+
+    storage.set_pnl_normalizer(fx.normalize)
+    try:
+        trade_id = _save(storage, '2024-08-13', ticker='EURJPY', pnl='11000')
+        trade = storage.get_trade_by_id(trade_id)
+        expect(trade['currency'] == 'JPY', f"currency is {trade['currency']!r}, expected 'JPY'")
+        expect(abs(trade['pnl_account'] - 11000 * 0.0070 / 1.10) < 1e-9, f"pnl_account is {trade['pnl_account']}")
+
+        storage.update_trade(trade_id, date='2024-08-05', pnl='-5500')
+        trade = storage.get_trade_by_id(trade_id)
+        expect(abs(trade['pnl_account'] + 5500 * 0.0068 / 1.10) < 1e-9,
+               "update_trade must renormalise the PnL at the new entry date")
+
+        unknown_id = _save(storage, '2024-08-13', ticker='BTC', pnl='10')
+        expect(storage.get_trade_by_id(unknown_id)['pnl_account'] is None, "unknown tickers stay unnormalised")
+        storage.save_normalized_pnl([('USD', 10.0, unknown_id)])
+        expect(storage.get_trade_by_id(unknown_id)['pnl_account'] == 10.0, "save_normalized_pnl")
+    finally:
+        storage.set_pnl_normalizer(None)
+
+
+@check
+def weekday_hour_buckets(storage):
+    tuesday = _save(storage, '2024-08-13', time='15:10')
+    _save(storage, '2024-08-13', time='09:30')
+    _save(storage, '2024-08-14', time='15:45')
+    ids = [trade['id'] for trade in storage.get_trades_by_bucket(weekday=1, hour=15)]
+    expect(ids == [tuesday], f"Tuesday 15:00 bucket holds {ids}, expected [{tuesday}]")
+    expect(len(storage.get_trades_by_bucket(hour=15)) == 2, "hour-only bucket")
+    storage.update_trade(tuesday, date='2024-08-15')
+    expect(storage.get_trades_by_bucket(weekday=1, hour=15) == [], "update_trade must move the trade's buckets")
+    conn = storage._connect()
+    c = conn.cursor()
+    c.execute("SELECT entry_ts FROM trades WHERE id = ?", (tuesday,))
+    entry_ts = c.fetchone()[0]
+    conn.close()
+    expect(entry_ts == to_epoch('2024-08-15', '15:10'), f"update_trade must move entry_ts, got {entry_ts}")
+    try:
+        storage.update_trade(tuesday, date='15/08/2024')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("update_trade must reject a malformed date")
+    expect(storage.get_trade_by_id(tuesday)['date'] == '2024-08-15', "a rejected update must write nothing")
+    expect(storage.save_trade('13/08/2024', 'XAUUSD', '10:00', 'Win', 'Long', '2.5', '120', 'DHL', None) is None,
+           "save_trade must reject a malformed date")
+    expect(len(storage.get_trades_by_bucket(weekday=3)) == 1, "weekday-only bucket")
+
+
+@check
+def change_feed(storage):
+    start = storage.last_change_seq()
+    first = _save(storage, '2024-09-02')
+    second = _save(storage, '2024-09-03')
+    storage.update_trade(first, pnl=-10)
+    storage.remove_trade_by_id(second)
+    changes = storage.get_changes(start)
+    seqs = [change['seq'] for change in changes]
+    expect(seqs == sorted(set(seqs)) and seqs[-1] == storage.last_change_seq(), f"change seqs {seqs}")
+    ops = [(change['op'], change['trade_id']) for change in changes]
+    # The second trade's upsert reads as a delete once the row is gone.
+    expected = [('upsert', first), ('delete', second), ('upsert', first), ('delete', second)]
+    expect(ops == expected, f"change ops {ops}")
+    expect(float(changes[-2]['trade']['pnl']) == -10, "upserts carry the current row")
+    expect(storage.get_changes(seqs[-2]) == changes[-1:], "reads resume after the watermark")
+    storage.remove_all_trades()
+    expect(storage.get_changes(seqs[-1])[0]['op'] == 'clear', "remove_all_trades feeds a clear")
+
+
+@check
+def excursions_feed(storage):
+    trade_id = _save(storage, '2024-09-07')
+    start = storage.last_change_seq()
+    storage.save_excursions([(2400.5, -1.5, 3.0, trade_id)])
+    ops = [(change['op'], change['trade_id']) for change in storage.get_changes(start)]
+    expect(ops == [('upsert', trade_id)], f"save_excursions ops {ops}")
+    storage.remove_all_trades()
+
+
+@check
+def batch_remove(storage):
+    trade_ids = [_save(storage, date) for date in ('2024-09-04', '2024-09-05', '2024-09-06')]
+    start = storage.last_change_seq()
+    removed = storage.remove_trades_by_ids([trade_ids[2], trade_ids[0], trade_ids[2] + 1000])
+    expect(removed == 2, f"remove_trades_by_ids removed {removed}")
+    expect(storage.get_trade_by_id(trade_ids[0]) is None and storage.get_trade_by_id(trade_ids[1]) is not None,
+           "remove_trades_by_ids removes only the given trades")
+    ops = [(change['op'], change['trade_id']) for change in storage.get_changes(start)]
+    expect(ops == [('delete', trade_ids[0]), ('delete', trade_ids[2])], f"batch remove ops {ops}")
+    storage.remove_all_trades()
+
+
+@check
+def foreign_changes(storage):
+    start = storage.last_change_seq()
+    trade_id = _save(storage, '2024-09-10')
+    seq, foreign = storage.foreign_changes_since(start, max_age=0)
+    expect(seq == storage.last_change_seq() and not foreign, "this process's writes must not count as foreign")
+    # A write by another worker
+    conn = storage._connect()
+    c = conn.cursor()
+    c.execute("INSERT INTO trade_changes (trade_id, op, origin) VALUES (?, ?, ?)", (trade_id, 'upsert', 'other-1'))
+    conn.commit()
+    conn.close()
+    with _foreign_check_interval(storage, 60):
+        expect(storage.foreign_changes_since(seq) == (seq, False), "checks within the interval reuse the last reading")
+    expect(storage.foreign_changes_since(seq, max_age=0) == (seq + 1, True), "another process's write must be reported")
+    expect(storage.foreign_changes_since(seq + 1, max_age=0) == (seq + 1, False), "nothing new after the watermark")
+
+
+@check
+def rolling_metrics(storage):
+    from analytics.rolling_metrics import RollingMetrics
+
+    # Read the change feed on every access, so another worker's write shows up at once
+    with _foreign_check_interval(storage, 0):
+        metrics = RollingMetrics(storage)
+        _save(storage, '2024-09-11', win_loss='Loss', rr='1')
+        _save(storage, '2024-09-12', win_loss='Win', rr='2')
+        summary = metrics.summary()
+        expect(summary['trades'] == 2 and summary['streak'] == 1, f"summary {summary}")
+        expect(RollingMetrics(storage).summary() == summary, "a new instance must reuse or rebuild the same state")
+        # A write by another worker
+        conn = storage._connect()
+        c = conn.cursor()
+        c.execute("DELETE FROM trades WHERE date = ?", ('2024-09-12',))
+        c.execute("INSERT INTO trade_changes (trade_id, op, origin) VALUES (?, ?, ?)", (None, 'delete', 'other-1'))
+        conn.commit()
+        conn.close()
+        summary = metrics.summary()
+        expect(summary['trades'] == 1 and summary['streak'] == -1, f"another worker's delete is missed: {summary}")
+
+
+@check
+def streaming_reads(storage):
+    for day in range(1, 10):
+        _save(storage, f'2024-03-{day:02d}', side='Long' if day % 3 else 'Short', time=f'{day + 8:02d}:00')
+    pairs = [
+        (storage.get_trades_by_side('Long'), storage.iter_trades_by_side('Long', batch_size=2)),
+        (storage.get_trades_by_status('Win'), storage.iter_trades_by_status('Win', batch_size=2)),
+        (storage.get_trades_by_ticker('XAUUSD'), storage.iter_trades_by_ticker('XAUUSD', batch_size=2)),
+        (storage.get_trades_by_date_range('2024-03-02', '2024-03-05'),
+         storage.iter_trades_by_date_range('2024-03-02', '2024-03-05', batch_size=2)),
+        (storage.get_trades_by_bucket(hour=10), storage.iter_trades_by_bucket(hour=10, batch_size=2)),
+        (storage.get_trade_outcomes(start_date='2024-03-01', end_date='2024-03-31'),
+         storage.iter_trade_outcomes(batch_size=2, start_date='2024-03-01', end_date='2024-03-31')),
+    ]
+    for expected, streamed in pairs:
+        streamed = list(streamed)
+        expect(sorted(streamed) == sorted(expected), f"streamed {streamed}, expected {expected}")
+    expect(storage.count_trades_by_bucket(hour=10) == 1, "count_trades_by_bucket")
+
+    # Abandoned streams must release their connection (the PostgreSQL pool holds two).
+    for _ in range(4):
+        stream = storage.iter_trades_by_side('Long', batch_size=1)
+        next(stream)
+        stream.close()
+
+    async def read():
+        async with contextlib.aclosing(storage.aiter_trades_by_side('Long', batch_size=2)) as trades:
+            async for _ in trades:
+                break
+        return [trade async for trade in storage.aiter_trades_for_export(batch_size=4, start_date='2024-03-01',
+                                                                          end_date='2024-03-31')]
+
+    exported = asyncio.run(read())
+    expect([trade.date for trade in exported] == [f'2024-03-{day:02d}' for day in range(1, 10)],
+           "aiter_trades_for_export order")
+
+
+@check
+def query_cache(storage):
+    long_id = _save(storage, '2024-07-01', side='Long')
+    short_id = _save(storage, '2024-07-02', side='Short', win_loss='Loss')
+    cache = QueryCache(storage)
+    storage.set_query_cache(cache)
+    try:
+        storage.get_trades_by_side('Long')
+        storage.get_trades_by_side('Short')
+        storage.get_trades_by_ticker('XAUUSD')
+        expect([t['id'] for t in storage.get_trades_by_side('Long')] == [long_id], "cached lookup")
+        expect(cache.stats()['hits'] == 1, f"one hit expected: {cache.stats()}")
+        expect([t.id for t in storage.iter_trades_by_side('Short')] == [short_id], "streamed lookup")
+        expect(cache.stats()['hits'] == 2, f"streamed lookups should use the cache: {cache.stats()}")
+        list(storage.iter_trades_by_status('Loss'))
+        expect(storage.get_trades_by_status('Loss')[0]['id'] == short_id and cache.stats()['hits'] == 3,
+               "a finished stream fills the cache")
+
+        new_id = _save(storage, '2024-07-03', side='Long')
+        expect({t['id'] for t in storage.get_trades_by_side('Long')} == {long_id, new_id}, "save evicts matching lookups")
+        expect(cache.stats()['invalidations'] == 2, f"save should only evict Long and XAUUSD: {cache.stats()}")
+
+        storage.update_trade(short_id, side='Long')
+        expect(storage.get_trades_by_side('Short') == [], "update evicts lookups the trade left")
+        storage.remove_trade_by_id(long_id)
+        expect(long_id not in {t['id'] for t in storage.get_trades_by_ticker('XAUUSD')}, "delete evicts lookups")
+
+        # A write by another worker: only visible through the change feed.
+        conn = storage._connect()
+        c = conn.cursor()
+        c.execute("UPDATE trades SET ticker = ? WHERE id = ?", ('EURUSD', new_id))
+        storage._record_changes(c, [new_id], 'upsert')
+        conn.commit()
+        conn.close()
+        expect(storage.get_trade_by_id(new_id)['ticker'] == 'EURUSD', "external write evicts lookups")
+        expect([t['id'] for t in storage.get_trades_by_ticker('EURUSD')] == [new_id], "external write")
+
+        storage.remove_all_trades()
+        expect(storage.get_trades_by_side('Long') == [], "clear empties the cache")
+        expect(cache.stats()['entries'] == 1, "only the lookup made after the clear is cached")
+    finally:
+        storage.set_query_cache(None)
+
+
+@check
+def trade_index(storage):
+    from database.trade_index import TradeIndex
+
+    for day, ticker, strategy, side in [(1, 'XAUUSD', 'DHL', 'Long'), (2, 'XAGUSD', 'Close_NYSE', 'Short'),
+                                        (3, 'EURUSD', 'CloseXNYSE', 'Long'), (4, 'US30', 'MTR', 'Short')]:
+        _save(storage, f'2024-07-{day:02d}', ticker=ticker, strategy=strategy, side=side)
+    index = TradeIndex(storage)
+    queries = ['xa', 'xau long', 'close_', 'short', 'win 1', 'us3 s', 'nothing']
+    # What queries are answered with until the index is built
+    before = {query: index._search_database(tuple(sorted(set(query.split()))), 50) for query in queries}
+    index.build()
+    for query in queries:
+        expect(index.search(query) == before[query],
+               f"{query!r}: index gives {index.search(query)}, database gave {before[query]}")
+    expect(len(before['close_']) == 1, "`_` must not act as a wildcard")
+
+
+@check
+def user_settings(storage):
+    storage.set_user_setting(42, 'timezone', 'Europe/London')
+    storage.set_user_setting(42, 'timezone', 'America/New_York')
+    storage.set_user_setting(42, 'session_start', '17:00')
+    expect(storage.get_user_settings(42) == {'timezone': 'America/New_York', 'session_start': '17:00'}, "settings upsert")
+    expect(storage.get_user_settings(7) == {}, "settings of an unknown user")
+    storage.delete_user_setting(42, 'session_start')
+    expect(storage.get_user_settings(42) == {'timezone': 'America/New_York'}, "delete_user_setting")
+
+
+@check
+def writes_notify_listeners(storage):
+    events = []
+    storage.add_write_listener(lambda event, trade_id, before, after: events.append((event, trade_id)))
+    version = storage.data_version()
+
+    trade_id = _save(storage, '2024-07-01')
+    storage.update_trade(trade_id, pnl=-50, win_loss='Loss')
+    trade = storage.get_trade_by_id(trade_id)
+    expect(float(trade['pnl']) == -50 and trade['win_loss'] == 'Loss', "update_trade")
+    storage.remove_trade_by_id(trade_id)
+    expect(storage.get_trade_by_id(trade_id) is None, "remove_trade_by_id")
+    storage.remove_all_trades()
+
+    expected = [('save', trade_id), ('update', trade_id), ('delete', trade_id), ('clear', None)]
+    expect(events[-4:] == expected, f"listener events {events}")
+    expect(storage.data_version() == version + 4, "data_version should advance once per write")
+
+
+def run_checks(name, storage):
+    """Run every check against `storage`, emptying it before each one. Returns the number of failures."""
+    failures = 0
+    for func in CHECKS:
+        storage.remove_all_trades()
+        try:
+            func(storage)
+        except Exception as e:
+            failures += 1
+            print(f"  FAIL {name}: {func.__name__}: {e}")
+        else:
+            print(f"  ok   {name}: {func.__name__}")
+    return failures
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def throwaway_postgres(bin_dir=None):
+    """Start a temporary PostgreSQL cluster on a free port and yield its DSN."""
+    initdb = shutil.which('initdb', path=bin_dir)
+    pg_ctl = shutil.which('pg_ctl', path=bin_dir)
+    if not initdb or not pg_ctl:
+        raise FileNotFoundError("initdb/pg_ctl not found; set PG_BIN or pass --postgres-url")
+
+    tmp = tempfile.mkdtemp(prefix='journal_pg_')
+    data_dir = os.path.join(tmp, 'data')
+    port = _free_port()
+    subprocess.run([initdb, '-D', data_dir, '-U', 'postgres', '-A', 'trust'], check=True, capture_output=True)
+    subprocess.run([pg_ctl, '-D', data_dir, '-w', '-l', os.path.join(tmp, 'server.log'),
+                    '-o', f"-p {port} -k {tmp} -c listen_addresses=''", 'start'], check=True, capture_output=True)
+    try:
+        yield f'postgresql://postgres@/postgres?host={tmp}&port={port}'
+    finally:
+        subprocess.run([pg_ctl, '-D', data_dir, '-m', 'immediate', 'stop'], capture_output=True)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--postgres-url', default=os.getenv('CONFORMANCE_POSTGRES_URL'))
+    parser.add_argument('--skip-postgres', action='store_true')
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        print("SQLite")
+        failures += run_checks('sqlite', TradeDatabase(os.path.join(tmp, 'trades.db')))
+
+    if not args.skip_postgres:
+        print("PostgreSQL")
+        try:
+            from database.postgres_storage import PostgresTradeDatabase
+            with contextlib.ExitStack() as stack:
+                dsn = args.postgres_url or stack.enter_context(throwaway_postgres(os.getenv('PG_BIN')))
+                storage = PostgresTradeDatabase(dsn, max_size=2)
+                stack.callback(storage.close)
+                failures += run_checks('postgres', storage)
+        except (ImportError, FileNotFoundError, subprocess.CalledProcessError) as e:
+            print(f"  skipped: {e}")
+
+    print("All checks passed." if not failures else f"{failures} check(s) failed.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,31 @@
+import os
 import sqlite3
-import datetime
+from database.storage import TradeStorage, EXCURSION_COLUMNS
 
 
-class TradeDatabase:
+class TradeDatabase(TradeStorage):
+    """SQLite implementation of TradeStorage, backed by a single database file."""
+
+    Error = sqlite3.Error
+
     def __init__(self, db_path=r'database/trades.db'):
         self.db_path = db_path
         self._init_db()
 
+    def _connect(self):
+        """Open a new connection to the trades database."""
+        return sqlite3.connect(self.db_path)
+
+    def _storage_key(self):
+        return os.path.abspath(self.db_path)
+
     def _init_db(self):
         """Initialize the database and create trades table if it does not exist."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             c = conn.cursor()
+            # WAL lets snapshot/export readers run alongside writers without lock waits.
+            c.execute('PRAGMA journal_mode=WAL')
             c.execute('''
                 CREATE TABLE IF NOT EXISTS trades (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -26,196 +40,107 @@ class TradeDatabase:
                     picture TEXT
                 )
             ''')
+            self._migrate_entry_ts(c)
+            self._migrate_source_key(c)
+            self._migrate_excursions(c)
+            self._migrate_normalized_pnl(c)
+            self._migrate_buckets(c)
+            self._init_change_feed(c)
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS user_settings (
+                    user_id INTEGER,
+                    key TEXT,
+                    value TEXT,
+                    PRIMARY KEY (user_id, key)
+                )
+            ''')
             conn.commit()
             conn.close()
         except Exception as e:
             print(e)
 
-
-    def save_trade(self, date, ticker, time, win_loss, side, rr, pnl, strategy, picture):
-        """Save a trade record to the database."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
+    def _migrate_entry_ts(self, c):
+        """
+        Add the indexed `entry_ts` column (UTC epoch of date + time) used for period queries.
+        Rows saved before the column existed are backfilled assuming their times are UTC.
+        """
+        columns = [row[1] for row in c.execute("PRAGMA table_info(trades)")]
+        if 'entry_ts' not in columns:
+            c.execute("ALTER TABLE trades ADD COLUMN entry_ts INTEGER")
             c.execute('''
-                INSERT INTO trades (date, time, ticker, win_loss, side, rr, pnl, strategy, picture)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (date, time, ticker, win_loss, side, rr, pnl, strategy, picture))
-
-            # Get trade id
-            trade_id = c.lastrowid
-
-            conn.commit()
-            return trade_id
-
-        except sqlite3.Error as e:
-            print(f"An error occurred: {e}")
-            return None
-
-        finally:
-            if conn:
-                conn.close()
-
+                UPDATE trades
+                SET entry_ts = CAST(strftime('%s', date || ' ' || COALESCE(time, '00:00')) AS INTEGER)
+            ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_trades_entry_ts ON trades (entry_ts)")
+        # Most recent trades of one strategy first, for the rolling metrics' window
+        c.execute("CREATE INDEX IF NOT EXISTS idx_trades_strategy_entry_ts ON trades (strategy, entry_ts, id)")
 
-    def get_trades_by_date_range(self, start_date, end_date):
-        """Fetch trades from the database within the specified date range."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        query = """
-            SELECT id, date, time, ticker, side, win_loss, pnl, rr, strategy, picture
-            FROM trades
-            WHERE date BETWEEN ? AND ?
+    def _migrate_source_key(self, c):
         """
-        c.execute(query, (start_date, end_date))
-        trades = c.fetchall()
-        conn.close()
-        
-        return [self._trade_to_dict(trade) for trade in trades]
-
-    def get_trade_by_id(self, trade_id):
-        """Retrieve and search records by trade's ID."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        query = "SELECT * FROM trades WHERE id=?"
-        c.execute(query, (trade_id,))
-        trade = c.fetchone()
-        conn.close()
-        
-        return self._trade_to_dict(trade) if trade else None
-
-
-    def get_trades_by_ticker(self, ticker_name):
-        """Retrieve and search records by trade's ticker."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        query = "SELECT * FROM trades WHERE ticker = ?"
-        c.execute(query, (ticker_name,))
-        trades = c.fetchall()
-        conn.close()
-        
-        return [self._trade_to_dict(trade) for trade in trades]
-
-
-    def get_trades_by_side(self, side):
-        """Retrieve and search records by trade's side (Long/Short)."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        query = "SELECT * FROM trades WHERE side = ?"
-        c.execute(query, (side,))
-        trades = c.fetchall()
-        conn.close()
-        
-        return [self._trade_to_dict(trade) for trade in trades]
-
-
-    def get_trades_by_status(self, status):
-        """Retrieve and search records by trade's status (Win/Loss)."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        query = "SELECT * FROM trades WHERE win_loss = ?"
-        c.execute(query, (status,))
-        trades = c.fetchall()
-        conn.close()
-        
-        return [self._trade_to_dict(trade) for trade in trades]
-
-
-    def get_all_tickers(self):
-        """Fetch all unique tickers from the database."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            c.execute("SELECT DISTINCT ticker FROM trades")
-            tickers = [row[0] for row in c.fetchall()]
-            conn.close()
-            return tickers
-        except sqlite3.Error as e:
-            print(f"An error occurred: {e}")
-            return []
-
-
-    def get_trades_for_export(self, ticker=None, period=None, start_date=None, end_date=None):
-        """Fetch trades for a specified ticker and period, or custom date range."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        if period:
-            end_date = datetime.datetime.now().date()
-            start_date = self._calculate_start_date(period, end_date)
-        elif start_date and end_date:
-            start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
-            end_date = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
-        else:
-            raise ValueError("Either period or custom date range must be specified.")
-
-        query = "SELECT * FROM trades WHERE date BETWEEN ? AND ?"
-        params = (start_date, end_date)
-
-        if ticker:
-            query += " AND ticker = ?"
-            params = (start_date, end_date, ticker)
-
-        c.execute(query, params)
-        trades = c.fetchall()
-        conn.close()
-
-        return [self._trade_to_dict(trade) for trade in trades]
-
-    def _calculate_start_date(self, period, end_date):
-        """Calculate start date based on period."""
-        periods = {
-            '1D': 1, '2D': 2, '3D': 3,
-            '1W': 7, '2W': 14,
-            '1M': 30, '2M': 60, '3M': 90, '6M': 180
-        }
-        if period not in periods:
-            raise ValueError("Invalid period specified.")
-        return end_date - datetime.timedelta(days=periods[period])
-
-    def update_trade(self, trade_id: int, **updates):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        for key, value in updates.items():
-            c.execute(f'UPDATE trades SET {key} = ? WHERE id = ?', (value, trade_id))
-        conn.commit()
-        conn.close()
-
-    def remove_trade_by_id(self, trade_id: int):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        query = "DELETE FROM trades WHERE id = ?"
-        c.execute(query, (trade_id,))
-        conn.commit()
-        conn.close()
-
-    def remove_all_trades(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        query = "DELETE FROM trades"
-        c.execute(query)
-        conn.commit()
-        conn.close()
-
-    def delete_all_data(self):
-        conn = sqlite3.connect(self.db.path)
-        c = conn.cursor()
-        query = """DELETE FROM trades"""
-        c.execute(query)
-        conn.commit()
-        conn.close()
-
+        Add the `source_key` column identifying the Telegram message a trade was saved from.
+        Its unique index makes saves idempotent; NULL keys (older rows, imports) never conflict.
+        """
+        columns = [row[1] for row in c.execute("PRAGMA table_info(trades)")]
+        if 'source_key' not in columns:
+            c.execute("ALTER TABLE trades ADD COLUMN source_key TEXT")
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_trades_source_key ON trades (source_key)")
+
+    def _migrate_excursions(self, c):
+        """Add the market-data columns filled by analytics.market_data (NULL until enriched)."""
+        columns = [row[1] for row in c.execute("PRAGMA table_info(trades)")]
+        for column in EXCURSION_COLUMNS:
+            if column not in columns:
+                c.execute(f"ALTER TABLE trades ADD COLUMN {column} REAL")
+
+    def _migrate_normalized_pnl(self, c):
+        """Add the quote currency and account-currency PnL columns filled on save (see analytics.fx)."""
+        columns = [row[1] for row in c.execute("PRAGMA table_info(trades)")]
+        if 'currency' not in columns:
+            c.execute("ALTER TABLE trades ADD COLUMN currency TEXT")
+        if 'pnl_account' not in columns:
+            c.execute("ALTER TABLE trades ADD COLUMN pnl_account REAL")
+
+    def _migrate_buckets(self, c):
+        """
+        Add the indexed weekday (Monday = 0) and hour-of-day buckets of each trade's local
+        date and time, filled on save. Existing rows are backfilled the way
+        `utils.periods.trade_buckets` computes them.
+        """
+        columns = [row[1] for row in c.execute("PRAGMA table_info(trades)")]
+        if 'weekday' not in columns:
+            c.execute("ALTER TABLE trades ADD COLUMN weekday INTEGER")
+            c.execute("ALTER TABLE trades ADD COLUMN hour INTEGER")
+            c.execute('''
+                UPDATE trades
+                SET weekday = (CAST(strftime('%w', substr(date, 1, 10)) AS INTEGER) + 6) % 7,
+                    hour = CASE WHEN instr(time, ':') > 1 THEN CAST(substr(time, 1, instr(time, ':') - 1) AS INTEGER) END
+            ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_trades_weekday_hour ON trades (weekday, hour)")
 
-    def _trade_to_dict(self, trade):
-        """Convert trade tuple to dictionary."""
-        return {
-            'id': trade[0],
-            'date': trade[1],
-            'time': trade[2],
-            'ticker': trade[3],
-            'side': trade[4],
-            'win_loss': trade[5],
-            'pnl': trade[6],
-            'rr': trade[7],
-            'strategy': trade[8],
-            'picture': trade[9]
-        } if trade else None
\ No newline at end of file
+    def _init_change_feed(self, c):
+        """
+        Create the `trade_changes` feed; trades saved before it existed are fed as upserts.
+        `origin` identifies the process that made each change (see `change_origin()`).
+        """
+        exists = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trade_changes'").fetchone()
+        if not exists:
+            c.execute('''
+                CREATE TABLE trade_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    trade_id INTEGER,
+                    op TEXT,
+                    origin TEXT
+                )
+            ''')
+            c.execute("INSERT INTO trade_changes (trade_id, op) SELECT id, 'upsert' FROM trades ORDER BY id")
+        elif 'origin' not in [row[1] for row in c.execute("PRAGMA table_info(trade_changes)")]:
+            c.execute("ALTER TABLE trade_changes ADD COLUMN origin TEXT")
+
+    def _insert_trade(self, cursor, row):
+        cursor.execute('''
+            INSERT INTO trades (date, time, ticker, win_loss, side, rr, pnl, strategy, picture, entry_ts, source_key,
+                                currency, pnl_account, weekday, hour)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (source_key) DO NOTHING
+        ''', row)
+        return cursor.lastrowid if cursor.rowcount else None
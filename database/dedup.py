@@ -0,0 +1,50 @@
+import hashlib
+
+
+def duplicate_key(ticker, date, time, pnl):
+    """
+    64-bit hash of the fields that make two trades near-duplicates: same ticker, date,
+    minute and PnL. Values are normalised first, so '120' and 120.0 or 'xauusd' and
+    'XAUUSD' collide as intended.
+    """
+    try:
+        pnl = f"{float(pnl):.2f}"
+    except (TypeError, ValueError):
+        pnl = str(pnl)
+    text = f"{str(ticker or '').strip().upper()}|{date}|{str(time or '')[:5]}|{pnl}"
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big')
+
+
+def find_duplicates(storage, batch_size=1000):
+    """
+    Finds groups of near-duplicate trades with one pass over the table.
+
+    Each trade is looked up in a hash index keyed by duplicate_key(), so the scan is
+    linear in the number of trades instead of comparing every pair, and memory holds
+    one integer pair per distinct trade.
+
+    Args:
+        storage (TradeStorage): The database to scan.
+        batch_size (int): Rows fetched per round trip.
+
+    Returns:
+        list: Groups of trade ids (oldest first), one per set of duplicates.
+    """
+    first_ids = {}
+    groups = {}
+    conn = storage._connect()
+    try:
+        c = storage._stream_cursor(conn)
+        c.execute("SELECT id, ticker, date, time, pnl FROM trades ORDER BY id")
+        while True:
+            rows = c.fetchmany(batch_size)
+            if not rows:
+                break
+            for trade_id, ticker, date, time, pnl in rows:
+                key = duplicate_key(ticker, date, time, pnl)
+                first_id = first_ids.setdefault(key, trade_id)
+                if first_id != trade_id:
+                    groups.setdefault(key, [first_id]).append(trade_id)
+    finally:
+        conn.close()
+    return list(groups.values())
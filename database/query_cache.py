@@ -0,0 +1,194 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+# Rows sampled to estimate the memory held by a cached result.
+SIZE_SAMPLE = 32
+
+
+class _Entry:
+    __slots__ = ('trades', 'ids', 'predicate', 'size')
+
+    def __init__(self, trades, predicate, size):
+        self.trades = trades
+        self.ids = {trade['id'] for trade in trades}
+        self.predicate = predicate
+        self.size = size
+
+
+def _matches(predicate, trade):
+    try:
+        return predicate(trade)
+    except Exception:
+        # A row the predicate cannot judge (e.g. a NULL column) evicts the entry.
+        return True
+
+
+def result_size(trades):
+    """Approximate bytes held by a list of Trade records and the id set kept next to it."""
+    if not trades:
+        return sys.getsizeof(trades)
+    sample = trades[:SIZE_SAMPLE]
+    row = sum(sys.getsizeof(trade) + sum(sys.getsizeof(value) for value in trade.values())
+              for trade in sample) / len(sample)
+    # Each cached id also costs a set slot.
+    return int(sys.getsizeof(trades) + len(trades) * (row + 40))
+
+
+class QueryCache:
+    """
+    Read-through cache of trade lookups, bounded by memory with LRU eviction.
+
+    Results are keyed by normalized query (e.g. ('side', 'Long')) and remember the predicate
+    the query selects rows with. Before every lookup the cache reads the `trade_changes`
+    feed past the last change it has seen; each changed trade evicts only the entries that
+    held it or whose predicate matches its new row, and a 'clear' empties the cache. Using
+    the feed instead of write listeners also catches writes made by other workers sharing
+    the journal, at the cost of one indexed range query per lookup.
+    """
+
+    def __init__(self, trades_db, max_bytes=32 * 1024 * 1024, feed_batch=1000):
+        """
+        Args:
+            trades_db (TradeStorage): The database whose change feed drives invalidation.
+            max_bytes (int): Approximate memory the cached results may hold. A single result
+                larger than a quarter of it is returned without being cached.
+            feed_batch (int): Changes read per lookup; a longer backlog empties the cache instead.
+        """
+        self.trades_db = trades_db
+        self.max_bytes = max_bytes
+        self.feed_batch = feed_batch
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._seq = trades_db.last_change_seq()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+
+    def _catch_up(self):
+        """Apply the change feed past the last seen change. Returns the new watermark."""
+        changes = self.trades_db.get_changes(self._seq, self.feed_batch)
+        if not changes:
+            return self._seq
+        with self._lock:
+            if len(changes) == self.feed_batch:
+                # Bulk write (import, FX normalization): cheaper to start over than to replay it.
+                self._seq = self.trades_db.last_change_seq()
+                self._clear()
+                return self._seq
+            for change in changes:
+                if change['seq'] <= self._seq:
+                    continue
+                if change['op'] == 'clear':
+                    self._clear()
+                    continue
+                trade_id, trade = change['trade_id'], change['trade']
+                stale = [key for key, entry in self._entries.items()
+                         if trade_id in entry.ids or (trade is not None and _matches(entry.predicate, trade))]
+                for key in stale:
+                    self._drop(key)
+                self.invalidations += len(stale)
+            self._seq = max(self._seq, changes[-1]['seq'])
+            return self._seq
+
+    def get(self, key, predicate, load):
+        """
+        Cached result of a query.
+
+        Args:
+            key (tuple): Normalized query.
+            predicate (callable): `predicate(trade)` is True for every Trade the query selects.
+            load (callable): Runs the query and returns its list of Trade records.
+
+        Returns:
+            list: A new list of the (shared) Trade records.
+        """
+        seq = self._catch_up()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry.trades)
+            self.misses += 1
+
+        trades = load()
+        self._store(key, predicate, trades, seq)
+        return list(trades)
+
+    def iterate(self, key, predicate, stream):
+        """
+        Generator version of get() for streamed reads: yields a cached result, or the rows
+        of `stream()` as they arrive, keeping a copy that is cached once the stream ends,
+        unless it outgrows the per-result limit or the consumer stops early.
+        """
+        seq = self._catch_up()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            # Cached lists are replaced, never changed, so they can be iterated unlocked.
+            yield from entry.trades
+            return
+
+        kept, max_rows = [], None
+        rows = stream()
+        try:
+            for trade in rows:
+                yield trade
+                if kept is None:
+                    continue
+                kept.append(trade)
+                if max_rows is None and len(kept) == SIZE_SAMPLE:
+                    max_rows = self.max_bytes // 4 / (result_size(kept) / len(kept))
+                elif max_rows is not None and len(kept) > max_rows:
+                    kept = None
+        finally:
+            close = getattr(rows, 'close', None)
+            if close is not None:
+                close()
+        if kept is not None:
+            self._store(key, predicate, kept, seq)
+
+    def _store(self, key, predicate, trades, seq):
+        size = result_size(trades)
+        with self._lock:
+            # Skip caching if another lookup applied newer changes meanwhile: they may
+            # have missed this result, which was not cached yet.
+            if seq != self._seq or size > self.max_bytes // 4:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(trades, predicate, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        """Hit rate and memory of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
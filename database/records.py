@@ -0,0 +1,101 @@
+from collections import namedtuple
+
+
+# Fields of a trade as read by every query, in TRADE_COLUMNS order.
+TRADE_FIELDS = ('id', 'date', 'time', 'ticker', 'side', 'win_loss', 'pnl', 'rr', 'strategy', 'picture',
+                'currency', 'pnl_account')
+
+_FIELD_INDEX = {field: index for index, field in enumerate(TRADE_FIELDS)}
+
+# Low-cardinality text fields; a batch stores one string object per distinct value.
+SHARED_FIELDS = ('date', 'time', 'ticker', 'side', 'win_loss', 'rr', 'strategy', 'currency')
+
+
+class Trade(namedtuple('Trade', TRADE_FIELDS)):
+    """
+    A trade row: a named tuple with one slot per column, read as `trade.ticker`.
+
+    It costs a tuple instead of a twelve-key dictionary per row. `trade['ticker']`,
+    `get()`, `keys()` and `items()` are kept so code written against the former trade
+    dictionaries (str.format_map templates, write listeners, `{**trade}`) still works;
+    `_asdict()` gives a real dictionary, e.g. for JSON.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, _FIELD_INDEX[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        index = _FIELD_INDEX.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def keys(self):
+        return TRADE_FIELDS
+
+    def values(self):
+        return tuple(self)
+
+    def items(self):
+        return zip(TRADE_FIELDS, self)
+
+
+class TradeBatch:
+    """
+    Trades stored column by column, for bulk consumers such as exports and analytics.
+
+    Each field is one list, so a batch holds no per-row container at all, and repeated
+    values of SHARED_FIELDS point at a single string. `column(name)` gives a field's
+    values, `to_frame()` a pandas DataFrame built without intermediate rows, and iterating
+    or indexing yields Trade records for code that works row by row.
+    """
+
+    __slots__ = ('columns', '_shared')
+
+    def __init__(self, columns=None):
+        self.columns = columns or {field: [] for field in TRADE_FIELDS}
+        self._shared = {field: {} for field in SHARED_FIELDS}
+
+    def extend(self, rows):
+        """Append rows in TRADE_COLUMNS order (e.g. a fetchmany chunk)."""
+        if not rows:
+            return
+        for field, values in zip(TRADE_FIELDS, zip(*rows)):
+            shared = self._shared.get(field)
+            if shared is not None:
+                values = map(shared.setdefault, values, values)
+            self.columns[field].extend(values)
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def __iter__(self):
+        return map(Trade._make, zip(*(self.columns[field] for field in TRADE_FIELDS)))
+
+    def __getitem__(self, index):
+        return Trade._make(self.columns[field][index] for field in TRADE_FIELDS)
+
+    def __getstate__(self):
+        # Sent to the job process pool; the sharing tables are only needed while filling.
+        return self.columns
+
+    def __setstate__(self, columns):
+        self.columns = columns
+        self._shared = {field: {} for field in SHARED_FIELDS}
+
+    def column(self, field):
+        return self.columns[field]
+
+    def to_frame(self, header=None):
+        """
+        The batch as a pandas DataFrame.
+
+        Args:
+            header (list): Column names to use instead of the field names, e.g. CSV_HEADER.
+        """
+        # pandas is heavy, so it is only imported by the consumers that need it
+        import pandas as pd
+
+        return pd.DataFrame(dict(zip(header or TRADE_FIELDS, (self.columns[field] for field in TRADE_FIELDS))))
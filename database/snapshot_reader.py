@@ -0,0 +1,98 @@
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+
+from database.database_management import TradeDatabase
+
+
+class SnapshotReader(TradeDatabase):
+    """
+    Read-only view of the trades database for heavy queries (exports, analytics).
+
+    Queries are served from a snapshot copy of the live database, so long scans never
+    hold read transactions on the file that `save_trade` writes to (which would keep
+    the WAL from being checkpointed). A snapshot older than `max_staleness` seconds is
+    still served while a background thread copies a fresh one, so the query that notices
+    never waits for the copy. Until the first snapshot exists, queries read the live
+    file, which WAL mode allows alongside writers. All read methods of TradeDatabase are
+    available; write methods fail because connections are opened read-only.
+    """
+
+    def __init__(self, db_path=r'database/trades.db', snapshot_path=r'database/trades_snapshot.db',
+                 max_staleness=60, pages_per_step=256):
+        """
+        Args:
+            db_path (str): Path to the live trades database.
+            snapshot_path (str): Path of the snapshot copy served to readers.
+            max_staleness (float): Age of the snapshot in seconds after which it is refreshed.
+            pages_per_step (int): Pages copied per backup step; the source is released between steps.
+        """
+        self.snapshot_path = snapshot_path
+        self.max_staleness = max_staleness
+        self.pages_per_step = pages_per_step
+        self._lock = threading.Lock()
+        self._refreshing = False
+        super().__init__(db_path)
+
+    def _init_db(self):
+        """The snapshot never creates tables; the live database owns the schema."""
+        pass
+
+    def _connect(self):
+        """Open a read-only connection, starting a background refresh if the snapshot is stale."""
+        if self.is_stale():
+            self.refresh_in_background()
+        path = self.snapshot_path if os.path.exists(self.snapshot_path) else self.db_path
+        return sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+
+    def is_stale(self):
+        """
+        Check whether the snapshot is missing or older than the staleness bound. The age is
+        the file's, so processes sharing the snapshot (workers, the job pool) agree on it.
+        """
+        try:
+            return time.time() - os.path.getmtime(self.snapshot_path) > self.max_staleness
+        except OSError:
+            return True
+
+    def refresh_in_background(self):
+        """Start a refresh in a daemon thread unless one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name='snapshot-refresh', daemon=True).start()
+
+    def refresh(self):
+        """
+        Copy the live database into the snapshot file using SQLite's online backup API.
+
+        The copy is written to a temporary file of its own and atomically swapped in, so
+        readers that already hold a connection keep a consistent view of the previous
+        snapshot, and refreshes running at the same time in other processes never write
+        to each other's copy.
+        """
+        try:
+            directory, name = os.path.split(os.path.abspath(self.snapshot_path))
+            fd, tmp_path = tempfile.mkstemp(prefix=f'{name}.', suffix='.tmp', dir=directory)
+            os.close(fd)
+            try:
+                source = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+                target = sqlite3.connect(tmp_path)
+                try:
+                    source.backup(target, pages=self.pages_per_step)
+                    target.execute('PRAGMA journal_mode=DELETE')
+                finally:
+                    target.close()
+                    source.close()
+                os.replace(tmp_path, self.snapshot_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except Exception as e:
+            print(e)
+        finally:
+            with self._lock:
+                self._refreshing = False
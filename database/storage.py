@@ -0,0 +1,722 @@
+import os
+import csv
+import time
+import uuid
+import datetime
+import threading
+from abc import ABC, abstractmethod
+from utils.periods import resolve_period, to_epoch, trade_buckets
+from database.records import TRADE_FIELDS, Trade, TradeBatch
+from database.streaming import aiterate
+
+
+# Column order expected by _to_trade; every read query selects exactly these.
+TRADE_COLUMNS = ", ".join(TRADE_FIELDS)
+
+# Header of exported CSV files, matching TRADE_COLUMNS.
+CSV_HEADER = ['ID', 'Date', 'Time', 'Ticker', 'Side', 'Status', 'PnL', 'R:R Ratio', 'Strategy', 'Photo',
+              'Currency', 'PnL (Account)']
+
+# Market-data columns filled by analytics.market_data: entry price and maximum
+# adverse/favourable excursion in price units. NULL until a trade is enriched.
+EXCURSION_COLUMNS = ('entry_price', 'mae', 'mfe')
+
+# Editing any of these fields invalidates a trade's excursions.
+EXCURSION_INPUTS = ('ticker', 'date', 'time', 'side')
+
+# Editing any of these fields moves a trade to other weekday/hour buckets.
+BUCKET_INPUTS = ('date', 'time')
+
+# Editing any of these fields changes a trade's PnL in the account currency (see analytics.fx).
+NORMALIZATION_INPUTS = ('ticker', 'pnl', 'date', 'time')
+
+
+# Seconds a check of the change feed for other processes' writes is reused. State kept
+# from write listeners asks on every access, so another process's write is picked up
+# within this delay while the checks in between cost no query.
+FOREIGN_CHECK_INTERVAL = 1.0
+
+# Tags this process's entries in the change feed. The pid tells forked workers apart,
+# the random part processes on other hosts sharing a PostgreSQL journal.
+_ORIGIN_PREFIX = uuid.uuid4().hex[:8]
+
+
+def change_origin():
+    """Origin recorded with the change-feed entries written by this process."""
+    return f"{_ORIGIN_PREFIX}-{os.getpid()}"
+
+
+def message_source_key(message):
+    """Idempotency key of a trade saved from a Telegram message: chat id and message id."""
+    return f"{message.chat_id}:{message.message_id}"
+
+
+class TradeStorage(ABC):
+    """
+    Storage interface every handler depends on.
+
+    Queries are written once here with `?` placeholders against a DB-API connection
+    returned by `_connect()`; backends supply the connection, the schema and faster
+    versions of bulk reads where their engine has one (server-side cursors, COPY).
+    """
+
+    # Exception class raised by the backend's driver.
+    Error = Exception
+
+    # Write listeners are shared by every instance that points at the same database, so
+    # in-memory indexes stay in sync no matter which handler performed the write.
+    _write_listeners = {}
+    # Per-database counter bumped on every write; lets caches key results by data version.
+    _data_versions = {}
+    # Per-database `normalizer(ticker, pnl, entry_ts) -> (currency, pnl_account)` applied on writes.
+    _pnl_normalizers = {}
+    # Per-instance QueryCache of trade lookups, see set_query_cache.
+    _query_cache = None
+    # Per-database (checked_at, from_seq, last_seq, last_foreign_seq) of the latest change-feed
+    # check, shared by every consumer of foreign_changes_since in this process.
+    _feed_probes = {}
+    _feed_probe_lock = threading.Lock()
+    # Seconds a change-feed check is reused; 0 checks the database on every call.
+    foreign_check_interval = FOREIGN_CHECK_INTERVAL
+
+    @abstractmethod
+    def _connect(self):
+        """Open a DB-API connection; closing it releases it."""
+
+    @abstractmethod
+    def _init_db(self):
+        """Create the tables and indexes if they do not exist."""
+
+    @abstractmethod
+    def _storage_key(self):
+        """Identifies the underlying database, so listeners are shared per database."""
+
+    @abstractmethod
+    def _insert_trade(self, cursor, row):
+        """
+        Insert a trade row (date, time, ticker, win_loss, side, rr, pnl, strategy, picture, entry_ts,
+        source_key, currency, pnl_account, weekday, hour) and return its id, or None if a trade with
+        the same source_key already exists.
+        """
+
+    def _lock_change_feed(self, cursor):
+        """Hook for backends whose sequences can commit out of order (see _record_changes)."""
+
+    def _record_changes(self, cursor, trade_ids, op):
+        """
+        Append writes to the `trade_changes` feed in the transaction that makes them, so the feed
+        never misses or invents a change. `op` is 'upsert', 'delete' or 'clear' (trade id None).
+        Consumers track the highest `seq` they shipped; see database.sync.
+        """
+        self._lock_change_feed(cursor)
+        origin = change_origin()
+        cursor.executemany("INSERT INTO trade_changes (trade_id, op, origin) VALUES (?, ?, ?)",
+                           [(trade_id, op, origin) for trade_id in trade_ids])
+
+    def get_changes(self, after_seq=0, limit=1000):
+        """
+        Read the change feed after a watermark, with each changed trade's current row.
+
+        Returns:
+            list: Dictionaries with 'seq', 'op', 'trade_id' and 'trade' (None unless op is 'upsert');
+                an upsert of a trade that has since been deleted is reported as a delete.
+        """
+        columns = ", ".join(f"t.{column}" for column in TRADE_COLUMNS.split(", "))
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute(f'''
+            SELECT c.seq, c.op, c.trade_id, {columns}
+            FROM trade_changes c LEFT JOIN trades t ON t.id = c.trade_id
+            WHERE c.seq > ? ORDER BY c.seq LIMIT ?
+        ''', (after_seq, limit))
+        rows = c.fetchall()
+        conn.close()
+
+        changes = []
+        for row in rows:
+            seq, op, trade_id, trade = row[0], row[1], row[2], row[3:]
+            if op == 'upsert' and trade[0] is None:
+                op = 'delete'
+            changes.append({'seq': seq, 'op': op, 'trade_id': trade_id,
+                            'trade': self._to_trade(trade) if op == 'upsert' else None})
+        return changes
+
+    def last_change_seq(self):
+        """Highest sequence number of the change feed (0 if empty)."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute("SELECT MAX(seq) FROM trade_changes")
+        seq = c.fetchone()[0]
+        conn.close()
+        return seq or 0
+
+    def _probe_feed(self, after_seq):
+        """Highest seq of the feed, and highest seq written by another process (0 if none), after `after_seq`."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''
+            SELECT MAX(seq), MAX(CASE WHEN origin IS NULL OR origin <> ? THEN seq END)
+            FROM trade_changes WHERE seq > ?
+        ''', (change_origin(), after_seq))
+        last_seq, last_foreign = c.fetchone()
+        conn.close()
+        return last_seq or after_seq, last_foreign or 0
+
+    def foreign_changes_since(self, after_seq, max_age=None):
+        """
+        Check the change feed for writes made by other processes, e.g. the other workers of
+        `main.py --workers N` or the command-line loaders. Write listeners only see this
+        process's writes, so state kept from them calls this before use and rebuilds itself
+        if another process wrote.
+
+        The database is read at most every `foreign_check_interval` seconds, by whichever
+        consumer asks first; the other checks are answered from that reading.
+
+        Args:
+            after_seq (int): Change-feed position the caller's state reflects.
+            max_age (float): Seconds a reading may be reused, instead of `foreign_check_interval`;
+                0 always reads the database.
+
+        Returns:
+            tuple: (highest seq of the feed, whether another process wrote after `after_seq`)
+        """
+        key = self._storage_key()
+        with self._feed_probe_lock:
+            probe = self._feed_probes.get(key)
+            now = time.monotonic()
+            if probe is None or after_seq < probe[1]:
+                # The reading does not reach back to `after_seq`: start one from there.
+                probe = (now, after_seq, *self._probe_feed(after_seq))
+            elif now - probe[0] >= (self.foreign_check_interval if max_age is None else max_age):
+                last_seq, last_foreign = self._probe_feed(probe[2])
+                probe = (now, probe[1], last_seq, max(probe[3], last_foreign))
+            self._feed_probes[key] = probe
+        _, _, last_seq, last_foreign = probe
+        return max(last_seq, after_seq), last_foreign > after_seq
+
+    def add_write_listener(self, listener):
+        """
+        Register `listener(event, trade_id, before, after)` to be called after every write.
+
+        `event` is one of 'save', 'update', 'delete' or 'clear'; `before` and `after`
+        describe the row around the change (or are None): Trade records as read, or
+        dictionaries with the written fields plus entry_ts, weekday and hour.
+        """
+        self._write_listeners.setdefault(self._storage_key(), []).append(listener)
+
+    def set_pnl_normalizer(self, normalizer):
+        """
+        Register `normalizer(ticker, pnl, entry_ts)` returning a trade's (currency, pnl_account),
+        applied whenever a trade is saved or its PnL inputs are edited. Without one, trades are
+        saved with NULL currency and pnl_account.
+        """
+        self._pnl_normalizers[self._storage_key()] = normalizer
+
+    def _normalize_pnl(self, ticker, pnl, entry_ts):
+        normalizer = self._pnl_normalizers.get(self._storage_key())
+        if normalizer is None:
+            return None, None
+        try:
+            return normalizer(ticker, pnl, entry_ts)
+        except Exception as e:
+            print(f"PnL normalization failed: {e}")
+            return None, None
+
+    def set_query_cache(self, cache):
+        """
+        Serve trade lookups by id, date range, ticker, side and status through `cache`
+        (a database.query_cache.QueryCache), or directly from the database if None.
+
+        Set per instance rather than per database: a snapshot reader of the same file
+        lags behind the change feed the cache invalidates from, so it must not share it.
+        """
+        self._query_cache = cache
+
+    def query_cache_stats(self):
+        """Hit rate and memory of the lookup cache, or None if lookups are not cached."""
+        return self._query_cache.stats() if self._query_cache else None
+
+    def data_version(self):
+        """Number of writes made through this process to the database since it started."""
+        return self._data_versions.get(self._storage_key(), 0)
+
+    def _notify(self, event, trade_id=None, before=None, after=None):
+        """Bump the data version and call the write listeners of this database."""
+        key = self._storage_key()
+        self._data_versions[key] = self._data_versions.get(key, 0) + 1
+        for listener in self._write_listeners.get(key, ()):
+            try:
+                listener(event, trade_id, before, after)
+            except Exception as e:
+                print(f"Write listener failed: {e}")
+
+
+    def save_trade(self, date, ticker, time, win_loss, side, rr, pnl, strategy, picture, tz_name='UTC',
+                   source_key=None):
+        """
+        Save a trade record to the database. `tz_name` is the timezone the date/time were entered in.
+
+        `source_key` identifies the Telegram message the trade comes from (see `message_source_key()`).
+        Saving the same key again, e.g. from a redelivered update, inserts nothing and returns
+        the id of the trade saved the first time.
+        """
+        conn = None
+        try:
+            conn = self._connect()
+            c = conn.cursor()
+            entry_ts = to_epoch(date, time, tz_name)
+            currency, pnl_account = self._normalize_pnl(ticker, pnl, entry_ts)
+            weekday, hour = trade_buckets(date, time)
+            trade_id = self._insert_trade(
+                c, (date, time, ticker, win_loss, side, rr, pnl, strategy, picture, entry_ts, source_key,
+                    currency, pnl_account, weekday, hour)
+            )
+            if trade_id is None:
+                c.execute("SELECT id FROM trades WHERE source_key = ?", (source_key,))
+                existing_id = c.fetchone()[0]
+                conn.commit()
+                return existing_id
+
+            self._record_changes(c, [trade_id], 'upsert')
+            conn.commit()
+            self._notify('save', trade_id, after={
+                'id': trade_id, 'date': date, 'time': time, 'ticker': ticker, 'side': side,
+                'win_loss': win_loss, 'pnl': pnl, 'rr': rr, 'strategy': strategy, 'picture': picture,
+                'currency': currency, 'pnl_account': pnl_account, 'entry_ts': entry_ts,
+                'weekday': weekday, 'hour': hour,
+            })
+            return trade_id
+
+        except ValueError as e:
+            print(f"Invalid trade date or time: {e}")
+            return None
+
+        except self.Error as e:
+            print(f"An error occurred: {e}")
+            return None
+
+        finally:
+            if conn:
+                conn.close()
+
+
+    def _fetch_trades(self, where, params):
+        """Run a SELECT of TRADE_COLUMNS with the given WHERE clause and return Trade records."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute(f"SELECT {TRADE_COLUMNS} FROM trades WHERE {where}", params)
+        trades = c.fetchall()
+        conn.close()
+
+        return [self._to_trade(trade) for trade in trades]
+
+    def _iter_rows(self, query, params, batch_size=1000, convert=None):
+        """
+        Yield the rows of a query (mapped through `convert`), reading `batch_size` rows at a
+        time from a streaming cursor so memory stays flat however large the result is.
+        Closing the generator early closes the cursor and returns the connection.
+        """
+        conn = self._connect()
+        try:
+            c = self._stream_cursor(conn)
+            c.execute(query, params)
+            while True:
+                rows = c.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from (map(convert, rows) if convert else rows)
+        finally:
+            conn.close()
+
+    def _iter_trades(self, where, params, batch_size=1000):
+        return self._iter_rows(f"SELECT {TRADE_COLUMNS} FROM trades WHERE {where}", params, batch_size, Trade._make)
+
+    def _lookup_trades(self, key, predicate, where, params):
+        """
+        _fetch_trades through the query cache, if one is set. `key` normalizes the query and
+        `predicate(trade)` must select exactly the rows `where` does, so writes can evict it.
+        """
+        if self._query_cache is None:
+            return self._fetch_trades(where, params)
+        return self._query_cache.get(key, predicate, lambda: self._fetch_trades(where, params))
+
+    def _iter_lookup(self, key, predicate, where, params, batch_size=1000):
+        """Streaming _lookup_trades: rows come from the query cache if it holds them, and fill it otherwise."""
+        if self._query_cache is None:
+            return self._iter_trades(where, params, batch_size)
+        return self._query_cache.iterate(key, predicate, lambda: self._iter_trades(where, params, batch_size))
+
+    @staticmethod
+    def _date_query(start_date, end_date):
+        """(key, predicate, where, params) of a date range lookup."""
+        start, end = str(start_date), str(end_date)
+        return ('date', start, end), lambda trade: start <= str(trade.date) <= end, "date BETWEEN ? AND ?", (start, end)
+
+    @staticmethod
+    def _column_query(column, value):
+        """(key, predicate, where, params) of a lookup by one column's value."""
+        return (column, value), lambda trade: trade[column] == value, f"{column} = ?", (value,)
+
+    def get_trades_by_date_range(self, start_date, end_date):
+        """Fetch trades from the database within the specified date range."""
+        return self._lookup_trades(*self._date_query(start_date, end_date))
+
+    def iter_trades_by_date_range(self, start_date, end_date, batch_size=1000):
+        """Streaming get_trades_by_date_range."""
+        return self._iter_lookup(*self._date_query(start_date, end_date), batch_size)
+
+    def aiter_trades_by_date_range(self, start_date, end_date, batch_size=1000):
+        """Async streaming get_trades_by_date_range (see database.streaming)."""
+        return aiterate(lambda: self.iter_trades_by_date_range(start_date, end_date, batch_size),
+                        chunk_size=batch_size)
+
+    def get_trade_by_id(self, trade_id):
+        """Retrieve and search records by trade's ID."""
+        try:
+            trade_id = int(trade_id)
+        except (TypeError, ValueError):
+            return None
+        trades = self._lookup_trades(*self._column_query('id', trade_id))
+        return trades[0] if trades else None
+
+    def get_trades_by_ticker(self, ticker_name):
+        """Retrieve and search records by trade's ticker."""
+        return self._lookup_trades(*self._column_query('ticker', ticker_name))
+
+    def iter_trades_by_ticker(self, ticker_name, batch_size=1000):
+        """Streaming get_trades_by_ticker."""
+        return self._iter_lookup(*self._column_query('ticker', ticker_name), batch_size)
+
+    def aiter_trades_by_ticker(self, ticker_name, batch_size=1000):
+        """Async streaming get_trades_by_ticker (see database.streaming)."""
+        return aiterate(lambda: self.iter_trades_by_ticker(ticker_name, batch_size), chunk_size=batch_size)
+
+    def get_trades_by_side(self, side):
+        """Retrieve and search records by trade's side (Long/Short)."""
+        return self._lookup_trades(*self._column_query('side', side))
+
+    def iter_trades_by_side(self, side, batch_size=1000):
+        """Streaming get_trades_by_side."""
+        return self._iter_lookup(*self._column_query('side', side), batch_size)
+
+    def aiter_trades_by_side(self, side, batch_size=1000):
+        """Async streaming get_trades_by_side (see database.streaming)."""
+        return aiterate(lambda: self.iter_trades_by_side(side, batch_size), chunk_size=batch_size)
+
+    def get_trades_by_status(self, status):
+        """Retrieve and search records by trade's status (Win/Loss)."""
+        return self._lookup_trades(*self._column_query('win_loss', status))
+
+    def iter_trades_by_status(self, status, batch_size=1000):
+        """Streaming get_trades_by_status."""
+        return self._iter_lookup(*self._column_query('win_loss', status), batch_size)
+
+    def aiter_trades_by_status(self, status, batch_size=1000):
+        """Async streaming get_trades_by_status (see database.streaming)."""
+        return aiterate(lambda: self.iter_trades_by_status(status, batch_size), chunk_size=batch_size)
+
+    def _bucket_filters(self, weekday, hour):
+        clauses, params = ["1 = 1"], []
+        if weekday is not None:
+            clauses.append("weekday = ?")
+            params.append(weekday)
+        if hour is not None:
+            clauses.append("hour = ?")
+            params.append(hour)
+        return " AND ".join(clauses), params
+
+    def get_trades_by_bucket(self, weekday=None, hour=None):
+        """Retrieve trades entered on a weekday (Monday = 0) and/or hour of day, using their bucket index."""
+        where, params = self._bucket_filters(weekday, hour)
+        return self._fetch_trades(f"{where} ORDER BY entry_ts, id", params)
+
+    def iter_trades_by_bucket(self, weekday=None, hour=None, batch_size=1000):
+        """Streaming get_trades_by_bucket."""
+        where, params = self._bucket_filters(weekday, hour)
+        return self._iter_trades(f"{where} ORDER BY entry_ts, id", params, batch_size)
+
+    def aiter_trades_by_bucket(self, weekday=None, hour=None, batch_size=1000):
+        """Async streaming get_trades_by_bucket (see database.streaming)."""
+        return aiterate(lambda: self.iter_trades_by_bucket(weekday, hour, batch_size), chunk_size=batch_size)
+
+    def count_trades_by_bucket(self, weekday=None, hour=None):
+        """Number of trades in a weekday/hour bucket, counted on the bucket index."""
+        where, params = self._bucket_filters(weekday, hour)
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute(f"SELECT COUNT(*) FROM trades WHERE {where}", params)
+        count = c.fetchone()[0]
+        conn.close()
+        return count
+
+    def get_all_tickers(self):
+        """Fetch all unique tickers from the database."""
+        try:
+            conn = self._connect()
+            c = conn.cursor()
+            c.execute("SELECT DISTINCT ticker FROM trades")
+            tickers = [row[0] for row in c.fetchall()]
+            conn.close()
+            return tickers
+        except self.Error as e:
+            print(f"An error occurred: {e}")
+            return []
+
+
+    def _export_filters(self, ticker=None, period=None, start_date=None, end_date=None,
+                        tz_name='UTC', session_start='00:00', strategy=None):
+        """
+        Build the WHERE clause and parameters shared by export and analytics queries.
+        Periods are resolved in the user's timezone and trading session, and queried on `entry_ts`.
+        Without a period or date range every trade matches.
+        """
+        if period:
+            period_range = resolve_period(period, tz_name, session_start)
+            clauses = ["entry_ts >= ?", "entry_ts < ?"]
+            params = [period_range.start_ts, period_range.end_ts]
+        elif start_date and end_date:
+            start_date = datetime.datetime.strptime(str(start_date), '%Y-%m-%d').date()
+            end_date = datetime.datetime.strptime(str(end_date), '%Y-%m-%d').date()
+            clauses = ["date BETWEEN ? AND ?"]
+            params = [start_date.isoformat(), end_date.isoformat()]
+        else:
+            clauses, params = ["1 = 1"], []
+
+        if ticker:
+            clauses.append("ticker = ?")
+            params.append(ticker)
+        if strategy:
+            clauses.append("strategy = ?")
+            params.append(strategy)
+
+        return " AND ".join(clauses), params
+
+    def _require_range(self, period, start_date, end_date):
+        if not period and not (start_date and end_date):
+            raise ValueError("Either period or custom date range must be specified.")
+
+    def get_trades_for_export(self, ticker=None, period=None, start_date=None, end_date=None,
+                              tz_name='UTC', session_start='00:00', strategy=None):
+        """Fetch trades for a specified ticker/strategy and period, or custom date range."""
+        self._require_range(period, start_date, end_date)
+        where, params = self._export_filters(ticker, period, start_date, end_date, tz_name, session_start, strategy)
+        return self._fetch_trades(where, params)
+
+    def _stream_cursor(self, conn):
+        """Cursor used for reads that are consumed in batches."""
+        return conn.cursor()
+
+    def iter_trades_for_export(self, batch_size=1000, **filters):
+        """
+        Yield the trades of get_trades_for_export in trade order, reading `batch_size` rows
+        at a time so memory stays flat however large the result is.
+        """
+        self._require_range(filters.get('period'), filters.get('start_date'), filters.get('end_date'))
+        where, params = self._export_filters(**filters)
+        return self._iter_trades(f"{where} ORDER BY entry_ts, id", params, batch_size)
+
+    def aiter_trades_for_export(self, batch_size=1000, **filters):
+        """Async iter_trades_for_export (see database.streaming)."""
+        self._require_range(filters.get('period'), filters.get('start_date'), filters.get('end_date'))
+        return aiterate(lambda: self.iter_trades_for_export(batch_size, **filters), chunk_size=batch_size)
+
+    def get_trade_batch(self, batch_size=10000, **filters):
+        """
+        The trades of get_trades_for_export as one columnar TradeBatch, read `batch_size`
+        rows at a time so no list of rows or records is ever built.
+        """
+        self._require_range(filters.get('period'), filters.get('start_date'), filters.get('end_date'))
+        where, params = self._export_filters(**filters)
+        batch = TradeBatch()
+        conn = self._connect()
+        try:
+            c = self._stream_cursor(conn)
+            c.execute(f"SELECT {TRADE_COLUMNS} FROM trades WHERE {where} ORDER BY entry_ts, id", params)
+            while True:
+                rows = c.fetchmany(batch_size)
+                if not rows:
+                    break
+                batch.extend(rows)
+        finally:
+            conn.close()
+        return batch
+
+    def write_trades_csv(self, file, **filters):
+        """
+        Write the trades of get_trades_for_export as CSV (with CSV_HEADER) to a text file object.
+
+        Returns:
+            int: Number of trades written.
+        """
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        count = 0
+        for trade in self.iter_trades_for_export(**filters):
+            writer.writerow(trade)
+            count += 1
+        return count
+
+    def get_trade_outcomes(self, **filters):
+        """
+        Fetch (win_loss, rr) pairs in trade order, filtered like get_trades_for_export.
+        Only the two columns needed for risk analytics are read.
+        """
+        return list(self.iter_trade_outcomes(**filters))
+
+    def iter_trade_outcomes(self, batch_size=1000, **filters):
+        """Streaming get_trade_outcomes."""
+        where, params = self._export_filters(**filters)
+        return self._iter_rows(f"SELECT win_loss, rr FROM trades WHERE {where} ORDER BY entry_ts, id", params,
+                               batch_size, tuple)
+
+    def aiter_trade_outcomes(self, batch_size=1000, **filters):
+        """Async streaming get_trade_outcomes (see database.streaming)."""
+        return aiterate(lambda: self.iter_trade_outcomes(batch_size, **filters), chunk_size=batch_size)
+
+    def get_user_settings(self, user_id):
+        """Fetch all stored settings of a user as a dictionary."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute("SELECT key, value FROM user_settings WHERE user_id = ?", (user_id,))
+        settings = dict(c.fetchall())
+        conn.close()
+        return settings
+
+    def set_user_setting(self, user_id, key, value):
+        """Store a single user setting, replacing any previous value."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''
+            INSERT INTO user_settings (user_id, key, value) VALUES (?, ?, ?)
+            ON CONFLICT (user_id, key) DO UPDATE SET value = excluded.value
+        ''', (user_id, key, value))
+        conn.commit()
+        conn.close()
+
+    def delete_user_setting(self, user_id, key):
+        """Remove a single user setting."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute("DELETE FROM user_settings WHERE user_id = ? AND key = ?", (user_id, key))
+        conn.commit()
+        conn.close()
+
+    def update_trade(self, trade_id: int, tz_name=None, **updates):
+        """
+        Update fields of a trade. Date/time edits recompute `entry_ts` in the same transaction,
+        in `tz_name` if given and otherwise at the UTC offset the trade was saved with.
+
+        Raises:
+            ValueError: If the new date or time is malformed; nothing is written then.
+        """
+        before = self.get_trade_by_id(trade_id)
+        after = {**before, **updates} if before else None
+        moved = after is not None and any(key in BUCKET_INPUTS for key in updates)
+        if moved:
+            # Parsed before connecting, so a malformed date or time writes nothing
+            new_local = to_epoch(after['date'], after['time'], tz_name or 'UTC')
+            old_local = to_epoch(before['date'], before['time'])
+        conn = self._connect()
+        c = conn.cursor()
+        entry_ts = None
+        if before:
+            c.execute("SELECT entry_ts FROM trades WHERE id = ?", (trade_id,))
+            entry_ts = c.fetchone()[0]
+        if moved:
+            entry_ts = new_local if tz_name or entry_ts is None else entry_ts + new_local - old_local
+            after.update(entry_ts=entry_ts)
+        for key, value in updates.items():
+            c.execute(f'UPDATE trades SET {key} = ? WHERE id = ?', (value, trade_id))
+        if any(key in EXCURSION_INPUTS for key in updates):
+            # Recomputed by the next enrichment run
+            c.execute("UPDATE trades SET entry_price = NULL, mae = NULL, mfe = NULL WHERE id = ?", (trade_id,))
+        if moved:
+            weekday, hour = trade_buckets(after['date'], after['time'])
+            c.execute("UPDATE trades SET entry_ts = ?, weekday = ?, hour = ? WHERE id = ?",
+                      (entry_ts, weekday, hour, trade_id))
+            after.update(weekday=weekday, hour=hour)
+        if after and any(key in NORMALIZATION_INPUTS for key in updates):
+            currency, pnl_account = self._normalize_pnl(after['ticker'], after['pnl'], entry_ts)
+            c.execute("UPDATE trades SET currency = ?, pnl_account = ? WHERE id = ?", (currency, pnl_account, trade_id))
+            after.update(currency=currency, pnl_account=pnl_account)
+        if before:
+            self._record_changes(c, [trade_id], 'upsert')
+        conn.commit()
+        conn.close()
+        if before:
+            self._notify('update', before['id'], before=before, after=after)
+
+    def save_excursions(self, rows):
+        """Store market-data enrichment results, given as (entry_price, mae, mfe, trade_id) rows."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.executemany("UPDATE trades SET entry_price = ?, mae = ?, mfe = ? WHERE id = ?", rows)
+        self._record_changes(c, [row[3] for row in rows], 'upsert')
+        conn.commit()
+        conn.close()
+
+    def save_normalized_pnl(self, rows):
+        """Store account-currency PnL computed by analytics.fx, given as (currency, pnl_account, trade_id) rows."""
+        conn = self._connect()
+        c = conn.cursor()
+        c.executemany("UPDATE trades SET currency = ?, pnl_account = ? WHERE id = ?", rows)
+        self._record_changes(c, [row[2] for row in rows], 'upsert')
+        conn.commit()
+        conn.close()
+
+    def remove_trade_by_id(self, trade_id: int):
+        before = self.get_trade_by_id(trade_id)
+        conn = self._connect()
+        c = conn.cursor()
+        query = "DELETE FROM trades WHERE id = ?"
+        c.execute(query, (trade_id,))
+        if before:
+            self._record_changes(c, [trade_id], 'delete')
+        conn.commit()
+        conn.close()
+        if before:
+            self._notify('delete', before['id'], before=before)
+
+    def remove_trades_by_ids(self, trade_ids):
+        """
+        Remove several trades in one transaction, e.g. the duplicates found by database.dedup.
+
+        Returns:
+            int: Number of trades removed.
+        """
+        trade_ids = list(trade_ids)
+        befores = []
+        conn = self._connect()
+        c = conn.cursor()
+        # Chunked, so no statement exceeds SQLite's limit on bound parameters.
+        for start in range(0, len(trade_ids), 500):
+            chunk = trade_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            c.execute(f"SELECT {TRADE_COLUMNS} FROM trades WHERE id IN ({placeholders}) ORDER BY id", chunk)
+            befores += [self._to_trade(row) for row in c.fetchall()]
+            c.execute(f"DELETE FROM trades WHERE id IN ({placeholders})", chunk)
+        if befores:
+            self._record_changes(c, [before['id'] for before in befores], 'delete')
+        conn.commit()
+        conn.close()
+        for before in befores:
+            self._notify('delete', before['id'], before=before)
+        return len(befores)
+
+    def remove_all_trades(self):
+        conn = self._connect()
+        c = conn.cursor()
+        query = "DELETE FROM trades"
+        c.execute(query)
+        self._record_changes(c, [None], 'clear')
+        conn.commit()
+        conn.close()
+        self._notify('clear')
+
+    def delete_all_data(self):
+        self.remove_all_trades()
+
+
+    def _to_trade(self, row):
+        """Convert a row of TRADE_COLUMNS to a Trade record."""
+        return Trade._make(row) if row else None
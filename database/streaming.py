@@ -0,0 +1,92 @@
+"""
+Async iteration over the blocking, chunked reads of TradeStorage.
+
+DB-API drivers block, and a SQLite connection may only be used by the thread that
+opened it, so a stream runs its iterator start to finish in one producer thread and
+hands rows to the event loop in chunks. At most `prefetch` chunks wait in between,
+so a slow consumer (e.g. one sending Telegram messages) holds the reader back instead
+of letting the whole result pile up in memory.
+
+Leaving an `async for` early does not stop an async generator by itself; wrap the
+stream in `contextlib.aclosing()` (or cancel the consuming task) so the producer
+stops and closes its cursor right away.
+"""
+import asyncio
+import threading
+import contextvars
+from itertools import islice
+
+
+_DONE = object()
+
+
+class _Failure:
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+async def aiterate(make_iterator, chunk_size=500, prefetch=2):
+    """
+    Iterate a blocking iterator from the event loop without blocking it.
+
+    Args:
+        make_iterator (callable): Returns the iterator; called in the producer thread, so
+            the connection it opens belongs to that thread.
+        chunk_size (int): Items handed over to the event loop at a time.
+        prefetch (int): Chunks the producer may read ahead of the consumer.
+
+    Yields:
+        The items of the iterator, in order.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    slots = threading.Semaphore(prefetch)
+    stopped = threading.Event()
+
+    def send(item):
+        try:
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+        except RuntimeError:
+            # The event loop is gone (shutdown); nobody is waiting for the stream.
+            stopped.set()
+
+    def produce():
+        try:
+            iterator = make_iterator()
+            try:
+                while not stopped.is_set():
+                    chunk = list(islice(iterator, chunk_size))
+                    if not chunk:
+                        break
+                    while not slots.acquire(timeout=0.1):
+                        if stopped.is_set():
+                            return
+                    send(chunk)
+            finally:
+                # Closes the cursor and connection in the thread that opened them.
+                close = getattr(iterator, 'close', None)
+                if close is not None:
+                    close()
+        except Exception as e:
+            send(_Failure(e))
+        finally:
+            send(_DONE)
+
+    # The producer runs in the caller's context, like asyncio.to_thread, so context variables
+    # (e.g. the /profile handler attribution) carry over to the reads.
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(produce,), name='trade-stream', daemon=True).start()
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk is _DONE:
+                return
+            if isinstance(chunk, _Failure):
+                raise chunk.error
+            slots.release()
+            for item in chunk:
+                yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,206 @@
+"""
+Incremental journal sync driven by the `trade_changes` change feed.
+
+Every write to `trades` appends a row with a monotonically increasing `seq` to the feed
+(see TradeStorage._record_changes). A sync target remembers the highest `seq` it has
+shipped (its watermark, stored in the `sync_watermarks` table) and each run sends only
+the trades changed since then, in batches, advancing the watermark after each batch.
+Delivery is at-least-once: a run interrupted between sending a batch and storing its
+watermark sends that batch again, so consumers should key rows by `seq` or trade id.
+
+Targets:
+    jsonl DIR   append {"seq", "op", "id", "trade"} lines to DIR/trades_changes.jsonl
+    csv DIR     append rows (Seq, Op and the export columns) to DIR/trades_changes.csv
+    http URL    POST {"watermark": seq, "changes": [...]} as JSON to a local endpoint
+
+Usage:
+    python -m database.sync jsonl data/sync
+    python -m database.sync csv data/sync --watch 60
+    python -m database.sync http http://127.0.0.1:8080/journal
+"""
+import os
+import csv
+import json
+import time
+import argparse
+import urllib.request
+from abc import ABC, abstractmethod
+
+from database.storage import TradeStorage, CSV_HEADER
+
+
+CHANGES_FILE = 'trades_changes'
+
+
+class SyncWatermarks:
+    """Highest change `seq` shipped to each target, kept in the journal database."""
+
+    def __init__(self, trades_db: TradeStorage):
+        self.trades_db = trades_db
+        conn = trades_db._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_watermarks (
+                target TEXT PRIMARY KEY,
+                seq BIGINT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def get(self, target):
+        conn = self.trades_db._connect()
+        row = conn.execute("SELECT seq FROM sync_watermarks WHERE target = ?", (target,)).fetchone()
+        conn.close()
+        return row[0] if row else 0
+
+    def set(self, target, seq):
+        conn = self.trades_db._connect()
+        conn.execute('''
+            INSERT INTO sync_watermarks (target, seq) VALUES (?, ?)
+            ON CONFLICT (target) DO UPDATE SET seq = excluded.seq
+        ''', (target, seq))
+        conn.commit()
+        conn.close()
+
+
+def collapse(changes):
+    """
+    Keep only the last change of each trade in a batch, in feed order, so a trade edited
+    several times between two syncs is shipped once with its current row.
+
+    Returns:
+        list: JSON-ready records with 'seq', 'op', 'id' and 'trade'.
+    """
+    latest = {}
+    for change in changes:
+        # 'clear' has no trade id; each one is kept.
+        key = change['trade_id'] if change['trade_id'] is not None else ('clear', change['seq'])
+        latest.pop(key, None)
+        latest[key] = change
+    return [{'seq': change['seq'], 'op': change['op'], 'id': change['trade_id'],
+             'trade': change['trade']._asdict() if change['trade'] else None}
+            for change in latest.values()]
+
+
+class FileTarget(ABC):
+    """Appends changes to one file in a directory watched by the consumer."""
+
+    extension = None
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, f'{CHANGES_FILE}.{self.extension}')
+        self.name = f'{self.extension}:{os.path.abspath(self.path)}'
+
+    @abstractmethod
+    def _write(self, file, records, new_file):
+        """Write `records` to the open file; `new_file` tells whether it was just created."""
+
+    def send(self, records):
+        os.makedirs(self.directory, exist_ok=True)
+        new_file = not os.path.exists(self.path)
+        with open(self.path, 'a', newline='', encoding='utf-8') as file:
+            self._write(file, records, new_file)
+            file.flush()
+            # On disk before the watermark moves past these changes.
+            os.fsync(file.fileno())
+
+
+class JsonlTarget(FileTarget):
+    """One JSON object per change."""
+
+    extension = 'jsonl'
+
+    def _write(self, file, records, new_file):
+        for record in records:
+            file.write(json.dumps(record) + '\n')
+
+
+class CsvTarget(FileTarget):
+    """One row per change: Seq, Op and the columns of a CSV export (only the ID for deletions)."""
+
+    extension = 'csv'
+
+    def _write(self, file, records, new_file):
+        writer = csv.writer(file)
+        if new_file:
+            writer.writerow(['Seq', 'Op'] + CSV_HEADER)
+        for record in records:
+            values = list(record['trade'].values()) if record['trade'] else [record['id']]
+            writer.writerow([record['seq'], record['op']] + values)
+
+
+class HttpTarget:
+    """POSTs each batch as JSON; any response other than 2xx stops the sync without moving the watermark."""
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self.name = f'http:{url}'
+
+    def send(self, records):
+        body = json.dumps({'watermark': records[-1]['seq'], 'changes': records}).encode()
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+TARGETS = {'jsonl': JsonlTarget, 'csv': CsvTarget, 'http': HttpTarget}
+
+
+def sync(trades_db: TradeStorage, target, batch_size=1000, watermarks=None):
+    """
+    Ship every change after the target's watermark.
+
+    Args:
+        trades_db (TradeStorage): The journal to read the change feed from.
+        target: A sync target with `name` and `send(records)`.
+        batch_size (int): Changes read and sent per batch.
+        watermarks (SyncWatermarks): Watermark store, created on demand.
+
+    Returns:
+        int: Number of records sent.
+    """
+    watermarks = watermarks or SyncWatermarks(trades_db)
+    seq = watermarks.get(target.name)
+    sent = 0
+    while True:
+        changes = trades_db.get_changes(seq, batch_size)
+        if not changes:
+            return sent
+        records = collapse(changes)
+        target.send(records)
+        seq = changes[-1]['seq']
+        watermarks.set(target.name, seq)
+        sent += len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('target', choices=TARGETS)
+    parser.add_argument('location', help="directory of a file target, or URL of the HTTP target")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help="keep running and sync whenever the feed has moved, checking every SECONDS")
+    args = parser.parse_args()
+
+    from utils.container import container
+    trades_db = container.trades_db
+    target = TARGETS[args.target](args.location)
+    watermarks = SyncWatermarks(trades_db)
+
+    while True:
+        if trades_db.last_change_seq() > watermarks.get(target.name):
+            started = time.perf_counter()
+            sent = sync(trades_db, target, args.batch_size, watermarks)
+            print(f"Synced {sent} changes to {target.name} in {time.perf_counter() - started:.1f}s")
+        elif not args.watch:
+            print(f"{target.name} is up to date")
+        if not args.watch:
+            return
+        time.sleep(args.watch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+import re
+import time
+import heapq
+import threading
+from bisect import bisect_left
+from itertools import islice
+
+from database.storage import TradeStorage, TRADE_COLUMNS
+
+
+# Trade fields that are searchable by prefix, besides the trade id.
+INDEXED_FIELDS = ('ticker', 'strategy', 'side', 'win_loss')
+
+
+class _TrieNode:
+    __slots__ = ('children', 'postings')
+
+    def __init__(self):
+        self.children = {}
+        # Trade ids carrying this exact token. A dict keeps insertion (≈ id) order,
+        # so reversed() yields the most recent trades first.
+        self.postings = None
+
+
+class _IdPrefix:
+    """Posting-like view of the trade ids whose decimal form starts with `prefix`."""
+
+    def __init__(self, ids, prefix):
+        self._ids = ids
+        self._prefix = prefix
+        # Ids starting with "12" are 12, 120-129, 1200-1299, ...: one slice of the
+        # sorted id list per digit count, each slice holding larger ids than the last.
+        self._slices = []
+        low, high = int(prefix), int(prefix) + 1
+        while ids and low and low <= ids[-1]:
+            start, end = bisect_left(ids, low), bisect_left(ids, high)
+            if start < end:
+                self._slices.append((start, end))
+            low, high = low * 10, high * 10
+
+    def __len__(self):
+        return sum(end - start for start, end in self._slices)
+
+    def __bool__(self):
+        return bool(self._slices)
+
+    def __contains__(self, trade_id):
+        if not str(trade_id).startswith(self._prefix):
+            return False
+        position = bisect_left(self._ids, trade_id)
+        return position < len(self._ids) and self._ids[position] == trade_id
+
+    def __reversed__(self):
+        for start, end in reversed(self._slices):
+            for position in range(end - 1, start - 1, -1):
+                yield self._ids[position]
+
+
+class TradeIndex:
+    """
+    In-memory prefix index over ticker, strategy, side, status and trade id.
+
+    The vocabulary of text fields is tiny (a handful of tickers and strategies), so the
+    trie stays small and each token holds an ordered posting set of trade ids. Ids are
+    matched by prefix through a sorted id list instead of the trie. The index is built
+    in a background thread and kept in sync through TradeStorage write listeners; until
+    it is ready, queries are answered from the database. Writes by other processes never
+    reach the listeners; the change feed reveals them, and the index is then rebuilt.
+    """
+
+    def __init__(self, trades_db: TradeStorage, cache_ttl=10, cache_size=1024):
+        """
+        Args:
+            trades_db (TradeStorage): The database to index.
+            cache_ttl (float): Seconds a query's result stays cached.
+            cache_size (int): Maximum number of cached queries.
+        """
+        self.trades_db = trades_db
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._root = _TrieNode()
+        self._ids = []
+        self._cache = {}
+        self._built = False
+        self._building = False
+        # Set by writes made while a build is reading the table; the build then starts over.
+        self._missed_writes = False
+        # Change-feed position the index reflects, apart from this process's later writes.
+        self._feed_seq = 0
+        self._lock = threading.Lock()
+        trades_db.add_write_listener(self._on_write)
+
+    @property
+    def ready(self):
+        """Whether the index is built and answers queries itself."""
+        return self._built
+
+    def build_in_background(self):
+        """Start building the index in a daemon thread unless it is built or being built."""
+        with self._lock:
+            if self._built or self._building:
+                return
+            self._building = True
+        threading.Thread(target=self.build, name='trade-index-build', daemon=True).start()
+
+    def build(self):
+        """Load every trade from the database into the index."""
+        try:
+            while True:
+                with self._lock:
+                    self._missed_writes = False
+                seq = self.trades_db.last_change_seq()
+                root, ids = self._load()
+                with self._lock:
+                    if self._missed_writes:
+                        continue
+                    self._root, self._ids, self._feed_seq = root, ids, seq
+                    self._cache.clear()
+                    self._built = True
+                    return
+        except Exception as e:
+            print(f"Building the trade index failed: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def _load(self):
+        """Read the indexed fields of every trade into a new trie and sorted id list."""
+        root, ids = _TrieNode(), []
+        conn = self.trades_db._connect()
+        try:
+            c = conn.cursor()
+            c.execute(f"SELECT id, {', '.join(INDEXED_FIELDS)} FROM trades ORDER BY id")
+            while True:
+                rows = c.fetchmany(10000)
+                if not rows:
+                    break
+                for row in rows:
+                    ids.append(row[0])
+                    for value in row[1:]:
+                        self._add_token(value, row[0], root)
+        finally:
+            conn.close()
+        return root, ids
+
+    def _node(self, token, create=False, root=None):
+        node = root or self._root
+        for char in token:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[char] = _TrieNode()
+            node = child
+        return node
+
+    def _add_token(self, value, trade_id, root=None):
+        if value is None:
+            return
+        node = self._node(str(value).lower(), create=True, root=root)
+        if node.postings is None:
+            node.postings = {}
+        node.postings[trade_id] = None
+
+    def _remove_token(self, value, trade_id):
+        if value is None:
+            return
+        node = self._node(str(value).lower())
+        if node is not None and node.postings:
+            node.postings.pop(trade_id, None)
+
+    def _on_write(self, event, trade_id, before, after):
+        """Write listener keeping the index in sync with the database."""
+        # Writes may come from executor threads while a search walks the trie, so the
+        # whole update happens under the lock searches hold.
+        with self._lock:
+            if not self._built:
+                self._missed_writes = True
+                return
+            self._cache.clear()
+            if event == 'clear':
+                self._root = _TrieNode()
+                self._ids = []
+                return
+            if before:
+                for field in INDEXED_FIELDS:
+                    self._remove_token(before[field], trade_id)
+                if event == 'delete':
+                    position = bisect_left(self._ids, trade_id)
+                    if position < len(self._ids) and self._ids[position] == trade_id:
+                        del self._ids[position]
+            if after:
+                for field in INDEXED_FIELDS:
+                    self._add_token(after[field], trade_id)
+                if event == 'save':
+                    if self._ids and self._ids[-1] > trade_id:
+                        self._ids.insert(bisect_left(self._ids, trade_id), trade_id)
+                    else:
+                        self._ids.append(trade_id)
+
+    def _postings_for_prefix(self, prefix):
+        """All posting sets whose token starts with `prefix`."""
+        node = self._node(prefix)
+        if node is None:
+            return []
+        found, stack = [], [node]
+        while stack:
+            node = stack.pop()
+            if node.postings:
+                found.append(node.postings)
+            stack.extend(node.children.values())
+        return found
+
+    def search(self, query, limit=50):
+        """
+        Finds trades matching every term of `query` by prefix, newest first.
+
+        Each term may match a ticker, strategy, side, status or trade id, e.g. `xau long`
+        or `dhl win 12`.
+
+        Args:
+            query (str): Free-text query.
+            limit (int): Maximum number of trade ids returned.
+
+        Returns:
+            list: Matching trade ids, most recent first.
+        """
+        terms = tuple(sorted(set(re.findall(r'[\w.]+', query.lower()))))
+        if not terms:
+            return []
+
+        key = (terms, limit)
+        with self._lock:
+            if self._built:
+                self._feed_seq, foreign = self.trades_db.foreign_changes_since(self._feed_seq)
+                if foreign:
+                    self._built = False
+            if self._built:
+                # The trie, the postings and the id list only change under the lock (see _on_write).
+                return self._search_index(terms, limit, key)
+        self.build_in_background()
+        return self._search_database(terms, limit)
+
+    def _search_index(self, terms, limit, key):
+        """`search` answered from the index; the caller holds the lock."""
+        cached = self._cache.get(key)
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            return cached[1]
+
+        groups = []
+        for term in terms:
+            postings = self._postings_for_prefix(term)
+            if term.isdigit() and not term.startswith('0'):
+                id_prefix = _IdPrefix(self._ids, term)
+                if id_prefix:
+                    postings.append(id_prefix)
+            if not postings:
+                return []
+            groups.append(postings)
+
+        # Drive the scan from the most selective term and probe the others.
+        groups.sort(key=lambda group: sum(map(len, group)))
+        driver, others = groups[0], groups[1:]
+        candidates = heapq.merge(*(reversed(postings) for postings in driver), reverse=True)
+        matches = (trade_id for trade_id in candidates
+                   if all(any(trade_id in postings for postings in group) for group in others))
+        # A trade can sit in more than one posting of the driver (e.g. `1` matching id and ticker).
+        seen = set()
+        result = list(islice((trade_id for trade_id in matches
+                              if not (trade_id in seen or seen.add(trade_id))), limit))
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[key] = (now + self.cache_ttl, result)
+        return result
+
+    def _search_database(self, terms, limit):
+        """The same search as a query on the trades table, used while the index is being built."""
+        clauses, params = [], []
+        for term in terms:
+            # Terms are made of word characters and dots; only `_` is a LIKE wildcard among them
+            pattern = term.replace('_', '\\_') + '%'
+            matches = [f"LOWER({field}) LIKE ? ESCAPE '\\'" for field in INDEXED_FIELDS]
+            params.extend([pattern] * len(INDEXED_FIELDS))
+            if term.isdigit() and not term.startswith('0'):
+                matches.append("CAST(id AS TEXT) LIKE ?")
+                params.append(pattern)
+            clauses.append(f"({' OR '.join(matches)})")
+        conn = self.trades_db._connect()
+        try:
+            c = conn.cursor()
+            c.execute(f"SELECT id FROM trades WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT ?",
+                      params + [limit])
+            return [row[0] for row in c.fetchall()]
+        finally:
+            conn.close()
+
+    def fetch(self, trade_ids):
+        """Load the full trades for `trade_ids`, keeping their order."""
+        if not trade_ids:
+            return []
+        conn = self.trades_db._connect()
+        c = conn.cursor()
+        placeholders = ', '.join('?' * len(trade_ids))
+        c.execute(f"SELECT {TRADE_COLUMNS} FROM trades WHERE id IN ({placeholders})", list(trade_ids))
+        trades = {row[0]: self.trades_db._to_trade(row) for row in c.fetchall()}
+        conn.close()
+        return [trades[trade_id] for trade_id in trade_ids if trade_id in trades]
@@ -1,27 +1,74 @@
+import time
+_process_started = time.perf_counter()
+
+import asyncio
+import argparse
+import multiprocessing
+
+from telegram import Bot, Update
 from telegram.ext import (
     Application, 
     CommandHandler, 
     ConversationHandler, 
     CallbackQueryHandler, 
+    InlineQueryHandler,
     MessageHandler, 
+    TypeHandler,
     filters, 
     )
 from utils.bot_management import logger, BOT_TOKEN, start
+from utils.rate_limiter import OutboundScheduler
 from utils.states_manager import *
 from bot_handlers.add_trade import *
 from bot_handlers.check_trades import *
 from bot_handlers.update_handler import *
-from database.database_management import *
 from bot_handlers.export_data import *
+from bot_handlers.settings_handler import timezone_handler
+from bot_handlers.inline_search import inline_query_handler
+from bot_handlers.simulate_handler import simulate_handler
+from bot_handlers.report_handler import report_handler
+from bot_handlers.matrix_handler import matrix_handler
+from bot_handlers.calendar_handler import calendar_handler, hours_handler
+from bot_handlers.limits_handler import limits_handler
+from bot_handlers.quick_add import quick_add_handler, photo_caption_handler
+from bot_handlers.dedup_handler import duplicates_handler, remove_duplicates_handler
+from bot_handlers.jobs_handler import cancel_job_handler
+from bot_handlers.cache_handler import cache_stats_handler
+from bot_handlers.profile_handler import profile_handler
+from utils.container import container
+from utils.update_queue import SQLiteBroker, consume, ingest
+from utils.profiler import ProfilingUpdateProcessor
 
 
-def main():
+async def log_first_update(update: Update, context):
+    """
+    Logs the time from process start to the first handled update.
     """
-    Main function to run the Telegram bot. Sets up the conversation handler with different states and handlers.
+    if 'time_to_first_update' not in context.bot_data:
+        context.bot_data['time_to_first_update'] = time.perf_counter() - _process_started
+        logger.info("Time to first update: %.3fs", context.bot_data['time_to_first_update'])
+
+
+def build_application(request=None, rate_limiter=None):
+    """
+    Builds the application and sets up the conversation handler with different states and handlers.
+
+    Args:
+        request (BaseRequest): Optional transport for Bot API calls, e.g. an offline one for benchmarks.
+        rate_limiter (BaseRateLimiter): Outbound rate limiter; defaults to an OutboundScheduler
+            with Telegram's limits.
+
+    Returns:
+        Application: The configured application, ready to start polling.
     """
 
-    # Create the application with the bot token
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Create the application with the bot token; all outbound requests go through the rate limiter
+    builder = Application.builder().token(BOT_TOKEN).rate_limiter(rate_limiter or OutboundScheduler())
+    # Updates are still handled one at a time; the processor only counts them for /profile
+    builder = builder.concurrent_updates(ProfilingUpdateProcessor(container.profiler))
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
 
     # Define the conversation handler with different states and their respective handlers
     conv_handler = ConversationHandler(
@@ -84,16 +131,17 @@ def main():
                 CallbackQueryHandler(status_selection_handler, pattern='^(Win|Loss)$')
             ],
             ExportStates.EXPORT_PERIOD: [
-                CallbackQueryHandler(export_data_period_handler, pattern='^(1D|2D|3D|1W|2W|1M|2M|3M|6M|custom)$')
+                CallbackQueryHandler(export_data_period_handler, pattern='^(1D|2D|3D|1W|2W|1M|2M|3M|6M|WTD|MTD|YTD|custom)$')
             ],
             ExportStates.EXPORT_TICKER: [
-                CallbackQueryHandler(export_ticker_handler, pattern='^(all_trades|choose_ticker)$')
+                # Exports run as background jobs; block=False keeps other updates flowing meanwhile
+                CallbackQueryHandler(export_ticker_handler, pattern='^(all_trades|choose_ticker)$', block=False)
             ],
             ExportStates.CUSTOM_DATE_RANGE: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_custom_date_range)
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_custom_date_range, block=False)
             ],
             ExportStates.CUSTOM_TICKER: [
-                CallbackQueryHandler(handle_custom_ticker)
+                CallbackQueryHandler(handle_custom_ticker, block=False)
             ],
             UpdateTradesState.UPDATE_CHOICE: [
                 CallbackQueryHandler(start_update_trade_by_id, pattern='^update_trade_by_id$'),
@@ -130,10 +178,107 @@ def main():
         fallbacks=[CommandHandler('cancel', cancel)]
     )
     # Add the conversation handler to the application
+    application.add_handler(TypeHandler(Update, log_first_update), group=-1)
+    # Registered before the conversation, whose states may accept any callback query
+    application.add_handler(CallbackQueryHandler(cancel_job_handler, pattern=r'^cancel_job_\d+$'))
+    application.add_handler(CallbackQueryHandler(remove_duplicates_handler,
+                                                 pattern='^(confirm|cancel)_remove_duplicates$', block=False))
     application.add_handler(conv_handler)
-    
+    application.add_handler(CommandHandler("timezone", timezone_handler))
+    application.add_handler(InlineQueryHandler(inline_query_handler))
+    application.add_handler(CommandHandler("simulate", simulate_handler, block=False))
+    application.add_handler(CommandHandler("report", report_handler, block=False))
+    application.add_handler(CommandHandler("matrix", matrix_handler))
+    application.add_handler(CommandHandler("calendar", calendar_handler))
+    application.add_handler(CommandHandler("hours", hours_handler))
+    application.add_handler(CommandHandler("limits", limits_handler))
+    application.add_handler(CommandHandler("add", quick_add_handler))
+    application.add_handler(CommandHandler("duplicates", duplicates_handler, block=False))
+    application.add_handler(CommandHandler("cache", cache_stats_handler))
+    application.add_handler(CommandHandler("profile", profile_handler))
+    # After the conversation, so screenshots it is waiting for never reach the quick-add
+    application.add_handler(MessageHandler(filters.PHOTO, photo_caption_handler))
+    return application
+
+
+def run_worker(shard, workers, queue_path):
+    """
+    Worker process of the multi-worker mode: handles the updates of one shard from the queue.
+
+    Args:
+        shard (int): The shard owned by this worker.
+        workers (int): Total number of workers.
+        queue_path (str): Path of the SQLite update queue.
+    """
+    # Telegram's global limit is per bot token, so the workers split it between them
+    application = build_application(rate_limiter=OutboundScheduler(overall_rate=30 / workers))
+    container.rolling_metrics
+    container.trade_index.build_in_background()
+    broker = SQLiteBroker(queue_path)
+
+    async def run():
+        async with application:
+            await consume(application, broker, shard)
+
+    logger.info("Worker %d/%d started.", shard + 1, workers)
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def run_scaled(workers, queue_path=r'database/update_queue.db'):
+    """
+    Multi-worker mode: this process only polls Telegram and queues the updates, sharded by
+    chat id, while `workers` processes run the handlers.
+
+    Args:
+        workers (int): Number of worker processes.
+        queue_path (str): Path of the SQLite update queue.
+    """
+    broker = SQLiteBroker(queue_path)
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(shard, workers, queue_path), daemon=True)
+        for shard in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    async def run():
+        async with Bot(BOT_TOKEN) as bot:
+            await ingest(bot, broker, workers)
+
+    logger.info("Ingress started with %d workers in %.3fs...", workers, time.perf_counter() - _process_started)
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+def main():
+    """
+    Main function to run the Telegram bot.
+    """
+    parser = argparse.ArgumentParser(description="Trading journal Telegram bot.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Handle updates in this many processes behind a local update queue.")
+    args = parser.parse_args()
+    if args.workers > 1:
+        run_scaled(args.workers)
+        return
+
+    application = build_application()
+
+    # Rolling metrics listen to database writes, so attach them before any update is handled
+    container.rolling_metrics
+    # Inline queries are answered from the database until the index is built
+    container.trade_index.build_in_background()
+
     # Log that the bot has started
-    logger.info("Bot Started...")
+    logger.info("Bot Started in %.3fs...", time.perf_counter() - _process_started)
 
     # Start polling for updates
     application.run_polling()
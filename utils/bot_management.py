@@ -6,12 +6,8 @@ from typing import Final
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes, CallbackContext
-from telegram import (
-    Update, 
-    InlineKeyboardButton, 
-    InlineKeyboardMarkup
-    )
 from utils.states_manager import *
+from utils.render import MAIN_MENU_KEYBOARD, LOCKED_MAIN_MENU_KEYBOARD
 
 
 # Load environment variables from a .env file
@@ -48,7 +44,11 @@ def restricted(func):
         user_id = update.effective_user.id
         if user_id not in LIST_OF_ADMINS:
             logger.warning(f"Unauthorized access denied for {user_id}.")
-            await update.message.reply_text("Access denied")
+            # Button presses carry no message of the user's to reply to
+            if update.callback_query is not None:
+                await update.callback_query.answer("Access denied", show_alert=True)
+            else:
+                await update.effective_message.reply_text("Access denied")
             return
         return await func(update, context, *args, **kwargs)
     return wrapped
@@ -78,19 +78,15 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.callback_query.answer()
 
     logger.info("User %s started the conversation.", user.first_name)
-    
-    # Define the keyboard options for the user to choose from
-    keyboard = [
-        [InlineKeyboardButton("➕ Add New Trade", callback_data='add_new_trade'), InlineKeyboardButton("🔁 Check Previous Trades", callback_data='check_previous_trades')],
-        [InlineKeyboardButton("📁 Export Data (CSV)", callback_data='export_csv'), InlineKeyboardButton("🗃️ Update Journal", callback_data='update_trade')],
-    ]
-#     📊
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    # Send the welcome message with the keyboard options
+
+    # Imported here: the container's services import this module.
+    from utils.container import container
+    locked = container.risk_monitor.locked_until(user.id)
+
+    # Send the welcome message with the prebuilt main menu keyboard
     await context.bot.send_message(chat_id=chat_id,
                                    text="Please choose an option from the menu below:",
-                                   reply_markup=reply_markup)
+                                   reply_markup=LOCKED_MAIN_MENU_KEYBOARD if locked else MAIN_MENU_KEYBOARD)
     return TradeStates.INIT
 
 
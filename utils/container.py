@@ -0,0 +1,111 @@
+import os
+from functools import cached_property
+
+from database.storage import TradeStorage
+from database.database_management import TradeDatabase
+from database.snapshot_reader import SnapshotReader
+from database.trade_index import TradeIndex
+from database.query_cache import QueryCache
+from analytics.rolling_metrics import RollingMetrics
+from analytics.trade_cube import TradeCube
+from analytics.fx import FxRates
+from analytics.risk_limits import RiskMonitor
+from utils.jobs import JobManager
+from utils.image_cache import ImageCache
+from utils.profiler import UpdateProfiler
+
+
+class Container:
+    """
+    Process-wide services shared by every handler.
+
+    Each service is created on first access and reused afterwards, so the bot opens
+    one database handle (running `_init_db` once) instead of one per handler module,
+    and nothing is built at import time.
+    """
+
+    def __init__(self, db_path=r'database/trades.db', database_url=None, account_currency=None, query_cache_mb=None):
+        """
+        Args:
+            db_path (str): SQLite database file used when no database URL is set.
+            database_url (str): postgresql:// URL of a shared journal, or sqlite:///path to use
+                another SQLite file; defaults to $DATABASE_URL.
+            account_currency (str): Currency PnL is normalised into; defaults to $ACCOUNT_CURRENCY or USD.
+            query_cache_mb (float): Memory for cached trade lookups; defaults to $QUERY_CACHE_MB or 32, 0 disables it.
+        """
+        self.account_currency = (account_currency or os.getenv('ACCOUNT_CURRENCY') or 'USD').upper()
+        self.query_cache_mb = float(query_cache_mb if query_cache_mb is not None else os.getenv('QUERY_CACHE_MB', 32))
+        self.database_url = database_url or os.getenv('DATABASE_URL')
+        if self.database_url and self.database_url.startswith('sqlite:///'):
+            db_path = self.database_url[len('sqlite:///'):]
+        self.db_path = db_path
+
+    @property
+    def uses_postgres(self):
+        return bool(self.database_url) and self.database_url.startswith(('postgres://', 'postgresql://'))
+
+    @cached_property
+    def trades_db(self) -> TradeStorage:
+        """The read/write trades database."""
+        if self.uses_postgres:
+            # psycopg is an optional dependency, only needed for a PostgreSQL journal
+            from database.postgres_storage import PostgresTradeDatabase
+            trades_db = PostgresTradeDatabase(self.database_url)
+        else:
+            trades_db = TradeDatabase(self.db_path)
+        # Resolved on the first save, so the rate table is only loaded when needed.
+        trades_db.set_pnl_normalizer(lambda ticker, pnl, entry_ts: self.fx.normalize(ticker, pnl, entry_ts))
+        if self.query_cache_mb > 0:
+            trades_db.set_query_cache(QueryCache(trades_db, int(self.query_cache_mb * 1024 * 1024)))
+        return trades_db
+
+    @cached_property
+    def snapshot_db(self) -> TradeStorage:
+        """Snapshot reader for exports and analytics; long scans hold no locks on the live file."""
+        if self.uses_postgres:
+            # PostgreSQL readers never block writers, so no snapshot copy is needed.
+            return self.trades_db
+        return SnapshotReader(self.db_path)
+
+    @cached_property
+    def trade_index(self) -> TradeIndex:
+        """In-memory prefix index used by inline queries."""
+        return TradeIndex(self.trades_db)
+
+    @cached_property
+    def rolling_metrics(self) -> RollingMetrics:
+        """Streak and rolling win-rate/expectancy, maintained on every write."""
+        return RollingMetrics(self.trades_db)
+
+    @cached_property
+    def risk_monitor(self) -> RiskMonitor:
+        """Per-user goal and risk-limit rules checked after every saved trade."""
+        return RiskMonitor(self.trades_db, self.rolling_metrics)
+
+    @cached_property
+    def trade_cube(self) -> TradeCube:
+        """Strategy × ticker × side × hour aggregates behind /matrix, maintained on every write."""
+        return TradeCube(self.trades_db)
+
+    @cached_property
+    def fx(self) -> FxRates:
+        """As-of FX rates used to store each trade's PnL in the account currency."""
+        return FxRates(self.trades_db, self.account_currency)
+
+    @cached_property
+    def jobs(self) -> JobManager:
+        """Process pool for CPU-heavy exports and reports."""
+        return JobManager()
+
+    @cached_property
+    def image_cache(self) -> ImageCache:
+        """Downscaled trade screenshots used by PDF reports."""
+        return ImageCache()
+
+    @cached_property
+    def profiler(self) -> UpdateProfiler:
+        """Profiles the next N updates on an admin's /profile request."""
+        return UpdateProfiler()
+
+
+container = Container()
@@ -0,0 +1,156 @@
+import os
+import asyncio
+import hashlib
+from io import BytesIO
+from telegram.error import TelegramError
+from utils.bot_management import logger
+
+
+def _downscale(data, path, max_side, quality):
+    """Shrink an image to fit `max_side` pixels and store it as JPEG. Returns its size in pixels."""
+    # Pillow is only needed for reports, so it is imported on first use
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        image.thumbnail((max_side, max_side))
+        image.convert('RGB').save(path, 'JPEG', quality=quality, optimize=True)
+        return image.size
+
+
+class ImageCache:
+    """
+    Disk cache of downscaled trade screenshots, keyed by Telegram file id.
+
+    Screenshots are downloaded one at a time, shrunk to `max_side` pixels and kept as
+    small JPEGs, so repeated reports do not download them again and a report only ever
+    holds one full-size photo in memory. The least recently used files are removed
+    once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=r'database/image_cache', max_side=800, quality=70, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            directory (str): Where cached screenshots are stored.
+            max_side (int): Longest side of a cached screenshot in pixels.
+            quality (int): JPEG quality of cached screenshots.
+            max_bytes (int): Size of the cache directory before old files are evicted.
+        """
+        self.directory = directory
+        self.max_side = max_side
+        self.quality = quality
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, file_id):
+        return os.path.join(self.directory, hashlib.sha1(file_id.encode()).hexdigest() + '.jpg')
+
+    def _open_cached(self, path):
+        """Marks a cached screenshot as recently used. Returns ((path, width, height), bytes), or None if it is gone."""
+        # Pillow is only needed for reports, so it is imported on first use
+        from PIL import Image
+
+        try:
+            os.utime(path)
+            with Image.open(path) as image:
+                return (path, *image.size), os.path.getsize(path)
+        except FileNotFoundError:
+            # Evicted by another report since it was looked up
+            return None
+
+    def _store(self, data, path):
+        """Downscales a downloaded screenshot into the cache. Returns ((path, width, height), bytes)."""
+        tmp_path = path + '.tmp'
+        size = _downscale(data, tmp_path, self.max_side, self.quality)
+        os.replace(tmp_path, path)
+        return (path, *size), os.path.getsize(path)
+
+    async def _fetch(self, bot, file_id):
+        """`fetch`, also returning the size of the cached file in bytes; all file work runs off the event loop."""
+        path = self._path(file_id)
+        cached = await asyncio.to_thread(self._open_cached, path)
+        if cached is not None:
+            return cached
+
+        try:
+            telegram_file = await bot.get_file(file_id)
+            data = await telegram_file.download_as_bytearray()
+        except TelegramError as e:
+            logger.warning("Could not download screenshot %s: %s", file_id, e)
+            return None
+
+        try:
+            return await asyncio.to_thread(self._store, bytes(data), path)
+        except OSError as e:
+            logger.warning("Could not read screenshot %s: %s", file_id, e)
+            return None
+
+    async def fetch(self, bot, file_id):
+        """
+        Returns the cached screenshot of `file_id`, downloading it first if needed.
+
+        Returns:
+            tuple: (path, width, height), or None if the file cannot be downloaded.
+        """
+        fetched = await self._fetch(bot, file_id)
+        return fetched and fetched[0]
+
+    async def fetch_all(self, bot, trades, budget=None, progress=None):
+        """
+        Fetches the screenshots of `trades` in order, one at a time, and evicts old files afterwards.
+
+        Args:
+            bot (Bot): Used to download screenshots that are not cached yet.
+            trades (list): Trades in report order.
+            budget (int): Stop once the fetched screenshots take this many bytes; the
+                report would leave any further ones out anyway.
+            progress (coroutine function): Awaited as `progress(done, total, text)` before each
+                screenshot; may raise JobCancelled to stop.
+
+        Returns:
+            dict: Trade id -> (path, width, height) for every screenshot that is available.
+        """
+        pictures = [trade for trade in trades if trade.picture]
+        images, fetched, total_bytes = {}, {}, 0
+        for done, trade in enumerate(pictures):
+            file_id = trade.picture
+            # Trades may share a file id (e.g. the placeholder), which is fetched only once.
+            if file_id not in fetched:
+                if progress is not None:
+                    await progress(done, len(pictures), f"screenshot {done + 1} of {len(pictures)}")
+                result = await self._fetch(bot, file_id)
+                if result is not None and budget is not None:
+                    if total_bytes + result[1] > budget:
+                        break
+                    total_bytes += result[1]
+                fetched[file_id] = result and result[0]
+            if fetched[file_id] is not None:
+                images[trade.id] = fetched[file_id]
+        await asyncio.to_thread(self.evict, {image[0] for image in images.values()})
+        return images
+
+    def evict(self, keep=()):
+        """
+        Remove the least recently used files until the cache fits `max_bytes`.
+
+        Args:
+            keep (set): Paths that must stay, e.g. the screenshots of the report being built.
+        """
+        entries, total = [], 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    total += stat.st_size
+                    if entry.path not in keep:
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                continue
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Removed by another report's eviction
+                pass
+            total -= size
@@ -0,0 +1,227 @@
+import asyncio
+import itertools
+import threading
+import time
+import multiprocessing
+from queue import Empty
+from concurrent.futures import ProcessPoolExecutor
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
+from utils.bot_management import logger
+
+
+class JobCancelled(Exception):
+    """Raised inside a job (and to its caller) when the user cancelled it."""
+
+
+class JobLimitExceeded(Exception):
+    """Raised when a user already has the maximum number of running jobs."""
+
+
+class Progress:
+    """
+    Handed to every job as its `progress` argument. Calling it reports how far the job got
+    and is also the cancellation point: it raises JobCancelled once the user cancelled.
+    Picklable, so it travels to the worker process with the job.
+    """
+
+    def __init__(self, queue, cancelled):
+        self._queue = queue
+        self._cancelled = cancelled
+
+    def __call__(self, done, total, text=''):
+        """
+        Args:
+            done (int): Units of work finished.
+            total (int): Units of work in the whole job.
+            text (str): Optional description of the current step.
+        """
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        self._queue.put((done, total, text))
+
+
+class Job:
+    """Book-keeping of one submitted job in the bot process."""
+
+    __slots__ = ('id', 'user_id', 'title', 'future', 'cancelled', 'queue', 'cancel_requested')
+
+    def __init__(self, job_id, user_id, title, cancelled, queue):
+        self.id = job_id
+        self.user_id = user_id
+        self.title = title
+        self.future = None
+        self.cancelled = cancelled
+        self.queue = queue
+        # Local copy of `cancelled`, readable without a round trip to the Manager process
+        self.cancel_requested = False
+
+
+def _latest_report(queue):
+    """Drain a job's progress queue and return the newest report, or None."""
+    latest = None
+    try:
+        while True:
+            latest = queue.get_nowait()
+    except Empty:
+        return latest
+
+
+def _progress_text(job, done=0, total=0, text=''):
+    status = f"{done * 100 // total}%" if total else "queued"
+    return f"⏳ {job.title} (job {job.id}): {status}" + (f"\n{text}" if text else "")
+
+
+class JobManager:
+    """
+    Runs CPU-bound work (exports, reports, charts) in a process pool so the event loop
+    keeps serving other chats.
+
+    Each job gets an id and a progress message with a Cancel button that is edited as
+    the job reports progress. A user may only run `per_user_limit` jobs at once.
+    """
+
+    def __init__(self, max_workers=None, per_user_limit=2, progress_interval=1.0):
+        """
+        Args:
+            max_workers (int): Size of the process pool; defaults to the number of CPUs.
+            per_user_limit (int): Concurrent jobs allowed per user.
+            progress_interval (float): Seconds between progress message edits (Telegram
+                allows about one message per second per chat).
+        """
+        self.max_workers = max_workers
+        self.per_user_limit = per_user_limit
+        self.progress_interval = progress_interval
+        self._executor = None
+        self._manager = None
+        self._pool_lock = threading.Lock()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+
+    def _get_executor(self):
+        # Created on first use: the pool and the manager process are not needed at startup.
+        with self._pool_lock:
+            if self._executor is None:
+                self._manager = multiprocessing.Manager()
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def jobs_of(self, user_id):
+        """Running jobs of a user."""
+        return [job for job in self._jobs.values() if job.user_id == user_id]
+
+    def cancel(self, job_id, user_id):
+        """
+        Cancel a job of `user_id`. A queued job never starts; a running one stops at its
+        next progress report.
+
+        Returns:
+            bool: Whether a running job was found.
+        """
+        job = self._jobs.get(job_id)
+        # Without a cancel event the job is still starting and has no Cancel button yet
+        if job is None or job.user_id != user_id or job.cancelled is None:
+            return False
+        job.cancel_requested = True
+        job.cancelled.set()
+        if job.future is not None:
+            job.future.cancel()
+        return True
+
+    async def run(self, bot, chat_id, user_id, title, func, *args, prepare=None):
+        """
+        Run `func(*args, progress=Progress)` in the process pool and return its result.
+
+        Work that has to happen in the bot process first, such as downloading files with
+        the bot, can be passed as `prepare`: it runs as part of the job, so it counts
+        against the user's limit, reports progress and can be cancelled.
+
+        Args:
+            bot (Bot): Used to send and edit the progress message.
+            chat_id (int): Chat receiving progress messages.
+            user_id (int): Owner of the job, for the concurrency cap and cancellation.
+            title (str): Shown in the progress message.
+            func (callable): Picklable, module-level function doing the work.
+            *args: Picklable arguments of `func`.
+            prepare (coroutine function): Awaited as `prepare(progress)` before `func` is
+                submitted, with an async `progress(done, total, text)` that raises JobCancelled
+                once the user cancelled. Returns a tuple of further arguments of `func`.
+
+        Raises:
+            JobLimitExceeded: The user already runs `per_user_limit` jobs.
+            JobCancelled: The user cancelled the job.
+        """
+        if len(self.jobs_of(user_id)) >= self.per_user_limit:
+            raise JobLimitExceeded(f"You already have the maximum of {self.per_user_limit} running jobs.")
+
+        # Registered right away, so concurrent requests count against the limit
+        job = Job(next(self._ids), user_id, title, None, None)
+        self._jobs[job.id] = job
+        message = None
+        try:
+            # Starting the pool and creating Manager proxies are blocking round trips
+            executor, job.cancelled, job.queue = await asyncio.to_thread(self._job_channels)
+            message = await bot.send_message(
+                chat_id=chat_id, text=_progress_text(job),
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Cancel", callback_data=f'cancel_job_{job.id}')]])
+            )
+            if prepare is not None:
+                args += tuple(await prepare(self._local_progress(job, message)))
+            job.future = executor.submit(func, *args, progress=Progress(job.queue, job.cancelled))
+            result = asyncio.wrap_future(job.future)
+            while True:
+                done, _ = await asyncio.wait([result], timeout=self.progress_interval)
+                if done:
+                    break
+                await self._show_progress(job, message)
+            # Re-raises the job's exception, including a JobCancelled raised by Progress.
+            value = result.result()
+        except (JobCancelled, asyncio.CancelledError):
+            # A CancelledError not caused by the user (e.g. shutdown) must propagate unchanged.
+            if not job.cancel_requested:
+                raise
+            await self._edit(message, f"✖️ {title} (job {job.id}) cancelled.")
+            raise JobCancelled()
+        except Exception:
+            await self._edit(message, f"⚠️ {title} (job {job.id}) failed.")
+            raise
+        finally:
+            del self._jobs[job.id]
+
+        await self._edit(message, f"✅ {title} (job {job.id}) done.")
+        return value
+
+    def _job_channels(self):
+        """The pool, and a new cancel event and progress queue shared with it."""
+        executor = self._get_executor()
+        return executor, self._manager.Event(), self._manager.Queue()
+
+    def _local_progress(self, job, message):
+        """Progress callback of a job's `prepare` step, which runs on the event loop."""
+        last_edit = 0.0
+
+        async def progress(done, total, text=''):
+            nonlocal last_edit
+            if job.cancel_requested:
+                raise JobCancelled()
+            now = time.monotonic()
+            if now - last_edit >= self.progress_interval:
+                last_edit = now
+                await self._edit(message, _progress_text(job, done, total, text), keep_markup=True)
+
+        return progress
+
+    async def _show_progress(self, job, message):
+        """Edit the progress message with the latest report, if there is a new one."""
+        # Each queue call is a round trip to the Manager process, so drain it off the event loop
+        latest = await asyncio.to_thread(_latest_report, job.queue)
+        if latest is not None:
+            await self._edit(message, _progress_text(job, *latest), keep_markup=True)
+
+    async def _edit(self, message, text, keep_markup=False):
+        if message is None:
+            return
+        try:
+            await message.edit_text(text, reply_markup=message.reply_markup if keep_markup else None)
+        except TelegramError as e:
+            logger.warning("Could not update job message: %s", e)
@@ -0,0 +1,179 @@
+from datetime import datetime, date, time, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+
+class PeriodRange(NamedTuple):
+    """
+    A resolved period. `start` is inclusive and `end` is exclusive; both are
+    timezone-aware datetimes aligned to trading-day boundaries.
+    """
+    start: datetime
+    end: datetime
+
+    @property
+    def start_ts(self) -> int:
+        """Start of the range as a UTC epoch, matching the indexed `entry_ts` column."""
+        return int(self.start.timestamp())
+
+    @property
+    def end_ts(self) -> int:
+        """Exclusive end of the range as a UTC epoch."""
+        return int(self.end.timestamp())
+
+    @property
+    def start_date(self) -> str:
+        """First trading day in the range (YYYY-MM-DD)."""
+        return self.start.strftime('%Y-%m-%d')
+
+    @property
+    def end_date(self) -> str:
+        """Last trading day in the range (YYYY-MM-DD)."""
+        return (self.end - timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+# Period codes are compiled once into (kind, amount) pairs:
+# - 'days' / 'months': rolling windows ending with the current trading day
+# - 'week' / 'month' / 'year': calendar periods to date (WTD, MTD, YTD)
+PERIODS = {
+    'TODAY': ('days', 0),
+    '1D': ('days', 1), '2D': ('days', 2), '3D': ('days', 3),
+    '1W': ('days', 7), '2W': ('days', 14),
+    '1M': ('months', 1), '2M': ('months', 2), '3M': ('months', 3), '6M': ('months', 6),
+    'WTD': ('week', 0), 'MTD': ('month', 0), 'YTD': ('year', 0),
+}
+
+
+def _session_offset(session_start: str) -> timedelta:
+    """
+    Offset of the trading-day boundary from local midnight.
+
+    A session starting before noon (e.g. '08:00') belongs to the same calendar day.
+    A session starting in the afternoon (e.g. the '17:00' New York forex rollover)
+    opens the *next* trading day, so the offset is negative.
+    """
+    hours, minutes = (int(part) for part in session_start.split(':'))
+    offset = timedelta(hours=hours, minutes=minutes)
+    return offset - timedelta(days=1) if hours >= 12 else offset
+
+
+def _months_back(day: date, months: int) -> date:
+    """Move `day` back by whole calendar months, clamping to the end of shorter months."""
+    year, month = divmod(day.year * 12 + day.month - 1 - months, 12)
+    month += 1
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return date(year, month, min(day.day, (next_month - timedelta(days=1)).day))
+
+
+def trading_day(now: datetime, tz_name: str = 'UTC', session_start: str = '00:00') -> date:
+    """
+    Returns the trading day that `now` falls in for the given timezone and session start.
+
+    Args:
+        now (datetime): An aware datetime (naive values are taken as UTC).
+        tz_name (str): IANA timezone name of the user.
+        session_start (str): Local time (HH:MM) at which a trading day begins.
+    """
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=ZoneInfo('UTC'))
+    local = now.astimezone(ZoneInfo(tz_name)).replace(tzinfo=None)
+    return (local - _session_offset(session_start)).date()
+
+
+@lru_cache(maxsize=1024)
+def _resolve(period: str, tz_name: str, session_start: str, today: date) -> PeriodRange:
+    """Memoized resolution of a period for one trading day; repeat lookups are free."""
+    kind, amount = PERIODS[period]
+
+    if kind == 'days':
+        first = today - timedelta(days=amount)
+    elif kind == 'months':
+        first = _months_back(today, amount)
+    elif kind == 'week':
+        first = today - timedelta(days=today.weekday())
+    elif kind == 'month':
+        first = today.replace(day=1)
+    else:
+        first = today.replace(month=1, day=1)
+
+    tz = ZoneInfo(tz_name)
+    offset = _session_offset(session_start)
+    start = (datetime.combine(first, time()) + offset).replace(tzinfo=tz)
+    end = (datetime.combine(today + timedelta(days=1), time()) + offset).replace(tzinfo=tz)
+    return PeriodRange(start, end)
+
+
+def resolve_period(period: str, tz_name: str = 'UTC', session_start: str = '00:00', now: datetime = None) -> PeriodRange:
+    """
+    Resolves a period code (e.g. '1W', 'MTD') into a timezone-aware range.
+
+    Args:
+        period (str): One of the codes in PERIODS.
+        tz_name (str): IANA timezone name of the user.
+        session_start (str): Local time (HH:MM) at which a trading day begins.
+        now (datetime): Reference time, defaults to the current time.
+
+    Returns:
+        PeriodRange: The resolved range.
+
+    Raises:
+        ValueError: If the period code is unknown.
+    """
+    if period not in PERIODS:
+        raise ValueError("Invalid period specified.")
+    today = trading_day(now or datetime.now(ZoneInfo('UTC')), tz_name, session_start)
+    return _resolve(period, tz_name, session_start, today)
+
+
+def to_epoch(date_str: str, time_str: str, tz_name: str = 'UTC') -> int:
+    """
+    Converts a trade's local date (YYYY-MM-DD) and time (HH:MM) into a UTC epoch.
+
+    Args:
+        date_str (str): Trade date.
+        time_str (str): Trade time.
+        tz_name (str): IANA timezone name the trade was entered in.
+
+    Returns:
+        int: Seconds since the epoch.
+    """
+    local = datetime.strptime(f'{date_str} {time_str or "00:00"}', '%Y-%m-%d %H:%M')
+    return int(local.replace(tzinfo=ZoneInfo(tz_name)).timestamp())
+
+
+# Weekday labels of the `weekday` bucket, Monday = 0.
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+def parse_weekday(value):
+    """
+    Weekday bucket of a name such as 'Tue' or 'tuesday'.
+
+    Raises:
+        ValueError: If the value does not name a weekday.
+    """
+    names = [name.lower() for name in WEEKDAYS]
+    if len(value) < 3 or value[:3].lower() not in names:
+        raise ValueError(f"Unknown weekday {value}.")
+    return names.index(value[:3].lower())
+
+
+def trade_buckets(date_str, time_str):
+    """
+    Weekday and hour-of-day buckets of a trade's local date (YYYY-MM-DD) and time (HH:MM),
+    as stored in the indexed `weekday` and `hour` columns.
+
+    Returns:
+        tuple: (weekday, Monday = 0, hour); either is None if it cannot be read.
+    """
+    try:
+        weekday = date.fromisoformat(str(date_str)[:10]).weekday()
+    except ValueError:
+        weekday = None
+    time_str = str(time_str)
+    try:
+        hour = int(time_str[:time_str.index(':')])
+    except ValueError:
+        hour = None
+    return weekday, hour
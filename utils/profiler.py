@@ -0,0 +1,315 @@
+"""
+On-demand profiling of the next N updates (the /profile command).
+
+While a session runs, the profiler
+- times every handler callback registered on the application, and splits each call's
+  wall time into trade database calls, Bot API requests (including the rate limiter's
+  waits) and the rest (Python, pandas, rendering);
+- times every method of the trade databases the container has opened;
+- samples the stacks of the event loop thread and of the threads running this
+  repository's code (executors, streams, snapshot refreshes) for a flame graph.
+
+Handlers, database methods and the rate limiter are only wrapped while a session is
+running and restored afterwards, and the sampler thread only exists meanwhile, so when
+profiling is off the only cost is one attribute check per update in ProfilingUpdateProcessor.
+"""
+import os
+import sys
+import time
+import inspect
+import threading
+import functools
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from telegram.ext import ConversationHandler, SimpleUpdateProcessor
+
+
+# Seconds between two stack samples.
+SAMPLE_INTERVAL = 0.005
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The handler call a database call or Bot API request is made for.
+_current_call = ContextVar('profiled_handler_call', default=None)
+
+
+class _Call:
+    __slots__ = ('db', 'api')
+
+    def __init__(self):
+        self.db = 0.0
+        self.api = 0.0
+
+
+class Timing:
+    """Calls and time spent in one handler or database method."""
+
+    __slots__ = ('calls', 'total', 'max', 'db', 'api')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = self.max = self.db = self.api = 0.0
+
+    def add(self, elapsed, db=0.0, api=0.0):
+        self.calls += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.db += db
+        self.api += api
+
+
+def _frame_name(code):
+    path = code.co_filename
+    if path.startswith(_ROOT):
+        path = os.path.relpath(path, _ROOT)
+    else:
+        path = os.path.basename(path)
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({path})".replace(';', ',')
+
+
+class ProfileSession:
+    """One profiling run: the collected timings and stack samples of the next `updates` updates."""
+
+    def __init__(self, updates, on_done):
+        """
+        Args:
+            updates (int): Number of updates to profile.
+            on_done (callable): Coroutine function called with the finished session.
+        """
+        self.updates = updates
+        self.remaining = updates
+        self.on_done = on_done
+        self.handlers = defaultdict(Timing)
+        self.methods = defaultdict(Timing)
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+        self._db_depth = threading.local()
+
+    def add_method(self, name, elapsed):
+        with self._lock:
+            self.methods[name].add(elapsed)
+
+    def collapsed_stacks(self):
+        """The samples in the collapsed-stack format read by flamegraph.pl and speedscope."""
+        lines = []
+        for (thread, codes), count in self.stacks.most_common():
+            frames = [thread] + [_frame_name(code) for code in reversed(codes)]
+            lines.append(f"{';'.join(frames)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+class UpdateProfiler:
+    """Profiles the next N updates on request; see the module docstring."""
+
+    def __init__(self, sample_interval=SAMPLE_INTERVAL):
+        self.sample_interval = sample_interval
+        self.session = None
+        self._restore = []
+        self._sampler = None
+        self._stop = threading.Event()
+
+    def start(self, application, updates, on_done):
+        """
+        Profile the next `updates` updates handled by `application`.
+
+        Args:
+            application (Application): Its handlers and rate limiter get instrumented.
+            updates (int): Number of updates to profile.
+            on_done (callable): Coroutine function awaited with the finished ProfileSession.
+
+        Returns:
+            bool: False if a session is already running.
+        """
+        if self.session is not None:
+            return False
+        session = ProfileSession(updates, on_done)
+        for handlers in application.handlers.values():
+            for handler in handlers:
+                self._instrument_handler(handler, session)
+        self._instrument_storages(session)
+        rate_limiter = application.bot.rate_limiter
+        if rate_limiter is not None:
+            self._instrument_rate_limiter(rate_limiter, session)
+
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, args=(session, threading.get_ident()),
+                                         name='update-profiler', daemon=True)
+        self.session = session
+        self._sampler.start()
+        return True
+
+    async def update_done(self, session):
+        """Count a profiled update; the last one stops the session and reports it."""
+        session.remaining -= 1
+        if session.remaining > 0 or session is not self.session:
+            return
+        self.stop()
+        await session.on_done(session)
+
+    def stop(self):
+        """Stop the running session and remove all instrumentation."""
+        session, self.session = self.session, None
+        if session is None:
+            return
+        session.elapsed = time.perf_counter() - session.started
+        self._stop.set()
+        self._sampler.join()
+        for restore in reversed(self._restore):
+            restore()
+        self._restore.clear()
+
+    # Instrumentation, installed by start() and removed by stop().
+
+    def _instrument_handler(self, handler, session):
+        if isinstance(handler, ConversationHandler):
+            for child in handler.entry_points + handler.fallbacks:
+                self._instrument_handler(child, session)
+            for state_handlers in handler.states.values():
+                for child in state_handlers:
+                    self._instrument_handler(child, session)
+            return
+        callback = handler.callback
+        name = f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__qualname__}"
+
+        @functools.wraps(callback)
+        async def profiled(update, context, *args, **kwargs):
+            call = _Call()
+            token = _current_call.set(call)
+            start = time.perf_counter()
+            try:
+                return await callback(update, context, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                _current_call.reset(token)
+                with session._lock:
+                    session.handlers[name].add(elapsed, call.db, call.api)
+
+        handler.callback = profiled
+        self._restore.append(lambda: setattr(handler, 'callback', callback))
+
+    def _instrument_storages(self, session):
+        # Imported here: the container imports the handlers' dependencies.
+        from database.storage import TradeStorage
+        from utils.container import container
+
+        # Only databases already opened; profiling should not open new ones.
+        storages = {id(value): value for value in vars(container).values() if isinstance(value, TradeStorage)}
+        for storage in storages.values():
+            prefix = type(storage).__name__
+            for name, member in inspect.getmembers(type(storage), inspect.isfunction):
+                if name.startswith('_') or inspect.iscoroutinefunction(member) or inspect.isasyncgenfunction(member):
+                    continue
+                method = getattr(storage, name)
+                setattr(storage, name, self._timed_method(session, f"{prefix}.{name}", method))
+                self._restore.append(functools.partial(storage.__dict__.pop, name, None))
+
+    @staticmethod
+    def _timed_method(session, name, method):
+        depth = session._db_depth
+
+        def timed_iterator(iterator, elapsed):
+            # Rows are read while the caller iterates; the whole iteration is one call.
+            call = _current_call.get()
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        step = time.perf_counter() - start
+                        elapsed += step
+                        if call is not None:
+                            call.db += step
+                    yield item
+            finally:
+                iterator.close()
+                session.add_method(name, elapsed)
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            # Methods calling other methods count once towards the handler's database time.
+            outer = not getattr(depth, 'value', 0)
+            depth.value = getattr(depth, 'value', 0) + 1
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                depth.value -= 1
+                elapsed = time.perf_counter() - start
+                call = _current_call.get()
+                if outer and call is not None:
+                    call.db += elapsed
+            if inspect.isgenerator(result):
+                return timed_iterator(result, elapsed)
+            if not inspect.isasyncgen(result):
+                # Async streams are counted by the iter_* method they read from.
+                session.add_method(name, elapsed)
+            return result
+
+        return timed
+
+    def _instrument_rate_limiter(self, rate_limiter, session):
+        process_request = rate_limiter.process_request
+
+        @functools.wraps(process_request)
+        async def timed(callback, args, kwargs, endpoint, data, rate_limit_args):
+            start = time.perf_counter()
+            try:
+                return await process_request(callback, args, kwargs, endpoint, data, rate_limit_args)
+            finally:
+                elapsed = time.perf_counter() - start
+                session.add_method(f"Bot API.{endpoint}", elapsed)
+                call = _current_call.get()
+                if call is not None:
+                    call.api += elapsed
+
+        rate_limiter.process_request = timed
+        self._restore.append(functools.partial(rate_limiter.__dict__.pop, 'process_request', None))
+
+    def _sample(self, session, loop_thread):
+        own = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                if ident == loop_thread:
+                    # An idle event loop waits in the selector.
+                    if codes[0].co_name == 'select' and codes[0].co_filename.endswith('selectors.py'):
+                        continue
+                elif not any(code.co_filename.startswith(_ROOT) for code in codes):
+                    # Threads not running the bot's code, e.g. idle executor workers.
+                    continue
+                session.stacks[(names.get(ident, str(ident)), tuple(codes))] += 1
+                session.samples += 1
+
+
+class ProfilingUpdateProcessor(SimpleUpdateProcessor):
+    """
+    Processes updates one at a time like the default processor and counts the updates of
+    a running profile session. Installed with ApplicationBuilder.concurrent_updates().
+    """
+
+    def __init__(self, profiler):
+        super().__init__(max_concurrent_updates=1)
+        self.profiler = profiler
+
+    async def do_process_update(self, update, coroutine):
+        session = self.profiler.session
+        if session is None:
+            await coroutine
+            return
+        try:
+            await coroutine
+        finally:
+            await self.profiler.update_done(session)
@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from utils.render import MESSAGE_LIMIT
+
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, passed per call as `rate_limit_args={'priority': ...}`.
+# Lower values are served first when the global bucket is contended.
+INTERACTIVE = 0
+BULK = 1
+
+# sendMessage requests made only of these fields can be merged into one message.
+_COALESCABLE_FIELDS = {'chat_id', 'text'}
+
+
+class TokenBucket:
+    """
+    Asynchronous token bucket. Waiters are served by (priority, arrival) order, so a
+    bucket shared by all chats lets interactive replies overtake queued bulk sends.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum burst size.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds`, e.g. after a 429 response."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+    @property
+    def idle(self):
+        """True when nobody is waiting and the bucket is full."""
+        self._refill()
+        return not self._waiters and self._tokens >= self.capacity
+
+    async def acquire(self, priority=INTERACTIVE):
+        """Wait until a token is available for this caller, then take it."""
+        entry = (priority, next(self._counter))
+        heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                self._refill()
+                delay = self._paused_until - time.monotonic()
+                if delay <= 0 and self._waiters[0] == entry and self._tokens >= 1:
+                    heapq.heappop(self._waiters)
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep(max(delay, (1 - self._tokens) / self.rate, 0.001))
+        except asyncio.CancelledError:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            raise
+
+
+class _Batch:
+    """Consecutive texts to one chat that will be sent as a single message."""
+
+    def __init__(self, data):
+        self.texts = [data['text']]
+        self.result = asyncio.get_running_loop().create_future()
+        self.open = True
+
+    def try_add(self, text):
+        if not self.open or len('\n\n'.join(self.texts)) + len(text) + 2 > MESSAGE_LIMIT:
+            return False
+        self.texts.append(text)
+        return True
+
+
+class OutboundScheduler(BaseRateLimiter):
+    """
+    Rate limiter for all outbound Bot API requests.
+
+    - a global token bucket (Telegram allows ~30 messages/second per bot) with
+      priority lanes, so interactive replies go before bulk exports
+    - a per-chat token bucket (~1 message/second per chat), served in order
+    - RetryAfter (HTTP 429) responses pause the affected buckets and retry the request
+    - plain sendMessage texts queued for the same chat are coalesced into one message
+    """
+
+    def __init__(self, overall_rate=30, per_chat_rate=1, per_chat_burst=3, max_retries=3):
+        """
+        Args:
+            overall_rate (float): Requests per second across all chats.
+            per_chat_rate (float): Messages per second to a single chat.
+            per_chat_burst (int): Messages a chat may receive back to back before throttling.
+            max_retries (int): How often a request is retried after RetryAfter.
+        """
+        self.overall_rate = overall_rate
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_retries = max_retries
+        self._global = None
+        self._chats = {}
+        self._batches = {}
+
+    async def initialize(self):
+        self._global = TokenBucket(self.overall_rate, self.overall_rate)
+
+    async def shutdown(self):
+        self._chats.clear()
+        self._batches.clear()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        # Forget buckets of chats that have gone quiet.
+        if len(self._chats) > 1024:
+            for key in [key for key, value in self._chats.items() if key != chat_id and value.idle]:
+                del self._chats[key]
+        return bucket
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = (rate_limit_args or {}).get('priority', INTERACTIVE)
+        chat_id = data.get('chat_id')
+
+        # Requests that are not addressed to a chat (e.g. answerCallbackQuery) only count globally.
+        if chat_id is None:
+            return await self._send(callback, args, kwargs, priority)
+
+        if endpoint == 'sendMessage' and set(data) <= _COALESCABLE_FIELDS:
+            batch = self._batches.get(chat_id)
+            if batch is not None and batch.try_add(data['text']):
+                return await asyncio.shield(batch.result)
+            batch = self._batches[chat_id] = _Batch(data)
+        else:
+            batch = None
+
+        bucket = self._chat_bucket(chat_id)
+        try:
+            await bucket.acquire()
+        except BaseException:
+            if batch is not None:
+                batch.open = False
+                if self._batches.get(chat_id) is batch:
+                    del self._batches[chat_id]
+                batch.result.cancel()
+            raise
+
+        if batch is None:
+            return await self._send(callback, args, kwargs, priority, bucket)
+
+        # Close the batch; later texts start a new one behind this message.
+        batch.open = False
+        if self._batches.get(chat_id) is batch:
+            del self._batches[chat_id]
+        if len(batch.texts) > 1:
+            logger.debug("Coalesced %d messages to chat %s", len(batch.texts), chat_id)
+            data['text'] = '\n\n'.join(batch.texts)
+        try:
+            result = await self._send(callback, args, kwargs, priority, bucket)
+        except Exception as exc:
+            if len(batch.texts) > 1:
+                batch.result.set_exception(exc)
+            raise
+        except BaseException:
+            # Cancelled (e.g. at shutdown): the coalesced callers must not wait forever.
+            batch.result.cancel()
+            raise
+        batch.result.set_result(result)
+        return result
+
+    async def _send(self, callback, args, kwargs, priority, chat_bucket=None):
+        """Take a global token and perform the request, honouring RetryAfter."""
+        for attempt in itertools.count():
+            await self._global.acquire(priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as exc:
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = exc.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                logger.warning("Flood limit hit, retrying in %s seconds.", retry_after)
+                (chat_bucket or self._global).pause(retry_after)
+                if chat_bucket is not None:
+                    await chat_bucket.acquire()
@@ -0,0 +1,197 @@
+from functools import lru_cache
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from database.records import Trade
+
+
+# Telegram rejects text messages longer than this many characters.
+MESSAGE_LIMIT = 4096
+
+
+def _keyboard(rows):
+    """Builds an InlineKeyboardMarkup from rows of (label, callback_data) pairs."""
+    return InlineKeyboardMarkup(
+        [[InlineKeyboardButton(label, callback_data=data) for label, data in row] for row in rows]
+    )
+
+
+# Static keyboards are built once at import time. InlineKeyboardMarkup objects are
+# immutable, so the same instance can be shared by every update.
+MAIN_MENU_KEYBOARD = _keyboard([
+    [("➕ Add New Trade", 'add_new_trade'), ("🔁 Check Previous Trades", 'check_previous_trades')],
+    [("📁 Export Data (CSV)", 'export_csv'), ("🗃️ Update Journal", 'update_trade')],
+])
+
+# Shown while a risk limit locks adding trades; the button explains the lock when pressed.
+LOCKED_MAIN_MENU_KEYBOARD = _keyboard([
+    [("🔒 Add New Trade", 'add_new_trade'), ("🔁 Check Previous Trades", 'check_previous_trades')],
+    [("📁 Export Data (CSV)", 'export_csv'), ("🗃️ Update Journal", 'update_trade')],
+])
+
+WIN_LOSS_KEYBOARD = _keyboard([[("Win", 'Win')], [("Loss", 'Loss')]])
+
+SIDE_KEYBOARD = _keyboard([[("Long", 'Long')], [("Short", 'Short')]])
+
+STRATEGY_KEYBOARD = _keyboard([
+    [("DHL", 'DHL')],
+    [("Close NYSE", 'Close_NYSE')],
+    [("MTR", 'MTR')],
+    [("FF", 'FF')],
+])
+
+CHECK_TRADES_KEYBOARD = _keyboard([
+    [("📆 By Date Range", 'by_date_range')],
+    [("🆔 By Trade ID", 'by_trade_id')],
+    [("🔤 By Ticker Name", 'by_ticker_name')],
+    [("↕️ By Side(Long/Short)", 'by_side')],
+    [("✌🏽 By Status(Win/Loss)", 'by_status')],
+])
+
+EXPORT_PERIOD_KEYBOARD = _keyboard([
+    [("1 Day", '1D')],
+    [("2 Days", '2D')],
+    [("3 Days", '3D')],
+    [("1 Week", '1W')],
+    [("2 Weeks", '2W')],
+    [("1 Month", '1M')],
+    [("2 Months", '2M')],
+    [("3 Months", '3M')],
+    [("6 Months", '6M')],
+    [("Week to Date", 'WTD'), ("Month to Date", 'MTD'), ("Year to Date", 'YTD')],
+    [("Custom Date Range", 'custom')],
+])
+
+EXPORT_TICKER_KEYBOARD = _keyboard([
+    [("All Trades", 'all_trades')],
+    [("Choose Ticker", 'choose_ticker')],
+])
+
+UPDATE_MENU_KEYBOARD = _keyboard([
+    [("🗃️ Update a Trade", 'update_trade_by_id')],
+    [("✐ Remove a Trade", 'remove_trade')],
+    [("💀 Remove Whole Database", 'remove_all_data')],
+])
+
+UPDATE_FIELD_KEYBOARD = _keyboard([
+    [("Ticker", 'update_ticker')],
+    [("Status", 'update_status')],
+    [("Side", 'update_side')],
+    [("Strategy", 'update_strategy')],
+    [("Cancel", 'cancel_update')],
+])
+
+UPDATE_STATUS_KEYBOARD = _keyboard([[("Win", 'update_status_Win')], [("Loss", 'update_status_Loss')]])
+
+UPDATE_SIDE_KEYBOARD = _keyboard([[("Long", 'update_side_Long')], [("Short", 'update_side_Short')]])
+
+UPDATE_STRATEGY_KEYBOARD = _keyboard([
+    [("DHL", 'update_strategy_DHL')],
+    [("Close_NYSE", 'update_strategy_Close_NYSE')],
+    [("MTR", 'update_strategy_MTR')],
+    [("FF", 'update_strategy_FF')],
+])
+
+CONFIRM_REMOVE_ALL_KEYBOARD = _keyboard([
+    [("👍🏼 Confirm", 'confirm_remove_all_data')],
+    [("⛔ Cancel", 'cancel_remove_all_data')],
+])
+
+
+CONFIRM_REMOVE_DUPLICATES_KEYBOARD = _keyboard([
+    [("👍🏼 Remove duplicates", 'confirm_remove_duplicates')],
+    [("⛔ Cancel", 'cancel_remove_duplicates')],
+])
+
+@lru_cache(maxsize=64)
+def _ticker_keyboard(catalog):
+    return _keyboard([[(ticker, ticker)] for ticker in catalog])
+
+
+def ticker_keyboard(tickers):
+    """
+    Returns the keyboard listing the given tickers.
+
+    The keyboard is cached per ticker catalog: the catalog itself (as a tuple) is the
+    cache key, so it acts as its version and a new ticker simply produces a new entry.
+
+    Args:
+        tickers (list): Ticker names, e.g. from TradeDatabase.get_all_tickers().
+
+    Returns:
+        InlineKeyboardMarkup: One button per ticker.
+    """
+    return _ticker_keyboard(tuple(tickers))
+
+
+# Trade card template, for mappings with these keys.
+TRADE_CARD = (
+    "Trade ID: {id}\n"
+    "Date: {date}\n"
+    "Time: {time}\n"
+    "Ticker: {ticker}\n"
+    "Side: {side}\n"
+    "RR: {rr}\n"
+    "PnL: {pnl}\n"
+    "Strategy: {strategy}\n"
+)
+_render_mapping = TRADE_CARD.format_map
+
+
+def render_card(trade):
+    """
+    Formats one trade as a card.
+
+    Trade records take an f-string over their attributes, which is compiled with the
+    module and reads the tuple slots directly; str.format_map would parse TRADE_CARD
+    and call Trade.__getitem__ once per field on every card.
+
+    Args:
+        trade (Trade | dict): A Trade record, or a mapping with the TRADE_CARD keys.
+
+    Returns:
+        str: The card text.
+    """
+    if not isinstance(trade, Trade):
+        return _render_mapping(trade)
+    return (
+        f"Trade ID: {trade.id}\n"
+        f"Date: {trade.date}\n"
+        f"Time: {trade.time}\n"
+        f"Ticker: {trade.ticker}\n"
+        f"Side: {trade.side}\n"
+        f"RR: {trade.rr}\n"
+        f"PnL: {trade.pnl}\n"
+        f"Strategy: {trade.strategy}\n"
+    )
+
+
+class CardPacker:
+    """
+    Packs trade cards into messages of at most `limit` characters as the trades arrive,
+    so a streamed result can be sent message by message while it is still being read.
+    """
+
+    __slots__ = ('limit', '_batch', '_size')
+
+    def __init__(self, limit=MESSAGE_LIMIT):
+        self.limit = limit
+        self._batch, self._size = [], 0
+
+    def add(self, trade):
+        """Adds a trade's card. Returns the previous message once it is full, otherwise None."""
+        card = render_card(trade)
+        message = None
+        # Cards are separated by a blank line (one extra newline).
+        if self._batch and self._size + len(card) + 1 > self.limit:
+            message = self.flush()
+        self._batch.append(card)
+        self._size += len(card) + 1
+        return message
+
+    def flush(self):
+        """Returns the message being filled, or None if it is empty."""
+        if not self._batch:
+            return None
+        message = '\n'.join(self._batch)
+        self._batch, self._size = [], 0
+        return message
+
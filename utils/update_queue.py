@@ -0,0 +1,140 @@
+import json
+import asyncio
+import sqlite3
+from abc import ABC, abstractmethod
+from telegram import Update
+from telegram.error import NetworkError
+from utils.bot_management import logger
+
+
+def shard_for(update: Update, shards):
+    """
+    Returns the worker shard of an update. Updates are sharded by chat (falling back to the
+    user for inline queries), so every update of a conversation reaches the same worker
+    and its ConversationHandler state stays in that process.
+    """
+    owner = update.effective_chat or update.effective_user
+    return (owner.id if owner else update.update_id) % shards
+
+
+class UpdateBroker(ABC):
+    """Queue between the ingress process and the workers; one ordered stream per shard."""
+
+    @abstractmethod
+    def publish(self, items):
+        """Append `(shard, payload)` pairs, payload being the update as a dictionary."""
+
+    @abstractmethod
+    def fetch(self, shard, limit=100):
+        """Return up to `limit` unacknowledged `(message_id, payload)` pairs of a shard, oldest first."""
+
+    @abstractmethod
+    def ack(self, shard, message_id):
+        """Drop every message of `shard` up to and including `message_id`."""
+
+
+class SQLiteBroker(UpdateBroker):
+    """
+    Local stand-in broker backed by a SQLite file in WAL mode.
+
+    Each shard is consumed by exactly one worker, so fetching needs no claim step:
+    a worker reads its oldest messages and deletes them once they were handled,
+    which gives at-least-once delivery across worker restarts.
+    """
+
+    def __init__(self, path=r'database/update_queue.db'):
+        """
+        Args:
+            path (str): Queue database file shared by the ingress and worker processes.
+        """
+        self.path = path
+        # Polled continuously, so each process keeps one connection open.
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS updates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                shard INTEGER NOT NULL,
+                payload TEXT NOT NULL
+            )
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_updates_shard ON updates (shard, id)")
+        self._conn.commit()
+
+    def publish(self, items):
+        self._conn.executemany("INSERT INTO updates (shard, payload) VALUES (?, ?)",
+                               [(shard, json.dumps(payload)) for shard, payload in items])
+        self._conn.commit()
+
+    def fetch(self, shard, limit=100):
+        rows = self._conn.execute(
+            "SELECT id, payload FROM updates WHERE shard = ? ORDER BY id LIMIT ?", (shard, limit)
+        ).fetchall()
+        return [(message_id, json.loads(payload)) for message_id, payload in rows]
+
+    def ack(self, shard, message_id):
+        self._conn.execute("DELETE FROM updates WHERE shard = ? AND id <= ?", (shard, message_id))
+        self._conn.commit()
+
+    def pending(self):
+        """Number of messages not yet acknowledged."""
+        return self._conn.execute("SELECT COUNT(*) FROM updates").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+async def ingest(bot, broker, shards, timeout=30):
+    """
+    Ingress loop: long-polls getUpdates and publishes every update to its shard.
+    The offset only advances after the batch is in the broker, so nothing is lost on a crash.
+
+    Args:
+        bot (Bot): An initialized bot.
+        broker (UpdateBroker): Queue shared with the workers.
+        shards (int): Number of worker shards.
+        timeout (int): Long-polling timeout in seconds.
+    """
+    offset = None
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=timeout, allowed_updates=Update.ALL_TYPES)
+        except NetworkError as e:
+            logger.warning("getUpdates failed: %s", e)
+            await asyncio.sleep(1)
+            continue
+        if updates:
+            broker.publish([(shard_for(update, shards), update.to_dict()) for update in updates])
+            offset = updates[-1].update_id + 1
+
+
+async def consume(application, broker, shard, batch_size=100, poll_interval=0.05, stop_when_empty=False):
+    """
+    Worker loop: feeds the updates of one shard to `application` in order and acknowledges
+    each batch once it was handled.
+
+    Args:
+        application (Application): An initialized application with the bot's handlers.
+        broker (UpdateBroker): Queue shared with the ingress.
+        shard (int): The shard this worker owns.
+        batch_size (int): Messages fetched per round trip to the broker.
+        poll_interval (float): Seconds to wait when the shard is empty.
+        stop_when_empty (bool): Return once the shard is drained instead of waiting for more.
+
+    Returns:
+        int: Number of updates handled.
+    """
+    handled = 0
+    while True:
+        batch = broker.fetch(shard, batch_size)
+        if not batch:
+            if stop_when_empty:
+                return handled
+            await asyncio.sleep(poll_interval)
+            continue
+        for _, payload in batch:
+            update = Update.de_json(payload, application.bot)
+            # Through the update processor, as polling does, so /profile counts these updates
+            await application.update_processor.process_update(update, application.process_update(update))
+        broker.ack(shard, batch[-1][0])
+        handled += len(batch)